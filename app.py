@@ -9,6 +9,15 @@ from models import db
 from flask_migrate import Migrate
 from utils.seed import seed_roles
 from utils.auth_context import load_current_user
+from utils.query_stats import init_query_stats
+from utils.metrics import init_metrics
+from utils.profiling import init_profiling
+from utils.tracing import init_tracing
+from utils.compression import init_compression
+from utils.db_engine import configure_engine, init_engine_profile
+from utils.db_routing import init_db_routing
+from utils.slow_queries import init_slow_query_log
+from utils.unit_of_work import init_unit_of_work
 from security.csrf import require_csrf
 from routes.pay_pages import pay_pages_bp
 from routes.audit_logs import audit_bp
@@ -16,9 +25,12 @@ from routes.audit_logs import audit_bp
 
 from flask_cors import CORS
 
-def create_app():
+def create_app(overrides: dict | None = None):
     app = Flask(__name__)
     app.config.from_object(Config)
+    if overrides:
+        # applied before any extension reads the config (e.g. a throwaway database for `flask perf`)
+        app.config.update(overrides)
     CORS(
         app,
         supports_credentials=True,
@@ -43,12 +55,34 @@ def create_app():
 
 
 
-    # Database init
+    # Database init (engine options must be in place before init_app builds the engine)
+    configure_engine(app)
     db.init_app(app)
+    init_engine_profile(app)
+    init_slow_query_log(app)
     
     # Migrations
     Migrate(app, db)
 
+    # Sampled / X-Profile-Token request profiling (first, so every other hook is profiled)
+    init_profiling(app)
+
+    # Request/SQL/bcrypt/email/payment spans (before the other hooks, so the request span covers them)
+    init_tracing(app)
+
+    # Request metrics for /metrics (early, so latency covers the other hooks)
+    init_metrics(app)
+
+    # Per-request SQL counting / N+1 warnings (before auth hooks, so their queries are counted)
+    init_query_stats(app)
+
+    # gzip/br response bodies: after the metrics/tracing hooks (so their timing includes it) and before the
+    # unit of work (whose after_request may still replace the body), so it compresses the final response
+    init_compression(app)
+
+    # One commit per request for staged writes (before user loading, which stages the session touch)
+    init_unit_of_work(app)
+
     # Seed default roles at startup (safe & idempotent)
     with app.app_context():
         try:
@@ -82,6 +116,9 @@ def create_app():
                 failure = require_csrf()
                 if failure:
                     return failure
+
+    # Replica reads for GET handlers (registered last: user loading writes to the primary)
+    init_db_routing(app)
     
     @app.after_request
     def add_security_headers(resp):
@@ -143,6 +180,318 @@ def register_cli(app):
 
         print(f"{user.email} promoted to SUPER_ADMIN")
 
+    @app.cli.command("waitlist-expire")
+    def waitlist_expire():
+        """Expire lapsed waitlist holds and offer the slots to the next waiters (run from cron)."""
+        from utils.notifier import wait_for_notifications
+        from utils.waitlist import expire_holds
+
+        expired, reoffered = expire_holds()
+        wait_for_notifications()
+        print(f"{expired} hold(s) expired, {reoffered} slot(s) re-offered")
+
+    @app.cli.command("payments-reconcile")
+    @click.option("--min-age", type=int, default=None, help="Only payments older than this many minutes.")
+    @click.option("--batch-size", type=int, default=None)
+    @click.option("--concurrency", type=int, default=None, help="Parallel provider lookups.")
+    def payments_reconcile(min_age, batch_size, concurrency):
+        """Resolve stale INIT payments to PAID/FAILED by asking the payment provider."""
+        from utils.reconcile import reconcile_stale_payments
+
+        stats = reconcile_stale_payments(min_age_minutes=min_age, batch_size=batch_size, concurrency=concurrency)
+        print(
+            f"scanned {stats['scanned']} in {stats['batches']} batch(es): "
+            f"{stats['paid']} paid, {stats['failed']} failed, {stats['open']} still open, "
+            f"{stats['resolved_elsewhere']} resolved concurrently, {stats['errors']} lookup error(s); "
+            f"{stats['payments_per_s']} payments/s"
+        )
+
+    @app.cli.command("webhooks-drain")
+    @click.option("--limit", default=500, show_default=True, help="Max events to apply in this run.")
+    def webhooks_drain(limit):
+        """Apply stored webhook events left PENDING/FAILED (e.g. after a restart)."""
+        from utils.webhook_queue import drain_pending
+
+        counts = drain_pending(limit=limit)
+        print(", ".join(f"{n} {status.lower()}" for status, n in sorted(counts.items())) or "nothing to do")
+
+    @app.cli.command("court-stats-verify")
+    @click.option("--no-fix", is_flag=True, help="Only report drift, do not repair it.")
+    def court_stats_verify(no_fix):
+        """Recompute court_stats from slots/bookings and repair drift (run from cron)."""
+        from utils.court_stats import verify_court_stats
+
+        report = verify_court_stats(fix=not no_fix)
+        print(f"checked {report['checked']} court(s): {len(report['missing'])} missing, {len(report['drifted'])} drifted, {report['fixed']} fixed")
+        for row in report["drifted"]:
+            print(f"  court {row.pop('court_id')}: " + ", ".join(f"{k} {a} -> {b}" for k, (a, b) in row.items()))
+
+    @app.cli.command("rollups-refresh")
+    @click.option("--full", is_flag=True, help="Rebuild every court-day from history (first run / backfill).")
+    @click.option("--batch-size", type=int, default=None)
+    def rollups_refresh(full, batch_size):
+        """Rebuild occupancy/revenue rollups for court-days changed since the last run (run from cron)."""
+        from utils.rollups import mark_all_dirty, refresh_rollups
+
+        if full:
+            print(f"{mark_all_dirty()} court-day(s) queued")
+        stats = refresh_rollups(batch_size=batch_size)
+        print(f"rebuilt {stats['days']} court-day(s) in {stats['batches']} batch(es), {stats['elapsed_s']}s")
+
+    @app.cli.command("seed-load")
+    @click.option("--users", default=10_000, show_default=True, help="Players.")
+    @click.option("--courts", default=100, show_default=True, help="Courts, one owner each.")
+    @click.option("--slots-per-court", default=16 * 60, show_default=True, help="Hourly slots (16 per day) per court.")
+    @click.option("--days-back", default=30, show_default=True, help="Slots start this many days before the anchor day.")
+    @click.option("--booked-ratio", default=0.4, show_default=True)
+    @click.option("--abandoned-ratio", default=0.05, show_default=True, help="Slots with an INIT/FAILED checkout.")
+    @click.option("--session-ratio", default=0.2, show_default=True, help="Users with a live session.")
+    @click.option("--audit-per-user", default=5, show_default=True)
+    @click.option("--chunk-size", default=5_000, show_default=True, help="Rows per executemany/commit.")
+    @click.option("--seed", default=1, show_default=True)
+    @click.option("--anchor", default=None, help="YYYY-MM-DD the timeline is built around (default today).")
+    @click.option("--rollups/--no-rollups", default=False, help="Also rebuild the analytics rollups (slow on huge sets).")
+    @click.option("--throwaway", is_flag=True, help="Required: confirms DATABASE_URL is a disposable database.")
+    @click.option("--credentials-out", type=click.Path(dir_okay=False), default=None,
+                  help="Where to write the seeded password and session tokens (default <instance>/seed-load-credentials.json).")
+    def seed_load_command(users, courts, slots_per_court, days_back, booked_ratio, abandoned_ratio,
+                          session_ratio, audit_per_user, chunk_size, seed, anchor, rollups, throwaway, credentials_out):
+        """Bulk-generate a deterministic synthetic dataset for performance work."""
+        from datetime import datetime
+        import json
+        import os
+        import time
+
+        target = db.engine.url.render_as_string(hide_password=True)
+        if not throwaway:
+            # seeded owners are ADMINs with live sessions: never on a real deployment
+            raise click.ClickException(f"refusing to seed {target}; pass --throwaway if this database is disposable")
+
+        from utils.court_stats import verify_court_stats
+        from utils.rollups import mark_all_dirty, refresh_rollups
+        from utils.seed_load import seed_load
+
+        def progress(table, rows):
+            if rows % 100_000 < chunk_size:
+                print(f"  {table}: {rows:,}")
+
+        started = time.perf_counter()
+        credentials = {}
+        stats = seed_load(
+            users=users,
+            courts=courts,
+            slots_per_court=slots_per_court,
+            days_back=days_back,
+            booked_ratio=booked_ratio,
+            abandoned_ratio=abandoned_ratio,
+            session_ratio=session_ratio,
+            audit_per_user=audit_per_user,
+            chunk_size=chunk_size,
+            seed=seed,
+            anchor=datetime.fromisoformat(anchor) if anchor else None,
+            credentials=credentials,
+            progress=progress,
+        )
+        credentials_out = credentials_out or os.path.join(app.instance_path, "seed-load-credentials.json")
+        os.makedirs(os.path.dirname(os.path.abspath(credentials_out)), exist_ok=True)
+        fd = os.open(credentials_out, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.fchmod(fd, 0o600)   # also when overwriting an older file
+        with os.fdopen(fd, "w") as fh:
+            json.dump({"database": target, "password": credentials["password"], "sessions": credentials["sessions"]}, fh)
+        verify_court_stats()
+        if rollups:
+            mark_all_dirty()
+            refresh_rollups()
+        for table, entry in stats.items():
+            print(f"{table:14} {entry['rows']:>12,} rows  {entry['rows_per_s']:>10,} rows/s")
+        print(f"done in {time.perf_counter() - started:.1f}s (password and session tokens: {credentials_out})")
+
+    @app.cli.command("db-profile")
+    def db_profile():
+        """Show the SQLite pragmas actually in effect and whether they match SQLITE_PROFILE."""
+        from utils.db_engine import check_profile
+
+        report = check_profile(app)
+        for key in ("profile", "enabled", "sqlite_version", "journal_mode", "synchronous", "busy_timeout", "mmap_size", "cache_size", "pool", "read_pool", "write_queue"):
+            if key in report:
+                print(f"{key:15} {report[key]}")
+        for problem in report.get("problems", []):
+            print(f"PROBLEM: {problem}")
+        if not report["ok"]:
+            raise SystemExit(1)
+
+    @app.cli.command("replica-sync")
+    def replica_sync():
+        """Copy the SQLite primary into the SQLite replica file (local replica testing)."""
+        from utils.db_routing import sync_sqlite_replica
+
+        try:
+            result = sync_sqlite_replica(app)
+        except ValueError as exc:
+            raise click.ClickException(str(exc))
+        print(f"copied {result['pages']} page(s) {result['source']} -> {result['target']} in {result['elapsed_s']}s")
+
+    @app.cli.command("profile-token")
+    @click.option("--minutes", default=15, show_default=True, help="How long the token is accepted.")
+    @click.option("--memory", is_flag=True, help="Also take a tracemalloc snapshot of profiled requests.")
+    def profile_token(minutes, memory):
+        """Print an X-Profile-Token header value that profiles any request carrying it."""
+        from utils.profiling import TOKEN_HEADER, header_enabled, make_token
+
+        if not header_enabled(app):
+            raise click.ClickException("set PROFILE_SECRET (in every worker) to enable X-Profile-Token")
+        print(f"{TOKEN_HEADER}: {make_token(app, minutes=minutes, memory=memory)}")
+
+    @app.cli.command("slow-queries")
+    @click.option("--since-hours", type=float, default=24.0, show_default=True, help="0 = whole log.")
+    @click.option("--limit", default=20, show_default=True)
+    @click.option("--sort", type=click.Choice(["total", "max", "count", "mean"]), default="total", show_default=True)
+    @click.option("--endpoint", help="Only statements seen on this endpoint.")
+    @click.option("--json", "as_json", is_flag=True, help="Print the report as JSON.")
+    def slow_queries(since_hours, limit, sort, endpoint, as_json):
+        """Aggregate the slow query log by normalized statement, with its query plan."""
+        import json
+        from utils import slow_queries as sq
+
+        groups = sq.aggregate(sq.log_path(app), since=sq.since_hours(since_hours))
+        if endpoint:
+            groups = [group for group in groups if endpoint in group["endpoints"]]
+        key = {"total": "total_ms", "max": "max_ms", "count": "count", "mean": "mean_ms"}[sort]
+        groups = sorted(groups, key=lambda group: group[key], reverse=True)[:limit]
+        if as_json:
+            print(json.dumps(groups, indent=2))
+            return
+        if not groups:
+            print(f"no slow queries in {sq.log_path(app)}")
+            return
+        for group in groups:
+            endpoints = ", ".join(f"{name} x{n}" for name, n in list(group["endpoints"].items())[:3])
+            print(f"[{group['fingerprint']}] {group['count']}x  total {group['total_ms']:.0f}ms  "
+                  f"mean {group['mean_ms']:.1f}ms  p95 {group['p95_ms']:.1f}ms  max {group['max_ms']:.1f}ms")
+            print(f"  endpoints: {endpoints}")
+            print(f"  params: {group['params']}")
+            print(f"  sql: {group['sql'][:400]}")
+            for line in group["plan"] or []:
+                print(f"    plan: {line}")
+            for line in group["full_scans"]:
+                print(f"    FULL SCAN: {line}")
+            print()
+
+    @app.cli.group("perf")
+    def perf():
+        """Performance tooling."""
+
+    @perf.command("traces")
+    @click.option("--file", "path", type=click.Path(dir_okay=False), help="Trace file (default: TRACE_FILE).")
+    @click.option("--endpoint", help="Only requests to this Flask endpoint, e.g. auth.login.")
+    @click.option("--limit", default=10, show_default=True, help="Slowest traces to list.")
+    @click.option("--json", "as_json", is_flag=True, help="Print the summary as JSON.")
+    def traces(path, endpoint, limit, as_json):
+        """Where request time goes, per endpoint and span name, from the exported traces."""
+        import json
+        from utils.tracing import summarize, trace_path
+
+        path = path or trace_path(app)
+        summary = summarize(path, endpoint=endpoint, limit=limit)
+        if as_json:
+            print(json.dumps(summary, indent=2))
+            return
+        if not summary["endpoints"]:
+            print(f"no traces in {path}")
+            return
+        for group in summary["endpoints"]:
+            print(f"{group['endpoint']}: {group['requests']} requests  mean {group['mean_ms']:.1f}ms  max {group['max_ms']:.1f}ms")
+            for row in group["spans"][:8]:
+                print(f"  {row['mean_ms_per_request']:8.2f}ms/req  {row['calls_per_request']:6.2f}x  {row['name']}")
+        print("\nslowest traces:")
+        for trace in summary["traces"]:
+            top = ", ".join(f"{name} {ms:.1f}ms" for name, ms in list(trace["spans"].items())[:4])
+            print(f"  {trace['trace_id']}  {trace['duration_ms']:8.1f}ms  {trace['status']}  {trace['name']}  [{top}]")
+
+    @perf.command("index-report")
+    @click.option("--users", default=2_000, show_default=True, help="Seeded players.")
+    @click.option("--courts", default=100, show_default=True)
+    @click.option("--days", default=14, show_default=True, help="Days of hourly slots per court (half in the past).")
+    @click.option("--min-rows", default=500, show_default=True, help="Full scans of smaller tables are not flagged.")
+    @click.option("--seed", default=1, show_default=True)
+    @click.option("--schema", type=click.Choice(["migrations", "models"]), default="migrations", show_default=True)
+    @click.option("--database", type=click.Path(dir_okay=False), help="New SQLite file to build and keep (default: a temp file, removed after).")
+    @click.option("--overwrite", is_flag=True, help="Let --database replace an existing file.")
+    @click.option("--write-migration", is_flag=True, help="Write the useful proposals as a migration on top of the current head.")
+    @click.option("--only", multiple=True, help="With --write-migration: only these index names (repeatable).")
+    @click.option("--json", "as_json", is_flag=True, help="Print the full report as JSON.")
+    def index_report(users, courts, days, min_rows, seed, schema, database, overwrite, write_migration, only, as_json):
+        """Call every route on a seeded throwaway database and propose indexes for bad query plans."""
+        import json
+        import os
+        import secrets
+        import tempfile
+
+        from utils import index_advisor
+
+        keep = database is not None
+        if database is None:
+            fd, database = tempfile.mkstemp(prefix="futsalslot-index-report-", suffix=".db")
+            os.close(fd)
+        elif os.path.exists(database) and not overwrite:
+            raise click.ClickException(f"{database} already exists; pass --overwrite if it is disposable")
+        if os.path.exists(database):
+            os.remove(database)
+        os.environ.setdefault("STRIPE_SUCCESS_URL", "http://localhost/pay/success")
+        os.environ.setdefault("STRIPE_CANCEL_URL", "http://localhost/pay/cancel")
+
+        report_app = create_app({
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///" + os.path.abspath(database),
+            "SQLALCHEMY_BINDS": {},
+            "EMAIL_BACKEND": "memory",
+            "PAYMENT_PROVIDER": "fake",
+            "FAKE_STRIPE_WEBHOOK_SECRET": "whsec_report_" + secrets.token_hex(16),
+            "NOTIFY_ASYNC": False,
+            "QUERY_STATS_ENABLED": False,
+            "SLOW_QUERY_ENABLED": False,
+            "METRICS_ENABLED": False,
+            "TRACING_ENABLED": False,
+            "PROFILE_SAMPLE_RATE": 0.0,
+        })
+        report_app.logger.disabled = True
+        try:
+            report = index_advisor.run_report(report_app, users=users, courts=courts, days=days, min_rows=min_rows, seed=seed, schema=schema)
+        finally:
+            if not keep:
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(database + suffix):
+                        os.remove(database + suffix)
+
+        if as_json:
+            print(json.dumps(report, indent=2, default=str))
+        else:
+            print("dataset: " + ", ".join(f"{t}={n:,}" for t, n in sorted(report["dataset"].items()) if n))
+            print(f"routes called: {len(report['routes'])}, distinct statements planned: {report['statements']}")
+            print(f"\nflagged statements: {len(report['findings'])}")
+            for finding in report["findings"]:
+                routes = ", ".join(list(finding["routes"])[:3])
+                print(f"  [{finding['fingerprint']}] {routes}")
+                print(f"    {finding['sql'][:220]}")
+                for issue in finding["issues"]:
+                    print(f"    {issue['detail']}  -> {issue.get('advice', '')}")
+            print(f"\nproposed indexes: {len(report['proposals'])}")
+            if report["discarded"]:
+                print(f"  (dropped, improved no statement: {', '.join(report['discarded'])})")
+            for proposal in report["proposals"]:
+                state = "used" if proposal["used"] else "NOT used by the planner"
+                print(f"  {proposal['name']} on {proposal['table']}({', '.join(proposal['columns'])}) "
+                      f"[{proposal['rows']:,} rows] {state}, improves {proposal['statements_improved']}/{len(proposal['fingerprints'])} statement(s)")
+                print(f"    routes: {', '.join(list(proposal['routes'])[:4])}")
+                print(f"    alembic: {index_advisor.alembic_op(proposal)}")
+                print(f"    model:   {index_advisor.model_index(proposal)}")
+
+        useful = [p for p in report["proposals"] if p["used"] and p["statements_improved"] and (not only or p["name"] in only)]
+        if write_migration:
+            if not useful:
+                print("no proposal improved a plan; no migration written")
+            else:
+                print(f"wrote {index_advisor.write_migration(app, useful)}")
+
 #-------------------------
 
 
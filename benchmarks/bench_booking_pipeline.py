@@ -0,0 +1,100 @@
+"""
+End-to-end booking pipeline benchmark on one machine.
+
+Players start checkouts (POST /payments/start) against the fake payment
+provider while its replayer completes (or expires) the sessions at
+--webhook-rate events/second through the real, signed /webhooks/stripe
+endpoint. Reports checkout latency plus how long it took until every
+paid session became a CONFIRMED booking.
+
+    python benchmarks/bench_booking_pipeline.py --threads 8 --per-thread 50 --webhook-rate 200
+"""
+import argparse
+import os
+import threading
+import time
+
+from common import authed_client, make_app, report, run_threads, seed_players_and_slots, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--per-thread", type=int, default=50)
+    parser.add_argument("--webhook-rate", type=float, default=200.0, help="webhook events per second")
+    parser.add_argument("--expire-ratio", type=float, default=0.1, help="share of sessions that expire unpaid")
+    parser.add_argument("--provider-latency-ms", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds to wait for the pipeline to settle")
+    parser.add_argument("--out", help="write the JSON summary to this file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("STRIPE_SUCCESS_URL", "http://localhost/pay/success")
+    os.environ.setdefault("STRIPE_CANCEL_URL", "http://localhost/pay/cancel")
+
+    app, db_path = make_app(
+        PAYMENT_PROVIDER="fake",
+        FAKE_STRIPE_LATENCY_MS=args.provider_latency_ms,
+        FAKE_STRIPE_REPLAY_RATE=args.webhook_rate,
+        FAKE_STRIPE_EXPIRE_RATIO=args.expire_ratio,
+    )
+    total = args.threads * args.per_thread
+    tokens, slot_ids = seed_players_and_slots(app, players=args.threads, slots=total)
+
+    from models import db
+    from models.payment import Payment
+    from models.webhook_event import WebhookEvent
+    from utils.payment_provider import get_provider
+    from utils.webhook_queue import wait_for_webhooks
+
+    with app.app_context():
+        provider = get_provider()  # starts the replayer
+
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def worker(i):
+        client, headers = authed_client(app, tokens[i])
+        for slot_id in slot_ids[i * args.per_thread:(i + 1) * args.per_thread]:
+            t0 = time.perf_counter()
+            resp = client.post("/payments/start", json={"slot_id": slot_id}, headers=headers)
+            dt = time.perf_counter() - t0
+            with lock:
+                latencies.append(dt)
+                if resp.status_code != 200:
+                    errors[0] += 1
+
+    started = time.perf_counter()
+    checkout_elapsed = run_threads(worker, args.threads)
+
+    # settle: replayer drained every session and workers applied every event
+    deadline = time.perf_counter() + args.timeout
+    while provider.open_session_ids() and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    provider.stop_replayer()
+    wait_for_webhooks()
+    pipeline_elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        paid = Payment.query.filter_by(status="PAID").count()
+        still_init = Payment.query.filter_by(status="INIT").count()
+        events = db.session.query(WebhookEvent.status, db.func.count()).group_by(WebhookEvent.status).all()
+
+    result = {
+        "benchmark": "booking_pipeline",
+        "threads": args.threads,
+        "webhook_rate": args.webhook_rate,
+        "expire_ratio": args.expire_ratio,
+        "checkout": summarize(latencies, checkout_elapsed, errors[0]),
+        "pipeline_seconds": round(pipeline_elapsed, 3),
+        "bookings_confirmed": paid,
+        "payments_still_init": still_init,
+        "bookings_per_s": round(paid / pipeline_elapsed, 1) if pipeline_elapsed else 0.0,
+        "webhook_events": {status: n for status, n in events},
+    }
+    report(result, args.out)
+    os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Concurrent checkout benchmark for POST /payments/start.
+
+Stripe is replaced by the in-process fake provider (utils/fake_stripe.py)
+sleeping --stripe-latency-ms per call, so the numbers show how much the
+handler's own DB work (and lock contention around the provider call) adds
+on top of the provider round trip.
+
+    python benchmarks/bench_checkout.py --threads 16 --per-thread 25 --stripe-latency-ms 150
+"""
+import argparse
+import os
+import threading
+import time
+
+from common import authed_client, make_app, report, run_threads, seed_players_and_slots, summarize
+
+
+def provider_sessions(app):
+    with app.app_context():
+        from utils.payment_provider import get_provider
+
+        return get_provider().open_session_ids()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--per-thread", type=int, default=25)
+    parser.add_argument("--stripe-latency-ms", type=float, default=150.0)
+    parser.add_argument("--out", help="write the JSON summary to this file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("STRIPE_SUCCESS_URL", "http://localhost/pay/success")
+    os.environ.setdefault("STRIPE_CANCEL_URL", "http://localhost/pay/cancel")
+
+    app, db_path = make_app(PAYMENT_PROVIDER="fake", FAKE_STRIPE_LATENCY_MS=args.stripe_latency_ms)
+    total = args.threads * args.per_thread
+    tokens, slot_ids = seed_players_and_slots(app, players=args.threads, slots=total)
+
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def worker(i):
+        client, headers = authed_client(app, tokens[i])
+        own_slots = slot_ids[i * args.per_thread:(i + 1) * args.per_thread]
+        for slot_id in own_slots:
+            t0 = time.perf_counter()
+            resp = client.post("/payments/start", json={"slot_id": slot_id}, headers=headers)
+            dt = time.perf_counter() - t0
+            with lock:
+                latencies.append(dt)
+                if resp.status_code != 200:
+                    errors[0] += 1
+
+    elapsed = run_threads(worker, args.threads)
+    result = {
+        "benchmark": "checkout",
+        "threads": args.threads,
+        "stripe_latency_ms": args.stripe_latency_ms,
+        "stripe_sessions": len(provider_sessions(app)),
+        **summarize(latencies, elapsed, errors[0]),
+    }
+    report(result, args.out)
+    os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
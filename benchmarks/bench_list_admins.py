@@ -0,0 +1,92 @@
+"""
+Query-count and latency check for GET /super-admin/admins.
+
+Seeds --admins ADMIN users (every other one owning a VERIFIED court) and
+fetches the directory at several page sizes. The number of SQL statements per
+request must not depend on the page size; the script exits non-zero if it
+does, so it doubles as an N+1 regression check.
+
+    python benchmarks/bench_list_admins.py --admins 400 --repeat 20
+"""
+import argparse
+import sys
+import time
+
+from common import authed_client, make_app, report, summarize
+
+PAGE_SIZES = (10, 50, 200)
+
+
+def seed(app, admins: int):
+    from datetime import datetime, timedelta
+
+    from models import db
+    from models.court import Court
+    from models.session import Session
+    from models.user import Role, User
+    from security.session import _hash_token
+
+    with app.app_context():
+        admin_role = Role.query.filter_by(name="ADMIN").first()
+        super_role = Role.query.filter_by(name="SUPER_ADMIN").first()
+        root = User(email="root@bench.local", password_hash="x", full_name="Root", phone_number="9700000000")
+        root.roles.append(super_role)
+        db.session.add(root)
+        db.session.flush()
+        db.session.add(Session(user_id=root.id, token_hash=_hash_token("bench-root"), expires_at=datetime.utcnow() + timedelta(hours=8)))
+        for i in range(admins):
+            user = User(email=f"admin{i}@bench.local", password_hash="x", full_name=f"Admin {i}", phone_number=f"96{i:08d}")
+            user.roles.append(admin_role)
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Court(
+                name=f"Court {i}",
+                location="Bench",
+                name_normalized=f"court {i}",
+                location_normalized="bench",
+                owner_user_id=user.id,
+                status="VERIFIED" if i % 2 == 0 else "PENDING",
+            ))
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--admins", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--out", help="write the JSON summary to this file")
+    args = parser.parse_args()
+
+    app, db_path = make_app()
+    seed(app, args.admins)
+    client, _ = authed_client(app, "bench-root")
+
+    from utils.query_stats import count_queries
+
+    result = {"admins": args.admins, "db_path": db_path, "pages": {}}
+    counts = set()
+    for per_page in PAGE_SIZES:
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            with count_queries() as stats:
+                resp = client.get(f"/super-admin/admins?per_page={per_page}")
+            latencies.append(time.perf_counter() - t0)
+            assert resp.status_code == 200, resp.get_json()
+        counts.add(stats.count)
+        result["pages"][per_page] = {
+            "rows": len(resp.get_json()),
+            "total": int(resp.headers["X-Total-Count"]),
+            "queries_per_request": stats.count,
+            **summarize(latencies, time.perf_counter() - started),
+        }
+
+    result["constant_query_count"] = len(counts) == 1
+    report(result, args.out)
+    if len(counts) != 1:
+        sys.exit("query count depends on page size: N+1 regression")
+
+
+if __name__ == "__main__":
+    main()
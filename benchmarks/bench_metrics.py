@@ -0,0 +1,109 @@
+"""
+Per-request overhead of the /metrics instrumentation (METRICS_ENABLED).
+
+Each mode runs in its own process (the hooks are registered when the app is
+created) and issues --repeat sequential requests to a cheap endpoint
+(GET /health) and a DB-backed one (GET /public/slots), reporting latency per
+mode and the difference in microseconds. Between processes that difference
+is mostly noise on the DB-backed route, so the cost of the metrics hooks is
+also timed on their own ("hook_us"). The "multiproc" mode also writes
+the shared-directory files, as a multi-worker deployment does.
+
+    python benchmarks/bench_metrics.py --repeat 5000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import make_app, report, seed_players_and_slots, summarize
+
+MODES = ("off", "on", "multiproc")
+
+
+def run_mode(args) -> dict:
+    os.environ["METRICS_ENABLED"] = "false" if args.run_mode == "off" else "true"
+    os.environ["METRICS_TOKEN"] = "bench-metrics-token"
+    if args.run_mode == "multiproc":
+        os.environ["METRICS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="futsalslot-metrics-")
+        os.environ["METRICS_FLUSH_SECONDS"] = "1"
+    app, db_path = make_app()
+    app.logger.disabled = True
+    seed_players_and_slots(app, players=1, slots=24)
+
+    with app.app_context():
+        from models.slot import Slot
+
+        day = Slot.query.order_by(Slot.start_time).first().start_time.date().isoformat()
+
+    client = app.test_client()
+    out = {}
+    for name, path in (("GET /health", "/health"), ("GET /public/slots", f"/public/slots?date={day}")):
+        for _ in range(200):      # warm-up: imports, pool, statement cache
+            client.get(path)
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            client.get(path)
+            latencies.append(time.perf_counter() - t0)
+        out[name] = summarize(latencies, time.perf_counter() - started)
+        out[name]["mean_us"] = round(sum(latencies) / len(latencies) * 1e6, 1)
+    scrape = time.perf_counter()
+    client.get("/metrics", headers={"Authorization": "Bearer bench-metrics-token"})
+    return {
+        "mode": args.run_mode,
+        "requests": out,
+        "hook_us": hook_cost_us(app, args.repeat) if args.run_mode != "off" else 0.0,
+        "scrape_ms": round((time.perf_counter() - scrape) * 1000.0, 2),
+        "db_path": db_path,
+    }
+
+
+def hook_cost_us(app, repeat: int) -> float:
+    """Mean cost of the metrics hooks alone (before + after + teardown), in microseconds."""
+    from flask import Response
+
+    hooks = {f.__name__: f for f in app.before_request_funcs[None] + app.after_request_funcs[None] + app.teardown_request_funcs[None]}
+    before, after, teardown = (hooks[n] for n in ("_start_request_metrics", "_record_request_metrics", "_finish_request_metrics"))
+    resp = Response("ok")
+    with app.test_request_context("/health"):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            before()
+            after(resp)
+            teardown()
+        return round((time.perf_counter() - started) / repeat * 1e6, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5000)
+    parser.add_argument("--out", help="write the JSON summary to this file")
+    parser.add_argument("--run-mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        print(json.dumps(run_mode(args)))
+        return
+
+    result = {"repeat": args.repeat, "modes": {}}
+    for mode in MODES:
+        cmd = [sys.executable, os.path.abspath(__file__), "--run-mode", mode, "--repeat", str(args.repeat)]
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        result["modes"][mode] = json.loads(out.strip().splitlines()[-1])
+
+    base = result["modes"]["off"]["requests"]
+    result["overhead_us"] = {
+        mode: {name: round(row["mean_us"] - base[name]["mean_us"], 1) for name, row in result["modes"][mode]["requests"].items()}
+        for mode in MODES[1:]
+    }
+    result["hook_us"] = {mode: result["modes"][mode]["hook_us"] for mode in MODES[1:]}
+    report(result, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Throughput and correctness of `flask payments-reconcile`.
+
+Seeds stale INIT payments and reconciles them against an in-process
+provider lookup sleeping --lookup-latency-ms per call. With --race N, the
+lookup of the first N payments also confirms them through the webhook path
+on another connection while the batch is in flight, which is the
+interleaving that must not turn a paid, booked payment into FAILED.
+Exits non-zero if any payment does not end PAID with its slot booked once.
+
+    python benchmarks/bench_reconcile.py --payments 400 --concurrency 8 --race 20
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+from common import make_app, report, seed_players_and_slots
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payments", type=int, default=400)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--lookup-latency-ms", type=float, default=20.0)
+    parser.add_argument("--race", type=int, default=20, help="payments the webhook confirms mid-lookup")
+    parser.add_argument("--out", help="write the JSON summary to this file")
+    args = parser.parse_args()
+
+    app, db_path = make_app()
+    seed_players_and_slots(app, players=1, slots=args.payments)
+
+    from models import db
+    from models.booking import Booking
+    from models.payment import Payment
+    from models.slot import Slot
+    from models.user import User
+    from utils.reconcile import reconcile_stale_payments
+    from utils.stripe_events import apply_checkout_completed, find_payment
+
+    sessions = {}
+    with app.app_context():
+        user = User.query.filter_by(email="player0@bench.local").one()
+        created = datetime.utcnow() - timedelta(hours=3)
+        for i, slot in enumerate(Slot.query.order_by(Slot.id).all()):
+            payment = Payment(
+                slot_id=slot.id, user_id=user.id, amount=slot.price, status="INIT",
+                stripe_session_id=f"cs_bench_{i}", created_at=created,
+            )
+            db.session.add(payment)
+            db.session.flush()
+            sessions[payment.stripe_session_id] = {
+                "id": payment.stripe_session_id,
+                "status": "complete",
+                "payment_status": "paid",
+                "metadata": {"payment_id": str(payment.id), "slot_id": str(slot.id), "user_id": str(user.id)},
+            }
+        db.session.commit()
+
+    racing = {f"cs_bench_{i}" for i in range(min(args.race, args.payments))}
+
+    def webhook_confirms(session):
+        # what the webhook worker does, on its own app context and connection
+        with app.app_context():
+            meta = session["metadata"]
+            apply_checkout_completed(find_payment(session["id"], meta), session["id"], meta)
+            db.session.commit()
+
+    def retrieve(session_id):
+        time.sleep(args.lookup_latency_ms / 1000.0)
+        session = sessions[session_id]
+        if session_id in racing:
+            webhook_confirms(session)
+        return session
+
+    with app.app_context():
+        stats = reconcile_stale_payments(
+            retrieve=retrieve, min_age_minutes=60, batch_size=args.batch_size, concurrency=args.concurrency,
+        )
+
+    with app.app_context():
+        statuses = dict(db.session.query(Payment.status, db.func.count()).group_by(Payment.status).all())
+        booked = dict(
+            db.session.query(Booking.slot_id, db.func.count())
+            .filter(Booking.status == "CONFIRMED").group_by(Booking.slot_id).all()
+        )
+        unlinked = Payment.query.filter(Payment.status == "PAID", Payment.booking_id.is_(None)).count()
+
+    result = {
+        "benchmark": "reconcile",
+        "db_path": db_path,
+        "payments": args.payments,
+        "raced_with_webhook": len(racing),
+        "batch_size": args.batch_size,
+        "concurrency": args.concurrency,
+        "lookup_latency_ms": args.lookup_latency_ms,
+        "stats": stats,
+        "final_statuses": statuses,
+        "paid_without_booking": unlinked,
+    }
+    report(result, args.out)
+
+    problems = []
+    if statuses.get("PAID", 0) != args.payments:
+        problems.append(f"{args.payments - statuses.get('PAID', 0)} payment(s) did not end PAID")
+    if len(booked) != args.payments or any(n != 1 for n in booked.values()):
+        problems.append("not every slot has exactly one confirmed booking")
+    if unlinked:
+        problems.append(f"{unlinked} PAID payment(s) without a booking")
+    if problems:
+        sys.exit("; ".join(problems))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Concurrent read/write throughput: SQLITE_PROFILE=default vs production.
+
+Each profile runs in its own process on a fresh SQLite file (the engine is
+built when the app is created, so the profile cannot change in-process).
+--threads workers run for --duration seconds; each request is either a read
+(anonymous GET /public/slots for one day) or, with probability --write-ratio,
+a write: an authenticated GET /bookings/me (session touch + commit) followed
+by POST /payments/start (payment row + audit row, fake provider). Errors are
+mostly "database is locked" 500s. Environment variables such as
+SQLITE_WRITE_QUEUE=false or SQLITE_BUSY_TIMEOUT_MS=50 pass through to both runs.
+
+    python benchmarks/bench_sqlite_profile.py --threads 16 --duration 10 --write-ratio 0.3
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from common import authed_client, make_app, report, run_threads, seed_players_and_slots, summarize
+
+PROFILES = ("default", "production")
+
+
+def run_profile(args) -> dict:
+    os.environ["SQLITE_PROFILE"] = args.run_profile
+    os.environ.setdefault("STRIPE_SUCCESS_URL", "http://localhost/pay/success")
+    os.environ.setdefault("STRIPE_CANCEL_URL", "http://localhost/pay/cancel")
+    app, db_path = make_app(PAYMENT_PROVIDER="fake", QUERY_STATS_ENABLED=False)
+    app.logger.disabled = True
+    tokens, slot_ids = seed_players_and_slots(app, players=args.threads, slots=args.slots)
+    engine = app.extensions.get("engine_profile")
+
+    with app.app_context():
+        from models.slot import Slot
+
+        first = Slot.query.order_by(Slot.start_time).first().start_time.date().isoformat()
+
+    latencies = {"read": [], "write": []}
+    errors = {"read": 0, "write": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def worker(i):
+        rng = random.Random(i)
+        client, headers = authed_client(app, tokens[i])
+        anon = app.test_client()
+        while time.perf_counter() < deadline:
+            kind = "write" if rng.random() < args.write_ratio else "read"
+            t0 = time.perf_counter()
+            try:
+                if kind == "read":
+                    ok = anon.get(f"/public/slots?date={first}").status_code == 200
+                else:
+                    ok = client.get("/bookings/me").status_code == 200
+                    ok = client.post("/payments/start", json={"slot_id": rng.choice(slot_ids)}, headers=headers).status_code in (200, 409) and ok
+            except Exception:
+                ok = False
+            dt = time.perf_counter() - t0
+            with lock:
+                latencies[kind].append(dt)
+                if not ok:
+                    errors[kind] += 1
+
+    elapsed = run_threads(worker, args.threads)
+    return {
+        "profile": args.run_profile,
+        "engine": engine,
+        "read": summarize(latencies["read"], elapsed, errors["read"]),
+        "write": summarize(latencies["write"], elapsed, errors["write"]),
+        "total_rps": round((len(latencies["read"]) + len(latencies["write"])) / elapsed, 1),
+        "write_queue": app.extensions["write_queue"].snapshot() if "write_queue" in app.extensions else None,
+        "db_path": db_path,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    parser.add_argument("--slots", type=int, default=48)
+    parser.add_argument("--out", help="write the JSON summary to this file")
+    parser.add_argument("--run-profile", choices=PROFILES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_profile:
+        print(json.dumps(run_profile(args)))
+        return
+
+    result = {"threads": args.threads, "duration_s": args.duration, "write_ratio": args.write_ratio, "profiles": {}}
+    for profile in PROFILES:
+        cmd = [sys.executable, os.path.abspath(__file__), "--run-profile", profile,
+               "--threads", str(args.threads), "--duration", str(args.duration),
+               "--write-ratio", str(args.write_ratio), "--slots", str(args.slots)]
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        result["profiles"][profile] = json.loads(out.strip().splitlines()[-1])
+
+    base, prod = result["profiles"]["default"], result["profiles"]["production"]
+    result["speedup_total_rps"] = round(prod["total_rps"] / base["total_rps"], 2) if base["total_rps"] else None
+    report(result, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Commits per request with and without the request-scoped unit of work.
+
+Runs the same requests with UNIT_OF_WORK_ENABLED off (every helper commits)
+and on (one commit at the end of the request), counting COMMITs of write
+transactions, SQL statements and latency per request. Audit rows written
+in each mode are compared so the saving is not bought by dropping writes.
+
+    python benchmarks/bench_unit_of_work.py --repeat 50
+"""
+import argparse
+import itertools
+import sys
+import time
+
+from common import authed_client, make_app, report, seed_players_and_slots, summarize
+
+PASSWORD = "Bench-Passw0rd!2026"
+_names = itertools.count(1)   # shared by both modes: court names must stay unique
+
+
+def scenarios(app, tokens):
+    client, headers = authed_client(app, tokens[0])
+    anon = app.test_client()
+    nth = lambda: next(_names)
+
+    return {
+        "GET /bookings/me (session touch)": lambda: client.get("/bookings/me"),
+        "POST /auth/profile": lambda: client.post("/auth/profile", json={"full_name": f"Player {nth()}"}, headers=headers),
+        "POST /support/messages": lambda: client.post("/support/messages", json={"message": "hello"}, headers=headers),
+        "POST /courts/register": lambda: client.post("/courts/register", json={"name": f"Bench Court {nth()}", "location": "Bench"}, headers=headers),
+        "POST /auth/login (wrong password)": lambda: anon.post("/auth/login", json={"email": "player1@bench.local", "password": "wrong"}),
+        "POST /auth/login (OTP sent)": lambda: anon.post("/auth/login", json={"email": "player2@bench.local", "password": PASSWORD}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--out", help="write the JSON summary to this file")
+    args = parser.parse_args()
+
+    app, db_path = make_app(
+        EMAIL_BACKEND="memory",
+        LOGIN_RATE_MAX_REQUESTS=10**9,
+        MAX_LOGIN_ATTEMPTS=10**9,
+        QUERY_STATS_HEADERS=False,
+    )
+    tokens, _ = seed_players_and_slots(app, players=3, slots=1)
+
+    from models import db
+    from models.audit_log import AuditLog
+    from models.user import User
+    from security.password import hash_password
+    from utils.query_stats import count_queries
+
+    with app.app_context():
+        User.query.filter_by(email="player2@bench.local").update({"password_hash": hash_password(PASSWORD)})
+        db.session.commit()
+
+    def audit_rows():
+        with app.app_context():
+            return AuditLog.query.count()
+
+    result = {"repeat": args.repeat, "db_path": db_path, "modes": {}}
+    for mode, enabled in (("per_helper_commits", False), ("unit_of_work", True)):
+        app.config["UNIT_OF_WORK_ENABLED"] = enabled
+        audit_before = audit_rows()
+        rows = {}
+        for name, call in scenarios(app, tokens).items():
+            commits, queries, latencies = 0, 0, []
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                with count_queries() as stats:
+                    resp = call()
+                latencies.append(time.perf_counter() - t0)
+                assert resp.status_code < 500, (name, resp.status_code, resp.get_data(as_text=True)[:200])
+                commits += stats.commits
+                queries += stats.count
+            rows[name] = {
+                "status": resp.status_code,
+                "commits_per_request": round(commits / args.repeat, 2),
+                "queries_per_request": round(queries / args.repeat, 2),
+                **summarize(latencies, time.perf_counter() - started),
+            }
+        result["modes"][mode] = {"requests": rows, "audit_rows_written": audit_rows() - audit_before}
+
+    before, after = result["modes"]["per_helper_commits"], result["modes"]["unit_of_work"]
+    total_before = sum(r["commits_per_request"] for r in before["requests"].values())
+    total_after = sum(r["commits_per_request"] for r in after["requests"].values())
+    result["commit_reduction"] = round(total_before / total_after, 2) if total_after else None
+    report(result, args.out)
+
+    print(f"\n{'request':36} {'commits before':>14} {'after':>6}")
+    for name in before["requests"]:
+        print(f"{name:36} {before['requests'][name]['commits_per_request']:>14} {after['requests'][name]['commits_per_request']:>6}")
+    if before["audit_rows_written"] != after["audit_rows_written"]:
+        sys.exit("audit rows differ between modes: staged writes were lost")
+
+
+if __name__ == "__main__":
+    main()
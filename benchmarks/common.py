@@ -0,0 +1,140 @@
+"""
+Shared helpers for the scripts in benchmarks/.
+
+Benchmarks run the real Flask app (create_app) against a throwaway SQLite
+file, so they must configure DATABASE_URL before `app`/`config` are imported.
+"""
+import json
+import os
+import secrets
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def make_app(db_path: str | None = None, **config):
+    """Creates the app on a fresh SQLite file with all tables and default roles."""
+    if db_path is None:
+        fd, db_path = tempfile.mkstemp(prefix="futsalslot-bench-", suffix=".db")
+        os.close(fd)
+        os.remove(db_path)
+    os.environ["DATABASE_URL"] = "sqlite:///" + db_path
+
+    from app import create_app
+    from models import db
+    from utils.seed import seed_roles
+
+    app = create_app()
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ["DATABASE_URL"]
+    if config.get("PAYMENT_PROVIDER") == "fake":
+        # the fake provider is refused outside debug/testing without a webhook secret
+        config.setdefault("FAKE_STRIPE_WEBHOOK_SECRET", "whsec_bench_" + secrets.token_hex(16))
+    app.config.update(config)
+    with app.app_context():
+        db.create_all()
+        seed_roles()
+    return app, db_path
+
+
+def seed_players_and_slots(app, players: int, slots: int, price: int = 1500):
+    """
+    Inserts `players` users with a live session each and one verified court
+    with `slots` future slots. Returns (session_tokens, slot_ids).
+    """
+    from models import db
+    from models.court import Court
+    from models.session import Session
+    from models.slot import Slot
+    from models.user import User
+    from security.session import _hash_token
+
+    now = datetime.utcnow()
+    with app.app_context():
+        owner = User(email="owner@bench.local", password_hash="x", full_name="Owner", phone_number="9800000000")
+        db.session.add(owner)
+        db.session.flush()
+        court = Court(
+            name="Bench Court",
+            location="Bench",
+            name_normalized="bench court",
+            location_normalized="bench",
+            owner_user_id=owner.id,
+            status="VERIFIED",
+        )
+        db.session.add(court)
+        db.session.flush()
+
+        tokens = []
+        for i in range(players):
+            user = User(email=f"player{i}@bench.local", password_hash="x", full_name=f"Player {i}", phone_number=f"97{i:08d}")
+            db.session.add(user)
+            db.session.flush()
+            token = f"bench-token-{i}"
+            db.session.add(Session(user_id=user.id, token_hash=_hash_token(token), expires_at=now + timedelta(hours=8)))
+            tokens.append(token)
+
+        start = datetime(now.year, now.month, now.day) + timedelta(days=2)
+        slot_rows = [
+            Slot(court_id=court.id, start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i + 1), price=price)
+            for i in range(slots)
+        ]
+        db.session.add_all(slot_rows)
+        db.session.commit()
+        return tokens, [s.id for s in slot_rows]
+
+
+def authed_client(app, token: str):
+    """Test client carrying a session cookie and a matching CSRF cookie/header pair."""
+    client = app.test_client()
+    client.set_cookie(app.config.get("AUTH_COOKIE_NAME", "futsalslot_session"), token)
+    client.set_cookie("csrf_token", "bench-csrf")
+    return client, {"X-CSRF-Token": "bench-csrf"}
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(latencies_s, elapsed_s: float, errors: int = 0) -> dict:
+    values = sorted(v * 1000.0 for v in latencies_s)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / elapsed_s, 1) if elapsed_s else 0.0,
+        "mean_ms": round(statistics.fmean(values), 2) if values else 0.0,
+        "p50_ms": round(percentile(values, 50), 2),
+        "p95_ms": round(percentile(values, 95), 2),
+        "p99_ms": round(percentile(values, 99), 2),
+        "max_ms": round(values[-1], 2) if values else 0.0,
+    }
+
+
+def run_threads(worker, threads: int):
+    """Runs worker(index) on `threads` threads; returns wall time in seconds."""
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return time.perf_counter() - started
+
+
+def report(result: dict, out_path: str | None = None):
+    text = json.dumps(result, indent=2, sort_keys=True)
+    print(text)
+    if out_path:
+        with open(out_path, "w") as fh:
+            fh.write(text + "\n")
@@ -0,0 +1,371 @@
+"""
+Mixed-endpoint load test against create_app() and a generated dataset.
+
+Seeds a deterministic dataset (courts with owners, slots, players with live
+sessions, some confirmed bookings), then runs --threads virtual users for
+--duration seconds. Each one picks scenarios by weight:
+
+    public_slots     GET  /public/slots?court_id=&date=
+    court_search     GET  /courts?name=|location=
+    login            POST /auth/login  +  POST /auth/otp/verify   (OTP read from the memory email backend)
+    payment          POST /payments/start  +  fake Stripe webhook POST /webhooks/stripe
+    my_bookings      GET  /bookings/me
+    owner_dashboard  GET  /admin/courts/dashboard
+    owner_analytics  GET  /admin/courts/analytics
+
+Per endpoint it reports requests, status counts, throughput and latency
+percentiles as JSON (--out). Each run records the git revision; pass
+--compare to diff against an earlier run.
+
+    python benchmarks/loadtest.py --threads 16 --duration 30 --out load-$(git rev-parse --short HEAD).json
+    python benchmarks/loadtest.py --compare load-abc1234.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from common import ROOT, authed_client, make_app, report, summarize
+
+PASSWORD = "Bench-Passw0rd!2026"
+
+DEFAULT_MIX = {
+    "public_slots": 30,
+    "court_search": 15,
+    "login": 5,
+    "payment": 10,
+    "my_bookings": 15,
+    "owner_dashboard": 15,
+    "owner_analytics": 10,
+}
+
+LOCATIONS = ("Kathmandu", "Lalitpur", "Bhaktapur", "Pokhara", "Chitwan", "Butwal", "Dharan", "Biratnagar")
+
+
+def parse_mix(text: str | None) -> dict:
+    if not text:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise SystemExit(f"unknown scenario {name!r}; choose from {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def git_revision() -> dict:
+    def run(*cmd):
+        try:
+            return subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip()
+        except Exception:
+            return ""
+
+    return {"commit": run("git", "rev-parse", "--short", "HEAD"), "dirty": bool(run("git", "status", "--porcelain", "--untracked-files=no"))}
+
+
+def seed_dataset(app, *, courts: int, slots_per_court: int, players: int, login_users: int, booked_ratio: float, seed: int) -> dict:
+    """Deterministic dataset for the load test. Returns the handles the scenarios need."""
+    from models import db
+    from models.booking import Booking
+    from models.court import Court
+    from models.payment import Payment
+    from models.session import Session
+    from models.slot import Slot
+    from models.user import Role, User
+    from security.password import hash_password
+    from security.session import _hash_token
+    from utils.court_stats import verify_court_stats
+    from utils.rollups import mark_all_dirty, refresh_rollups
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    today = datetime(now.year, now.month, now.day)
+    password_hash = hash_password(PASSWORD)  # bcrypt once, shared by every user
+
+    with app.app_context():
+        roles = {r.name: r for r in Role.query.all()}
+        owner_tokens, player_tokens, login_emails = [], [], []
+        court_ids = []
+
+        for i in range(courts):
+            owner = User(email=f"owner{i}@load.local", password_hash=password_hash, full_name=f"Owner {i}", phone_number=f"98{i:08d}")
+            owner.roles.append(roles["ADMIN"])
+            db.session.add(owner)
+            db.session.flush()
+            location = LOCATIONS[i % len(LOCATIONS)]
+            court = Court(
+                name=f"Futsal Arena {i}",
+                location=location,
+                name_normalized=f"futsal arena {i}",
+                location_normalized=location.lower(),
+                owner_user_id=owner.id,
+                status="VERIFIED",
+                verified_at=now,
+            )
+            db.session.add(court)
+            db.session.flush()
+            court_ids.append(court.id)
+            token = f"load-owner-{i}"
+            db.session.add(Session(user_id=owner.id, token_hash=_hash_token(token), expires_at=now + timedelta(hours=8)))
+            owner_tokens.append(token)
+
+        player_ids = []
+        for i in range(players + login_users):
+            user = User(email=f"player{i}@load.local", password_hash=password_hash, full_name=f"Player {i}", phone_number=f"97{i:08d}")
+            user.roles.append(roles["PLAYER"])
+            db.session.add(user)
+            db.session.flush()
+            if i < players:
+                token = f"load-player-{i}"
+                db.session.add(Session(user_id=user.id, token_hash=_hash_token(token), expires_at=now + timedelta(hours=8)))
+                player_tokens.append(token)
+                player_ids.append(user.id)
+            else:
+                # separate accounts: logging in revokes the user's other sessions
+                login_emails.append(user.email)
+        db.session.commit()
+
+        # slots: 06:00-22:00 hourly, from 7 days ago onwards
+        hours = list(range(6, 22))
+        free_slot_ids = []
+        for court_id in court_ids:
+            rows = []
+            for n in range(slots_per_court):
+                day = today + timedelta(days=n // len(hours) - 7)
+                start = day + timedelta(hours=hours[n % len(hours)])
+                rows.append(Slot(court_id=court_id, start_time=start, end_time=start + timedelta(hours=1), price=rng.choice((1200, 1500, 1800, 2000))))
+            db.session.add_all(rows)
+            db.session.flush()
+            for slot in rows:
+                if rng.random() < booked_ratio:
+                    user_id = rng.choice(player_ids)
+                    booking = Booking(user_id=user_id, slot_id=slot.id, status="CONFIRMED", created_at=slot.start_time - timedelta(days=1))
+                    db.session.add(booking)
+                    db.session.flush()
+                    db.session.add(Payment(
+                        booking_id=booking.id, slot_id=slot.id, user_id=user_id, amount=slot.price,
+                        currency="NPR", status="PAID", created_at=booking.created_at, paid_at=booking.created_at,
+                    ))
+                elif slot.start_time > now + timedelta(hours=1):
+                    free_slot_ids.append(slot.id)
+            db.session.commit()
+
+        verify_court_stats()
+        mark_all_dirty()
+        refresh_rollups()
+
+    rng.shuffle(free_slot_ids)
+    return {
+        "court_ids": court_ids,
+        "owner_tokens": owner_tokens,
+        "player_tokens": player_tokens,
+        "login_emails": login_emails,
+        "free_slot_ids": free_slot_ids,
+        "days": [(today + timedelta(days=d)).date().isoformat() for d in range(-7, slots_per_court // len(hours) - 7)],
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.lock = threading.Lock()
+
+    def record(self, endpoint: str, status: int, elapsed_s: float):
+        with self.lock:
+            self.latencies[endpoint].append(elapsed_s)
+            self.statuses[endpoint][status] += 1
+
+
+class VirtualUser:
+    def __init__(self, index: int, app, data: dict, recorder: Recorder, rng: random.Random, threads: int):
+        self.app = app
+        self.data = data
+        self.rec = recorder
+        self.rng = rng
+        self.player, self.player_headers = authed_client(app, data["player_tokens"][index % len(data["player_tokens"])])
+        self.owner, self.owner_headers = authed_client(app, data["owner_tokens"][index % len(data["owner_tokens"])])
+        self.login_email = data["login_emails"][index % len(data["login_emails"])]
+        self.free_slots = data["free_slot_ids"][index::threads]
+        self.ip = f"10.77.{index // 250}.{index % 250 + 1}"
+
+    def call(self, endpoint: str, client, method: str, path: str, **kwargs):
+        t0 = time.perf_counter()
+        resp = client.open(path, method=method, **kwargs)
+        self.rec.record(endpoint, resp.status_code, time.perf_counter() - t0)
+        return resp
+
+    def public_slots(self):
+        court_id = self.rng.choice(self.data["court_ids"])
+        day = self.rng.choice(self.data["days"])
+        self.call("GET /public/slots", self.app.test_client(), "GET", f"/public/slots?court_id={court_id}&date={day}")
+
+    def court_search(self):
+        if self.rng.random() < 0.5:
+            path = f"/courts?location={self.rng.choice(LOCATIONS)[:4]}"
+        else:
+            path = f"/courts?name=arena {self.rng.randrange(len(self.data['court_ids']))}"
+        self.call("GET /courts", self.app.test_client(), "GET", path)
+
+    def login(self):
+        from utils.emailer import last_message_to
+
+        client = self.app.test_client()
+        headers = {"X-Forwarded-For": self.ip}
+        resp = self.call("POST /auth/login", client, "POST", "/auth/login", json={"email": self.login_email, "password": PASSWORD}, headers=headers)
+        if resp.status_code != 200:
+            return
+        message = last_message_to(self.login_email)
+        code = message[2].split("code is ", 1)[1].split(".", 1)[0] if message else ""
+        self.call("POST /auth/otp/verify", client, "POST", "/auth/otp/verify", json={"otp_token": resp.get_json()["otp_token"], "code": code}, headers=headers)
+
+    def payment(self):
+        if not self.free_slots:
+            return
+        slot_id = self.free_slots.pop()
+        resp = self.call("POST /payments/start", self.player, "POST", "/payments/start", json={"slot_id": slot_id}, headers=self.player_headers)
+        if resp.status_code != 200:
+            return
+        with self.app.app_context():
+            from utils.payment_provider import get_provider
+
+            finished = get_provider().complete(resp.get_json()["checkout_url"].rsplit("/", 1)[-1])
+        if finished:
+            payload, sig = finished
+            self.call(
+                "POST /webhooks/stripe", self.app.test_client(), "POST", "/webhooks/stripe",
+                data=payload, headers={"Stripe-Signature": sig, "Content-Type": "application/json"},
+            )
+
+    def my_bookings(self):
+        self.call("GET /bookings/me", self.player, "GET", "/bookings/me")
+
+    def owner_dashboard(self):
+        self.call("GET /admin/courts/dashboard", self.owner, "GET", "/admin/courts/dashboard")
+
+    def owner_analytics(self):
+        group = "hour_of_week" if self.rng.random() < 0.3 else "day"
+        days = self.data["days"]
+        self.call("GET /admin/courts/analytics", self.owner, "GET", f"/admin/courts/analytics?from={days[0]}&to={days[-1]}&group={group}")
+
+
+def compare(current: dict, baseline_path: str) -> None:
+    with open(baseline_path) as fh:
+        base = json.load(fh)
+    print(f"\nvs {baseline_path} ({base.get('meta', {}).get('git', {}).get('commit', '?')}):")
+    print(f"{'endpoint':32} {'p50 ms':>16} {'p99 ms':>18} {'req/s':>16}")
+    for name, cur in sorted(current["endpoints"].items()):
+        old = base.get("endpoints", {}).get(name)
+        if not old:
+            print(f"{name:32} (new)")
+            continue
+
+        def cell(key, width):
+            a, b = old[key], cur[key]
+            pct = f"{(b - a) / a * 100:+.0f}%" if a else "n/a"
+            return f"{b:>8.2f} {pct:>{width - 9}}"
+
+        print(f"{name:32} {cell('p50_ms', 16)} {cell('p99_ms', 18)} {cell('throughput_rps', 16)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load after seeding")
+    parser.add_argument("--mix", help="scenario weights, e.g. public_slots=30,payment=10 (default: built-in mix)")
+    parser.add_argument("--courts", type=int, default=20)
+    parser.add_argument("--slots-per-court", type=int, default=16 * 28)
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--booked-ratio", type=float, default=0.35)
+    parser.add_argument("--stripe-latency-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write the JSON result to this file")
+    parser.add_argument("--compare", help="earlier result JSON to diff against")
+    args = parser.parse_args()
+
+    os.environ.setdefault("STRIPE_SUCCESS_URL", "http://localhost/pay/success")
+    os.environ.setdefault("STRIPE_CANCEL_URL", "http://localhost/pay/cancel")
+    app, db_path = make_app(
+        PAYMENT_PROVIDER="fake",
+        FAKE_STRIPE_LATENCY_MS=args.stripe_latency_ms,
+        EMAIL_BACKEND="memory",
+        NOTIFY_ASYNC=False,
+        LOGIN_RATE_MAX_REQUESTS=10**6,
+    )
+    mix = parse_mix(args.mix)
+
+    t0 = time.perf_counter()
+    data = seed_dataset(
+        app,
+        courts=args.courts,
+        slots_per_court=args.slots_per_court,
+        players=args.players,
+        login_users=args.threads,
+        booked_ratio=args.booked_ratio,
+        seed=args.seed,
+    )
+    seed_s = time.perf_counter() - t0
+
+    recorder = Recorder()
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    deadline = time.perf_counter() + args.duration
+
+    def worker(i):
+        user = VirtualUser(i, app, data, recorder, random.Random(args.seed * 1000 + i), args.threads)
+        while time.perf_counter() < deadline:
+            getattr(user, user.rng.choices(names, weights)[0])()
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    started_at = datetime.utcnow().isoformat(timespec="seconds") + "Z"
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        from utils.webhook_queue import wait_for_webhooks
+
+        wait_for_webhooks()
+
+    endpoints = {}
+    all_latencies = []
+    for name, values in sorted(recorder.latencies.items()):
+        statuses = recorder.statuses[name]
+        errors = sum(n for code, n in statuses.items() if code >= 500)
+        endpoints[name] = {**summarize(values, elapsed, errors), "status": {str(k): v for k, v in sorted(statuses.items())}}
+        all_latencies.extend(values)
+
+    result = {
+        "meta": {
+            "git": git_revision(),
+            "started_at": started_at,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "args": vars(args),
+            "mix": mix,
+            "seed_s": round(seed_s, 2),
+            "dataset": {"courts": len(data["court_ids"]), "players": len(data["player_tokens"]), "free_slots": len(data["free_slot_ids"])},
+        },
+        "overall": summarize(all_latencies, elapsed, sum(e["errors"] for e in endpoints.values())),
+        "endpoints": endpoints,
+    }
+    report(result, args.out)
+    if args.compare:
+        compare(result, args.compare)
+    os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -35,6 +35,139 @@ class Config:
     LOGIN_RATE_WINDOW_SECONDS = 60      # window size
     LOGIN_RATE_MAX_REQUESTS = 15        # max login requests per IP per window
 
+    # Payment provider: "stripe", or "fake" for the in-process fake used in load tests
+    PAYMENT_PROVIDER = os.getenv("PAYMENT_PROVIDER", "stripe")
+    PAYMENT_PROVIDER_CONNECT_TIMEOUT = float(os.getenv("PAYMENT_PROVIDER_CONNECT_TIMEOUT", "3"))   # seconds
+    PAYMENT_PROVIDER_READ_TIMEOUT = float(os.getenv("PAYMENT_PROVIDER_READ_TIMEOUT", "15"))        # seconds
+    PAYMENT_PROVIDER_POOL_SIZE = int(os.getenv("PAYMENT_PROVIDER_POOL_SIZE", "10"))                # keep-alive connections
+    PAYMENT_PROVIDER_MAX_RETRIES = int(os.getenv("PAYMENT_PROVIDER_MAX_RETRIES", "1"))
+    # PAYMENT_PROVIDER=fake signs its webhooks with this (or STRIPE_WEBHOOK_SECRET); without either it is refused
+    # unless DEBUG/TESTING, since the built-in local key is public and would let anyone forge a paid checkout
+    FAKE_STRIPE_WEBHOOK_SECRET = os.getenv("FAKE_STRIPE_WEBHOOK_SECRET")
+    FAKE_STRIPE_LATENCY_MS = float(os.getenv("FAKE_STRIPE_LATENCY_MS", "0"))
+    FAKE_STRIPE_REPLAY_RATE = float(os.getenv("FAKE_STRIPE_REPLAY_RATE", "0"))    # webhook events/second, 0 = off
+    FAKE_STRIPE_EXPIRE_RATIO = float(os.getenv("FAKE_STRIPE_EXPIRE_RATIO", "0"))  # share of sessions that expire
+
+    # Stripe checkout sessions expire after this (Stripe allows 30 min .. 24 h);
+    # repeated "Pay" clicks reuse an open session until shortly before expiry
+    STRIPE_CHECKOUT_TTL_MINUTES = int(os.getenv("STRIPE_CHECKOUT_TTL_MINUTES", "45"))
+    STRIPE_CHECKOUT_REUSE_MARGIN_SECONDS = 60
+
+    # Stripe webhooks are stored, acknowledged, then applied by worker threads
+    # (events of one payment always go to the same worker, in arrival order)
+    WEBHOOK_ASYNC = os.getenv("WEBHOOK_ASYNC", "true").lower() == "true"
+    WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "2"))
+    WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "5"))
+
+    # Reconciliation of INIT payments whose webhook never arrived
+    RECONCILE_MIN_AGE_MINUTES = int(os.getenv("RECONCILE_MIN_AGE_MINUTES", "60"))
+    RECONCILE_BATCH_SIZE = int(os.getenv("RECONCILE_BATCH_SIZE", "200"))
+    RECONCILE_CONCURRENCY = int(os.getenv("RECONCILE_CONCURRENCY", "8"))  # parallel provider lookups
+
+    # Basket checkout: max slots paid together in one Stripe session
+    BASKET_MAX_SLOTS = int(os.getenv("BASKET_MAX_SLOTS", "6"))
+
+    # Waitlist: how long a freed slot is held for the offered player(s)
+    WAITLIST_HOLD_MINUTES = int(os.getenv("WAITLIST_HOLD_MINUTES", "15"))
+    WAITLIST_OFFER_BATCH = int(os.getenv("WAITLIST_OFFER_BATCH", "1"))  # waiters offered per free slot
+
+    # Notifications are sent from a background thread in batches
+    NOTIFY_ASYNC = os.getenv("NOTIFY_ASYNC", "true").lower() == "true"
+    NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "50"))
+
+    # SQLite engine profile (utils/db_engine.py): "production" = WAL, synchronous=NORMAL,
+    # busy timeout, mmap and a larger page cache on every pooled connection; "default" = driver defaults
+    SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "production")
+    SQLITE_PROFILE_STRICT = os.getenv("SQLITE_PROFILE_STRICT", "false").lower() == "true"  # fail startup if WAL etc. not in effect
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))   # bytes
+    SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))   # per connection
+    SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "10"))
+    SQLITE_MAX_OVERFLOW = int(os.getenv("SQLITE_MAX_OVERFLOW", "10"))
+    SQLITE_POOL_TIMEOUT = float(os.getenv("SQLITE_POOL_TIMEOUT", "30"))   # seconds waiting for a pooled connection
+    # writers take turns through an in-process FIFO queue (no SQLITE_BUSY between threads);
+    # @read_only handlers use a separate pool of query_only connections (0 = off)
+    SQLITE_WRITE_QUEUE = os.getenv("SQLITE_WRITE_QUEUE", "true").lower() == "true"
+    SQLITE_WRITE_QUEUE_TIMEOUT = float(os.getenv("SQLITE_WRITE_QUEUE_TIMEOUT", "30"))   # seconds
+    SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "10"))
+
+    # Read replica: GET/HEAD requests to these blueprints read from SQLALCHEMY_BINDS["replica"];
+    # after a POST/PUT/PATCH/DELETE the client reads from the primary for REPLICA_STICKY_SECONDS
+    DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+    SQLALCHEMY_BINDS = {"replica": DATABASE_REPLICA_URL} if DATABASE_REPLICA_URL else {}
+    REPLICA_READ_BLUEPRINTS = ["booking", "court", "admin", "audit", "super_admin"]
+    REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+    REPLICA_STICKY_COOKIE = "futsalslot_rw"
+
+    # Request-scoped unit of work: session touch, audit rows and login counters are staged and
+    # committed once at the end of the request (utils/unit_of_work.py)
+    UNIT_OF_WORK_ENABLED = os.getenv("UNIT_OF_WORK_ENABLED", "true").lower() == "true"
+
+    # SQL instrumentation: statement count/time per request, N+1 warnings;
+    # X-DB-Queries/Server-Timing headers are added in debug mode or with QUERY_STATS_HEADERS
+    QUERY_STATS_ENABLED = os.getenv("QUERY_STATS_ENABLED", "true").lower() == "true"
+    QUERY_STATS_HEADERS = os.getenv("QUERY_STATS_HEADERS", "false").lower() == "true"
+    QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))  # same statement N times -> N+1 warning
+
+    # Prometheus /metrics: per-endpoint request counts, latency histograms, DB time, in-flight requests.
+    # With several workers set METRICS_MULTIPROC_DIR (shared, emptied on deploy); each worker writes its
+    # series there every METRICS_FLUSH_SECONDS and /metrics sums them. /metrics requires METRICS_TOKEN as a Bearer
+    # token and is a 404 while it is unset (except with DEBUG); the recording hooks run either way.
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")
+    METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+    METRICS_BUCKETS = os.getenv("METRICS_BUCKETS")   # comma-separated seconds, default 5ms..10s
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+    # Request profiling (utils/profiling.py): a random PROFILE_SAMPLE_RATE of requests, or any request with a
+    # valid X-Profile-Token (`flask profile-token`), is profiled into PROFILE_DIR (default <instance>/profiles)
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_MODE = os.getenv("PROFILE_MODE", "cprofile")   # "cprofile" (.prof pstats) or "sample" (.collapsed stacks)
+    PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1"))
+    PROFILE_DIR = os.getenv("PROFILE_DIR")
+    PROFILE_MAX_PROFILES = int(os.getenv("PROFILE_MAX_PROFILES", "200"))   # older profiles are deleted
+    PROFILE_SECRET = os.getenv("PROFILE_SECRET")   # signs X-Profile-Token; unset = the header is ignored
+    PROFILE_TRACEMALLOC = os.getenv("PROFILE_TRACEMALLOC", "false").lower() == "true"   # memory snapshot per profile
+    PROFILE_TRACEMALLOC_FRAMES = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "10"))
+
+    # Slow query log (utils/slow_queries.py): statements over SLOW_QUERY_MS are appended to SLOW_QUERY_LOG
+    # (default <instance>/slow_queries.jsonl) with EXPLAIN captured off the request thread; `flask slow-queries`
+    SLOW_QUERY_ENABLED = os.getenv("SLOW_QUERY_ENABLED", "true").lower() == "true"
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+    SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG")
+    SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+
+    # Request tracing (utils/tracing.py): spans for the request, SQL, bcrypt, email and payment provider calls, exported as
+    # OTLP/JSON lines to TRACE_FILE (default <instance>/traces.jsonl), or TRACE_EXPORTER=log / "module:factory".
+    # An inbound W3C traceparent sets the trace id; its sampled flag only counts with TRACE_TRUST_PARENT (behind a gateway).
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+    TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+    TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "0"))   # >0: record every request, keep unsampled ones this slow (or 5xx)
+    TRACE_TRUST_PARENT = os.getenv("TRACE_TRUST_PARENT", "false").lower() == "true"
+    TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "file")
+    TRACE_FILE = os.getenv("TRACE_FILE")
+    TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "500"))   # per trace; further spans are counted, not kept
+    TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "futsalslot-backend")
+
+    # Response compression (utils/compression.py): gzip, plus Brotli when the brotli package is installed.
+    # Bodies under COMPRESS_MIN_SIZE bytes and non-text mimetypes are sent as is; streamed responses are compressed per chunk.
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "true").lower() == "true"
+    COMPRESS_ALGORITHMS = os.getenv("COMPRESS_ALGORITHMS", "br,gzip")   # server preference when q-values tie
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "500"))
+    COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))         # gzip 1-9
+    COMPRESS_BR_LEVEL = int(os.getenv("COMPRESS_BR_LEVEL", "4"))   # brotli quality 0-11; 4 is fast enough per request
+    COMPRESS_MIMETYPES = [m.strip() for m in os.getenv("COMPRESS_MIMETYPES", "").split(",") if m.strip()] or None   # default: JSON/text/JS/XML/SVG
+
+    # Email blocklist: in-process snapshot refreshed when cache_versions.blocklist moves
+    BLOCKLIST_VERSION_CHECK_SECONDS = float(os.getenv("BLOCKLIST_VERSION_CHECK_SECONDS", "5"))
+    BLOCKLIST_BLOOM_FP_RATE = float(os.getenv("BLOCKLIST_BLOOM_FP_RATE", "0.01"))
+    BLOCKLIST_EXACT_MAX = int(os.getenv("BLOCKLIST_EXACT_MAX", "100000"))  # larger lists confirm Bloom hits in the DB
+
+    # Owner analytics rollups
+    ROLLUP_REFRESH_BATCH = int(os.getenv("ROLLUP_REFRESH_BATCH", "500"))   # dirty court-days rebuilt per commit
+    ROLLUP_MAX_RANGE_DAYS = int(os.getenv("ROLLUP_MAX_RANGE_DAYS", "366"))
+
     #Cancellation policy
     CANCEL_CUTOFF_HOURS = 12
 
@@ -55,7 +188,8 @@ class Config:
     # Admin dashboard URL (used in verification emails)
     ADMIN_DASHBOARD_URL = os.getenv("ADMIN_DASHBOARD_URL")
 
-    # Email (SMTP)
+    # Email (SMTP); EMAIL_BACKEND=memory keeps messages in-process instead (local runs, load tests)
+    EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "smtp")
     SMTP_HOST = os.getenv("SMTP_HOST")
     SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
     SMTP_USERNAME = os.getenv("SMTP_USERNAME")
@@ -0,0 +1,44 @@
+"""link payment items to their bookings
+
+Revision ID: a3b4c5d6e7f8
+Revises: f2a3b4c5d6e7
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3b4c5d6e7f8'
+down_revision = 'f2a3b4c5d6e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('payment_items', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('booking_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_payment_items_booking_id'), ['booking_id'], unique=False)
+        batch_op.create_foreign_key('fk_payment_items_booking_id', 'bookings', ['booking_id'], ['id'])
+
+    # paid baskets: the confirmed booking of the item's slot made by the basket's user
+    op.execute(
+        """
+        UPDATE payment_items SET booking_id = (
+            SELECT bookings.id FROM bookings
+            JOIN payments ON payments.id = payment_items.payment_id
+            WHERE bookings.slot_id = payment_items.slot_id
+              AND bookings.user_id = payments.user_id
+              AND bookings.status = 'CONFIRMED'
+              AND payments.status = 'PAID'
+        )
+        """
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('payment_items', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_payment_items_booking_id', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_payment_items_booking_id'))
+        batch_op.drop_column('booking_id')
@@ -0,0 +1,34 @@
+"""add payment user and checkout session columns
+
+Revision ID: a7b8c9d0e1f2
+Revises: f6a7b8c9d0e1
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7b8c9d0e1f2'
+down_revision = 'f6a7b8c9d0e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('checkout_url', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('checkout_expires_at', sa.DateTime(), nullable=True))
+        batch_op.create_foreign_key('fk_payments_user_id_users', 'users', ['user_id'], ['id'])
+        batch_op.create_index('ix_payments_user_slot_status', ['user_id', 'slot_id', 'status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_index('ix_payments_user_slot_status')
+        batch_op.drop_constraint('fk_payments_user_id_users', type_='foreignkey')
+        batch_op.drop_column('checkout_expires_at')
+        batch_op.drop_column('checkout_url')
+        batch_op.drop_column('user_id')
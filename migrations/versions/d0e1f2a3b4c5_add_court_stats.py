@@ -0,0 +1,52 @@
+"""add court_stats counters
+
+Revision ID: d0e1f2a3b4c5
+Revises: c9d0e1f2a3b4
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd0e1f2a3b4c5'
+down_revision = 'c9d0e1f2a3b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'court_stats',
+        sa.Column('court_id', sa.Integer(), nullable=False),
+        sa.Column('slots', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('active_slots', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('confirmed_bookings', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()),
+        sa.Column('verified_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['court_id'], ['courts.id']),
+        sa.PrimaryKeyConstraint('court_id'),
+    )
+
+    # backfill from the source tables
+    op.execute(
+        """
+        INSERT INTO court_stats (court_id, slots, active_slots, confirmed_bookings, revenue, updated_at, verified_at)
+        SELECT c.id,
+               (SELECT COUNT(*) FROM slots s WHERE s.court_id = c.id),
+               (SELECT COUNT(*) FROM slots s WHERE s.court_id = c.id AND s.is_active = 1),
+               (SELECT COUNT(*) FROM bookings b JOIN slots s ON s.id = b.slot_id
+                 WHERE s.court_id = c.id AND b.status = 'CONFIRMED'),
+               (SELECT COALESCE(SUM(s.price), 0) FROM bookings b JOIN slots s ON s.id = b.slot_id
+                 WHERE s.court_id = c.id AND b.status = 'CONFIRMED'),
+               CURRENT_TIMESTAMP,
+               CURRENT_TIMESTAMP
+        FROM courts c
+        """
+    )
+
+
+def downgrade():
+    op.drop_table('court_stats')
@@ -0,0 +1,61 @@
+"""add court occupancy/revenue rollups
+
+Revision ID: e1f2a3b4c5d6
+Revises: d0e1f2a3b4c5
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1f2a3b4c5d6'
+down_revision = 'd0e1f2a3b4c5'
+branch_labels = None
+depends_on = None
+
+
+def _counter_columns():
+    return [
+        sa.Column('slots_offered', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('slots_booked', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('minutes_offered', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('minutes_booked', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Integer(), nullable=False, server_default='0'),
+    ]
+
+
+def upgrade():
+    op.create_table(
+        'court_daily_rollups',
+        sa.Column('court_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        *_counter_columns(),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['court_id'], ['courts.id'], ),
+        sa.PrimaryKeyConstraint('court_id', 'day'),
+    )
+    op.create_table(
+        'court_hourly_rollups',
+        sa.Column('court_id', sa.Integer(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        *_counter_columns(),
+        sa.ForeignKeyConstraint(['court_id'], ['courts.id'], ),
+        sa.PrimaryKeyConstraint('court_id', 'bucket_start'),
+    )
+    op.create_table(
+        'rollup_dirty_days',
+        sa.Column('court_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('marked_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['court_id'], ['courts.id'], ),
+        sa.PrimaryKeyConstraint('court_id', 'day'),
+    )
+    # existing history is picked up by `flask rollups-refresh --full`
+
+
+def downgrade():
+    op.drop_table('rollup_dirty_days')
+    op.drop_table('court_hourly_rollups')
+    op.drop_table('court_daily_rollups')
@@ -0,0 +1,41 @@
+"""add payment items for basket checkout
+
+Revision ID: e5f6a7b8c9d0
+Revises: 19bb135d75d2
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5f6a7b8c9d0'
+down_revision = '19bb135d75d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'payment_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('payment_id', sa.Integer(), nullable=False),
+        sa.Column('slot_id', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['payment_id'], ['payments.id'], ),
+        sa.ForeignKeyConstraint(['slot_id'], ['slots.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('payment_id', 'slot_id', name='uq_payment_item_slot')
+    )
+    with op.batch_alter_table('payment_items', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_payment_items_payment_id'), ['payment_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_payment_items_slot_id'), ['slot_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('payment_items', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_payment_items_slot_id'))
+        batch_op.drop_index(batch_op.f('ix_payment_items_payment_id'))
+
+    op.drop_table('payment_items')
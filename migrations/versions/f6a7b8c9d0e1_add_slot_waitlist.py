@@ -0,0 +1,44 @@
+"""add slot waitlist
+
+Revision ID: f6a7b8c9d0e1
+Revises: e5f6a7b8c9d0
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6a7b8c9d0e1'
+down_revision = 'e5f6a7b8c9d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'slot_waitlist',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('slot_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('offered_at', sa.DateTime(), nullable=True),
+        sa.Column('hold_expires_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['slot_id'], ['slots.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('slot_id', 'user_id', name='uq_waitlist_slot_user')
+    )
+    with op.batch_alter_table('slot_waitlist', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_slot_waitlist_user_id'), ['user_id'], unique=False)
+        batch_op.create_index('ix_slot_waitlist_queue', ['slot_id', 'status', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('slot_waitlist', schema=None) as batch_op:
+        batch_op.drop_index('ix_slot_waitlist_queue')
+        batch_op.drop_index(batch_op.f('ix_slot_waitlist_user_id'))
+
+    op.drop_table('slot_waitlist')
@@ -12,3 +12,9 @@ from .blocked_email import BlockedEmail
 from .password_history import PasswordHistory
 from .support_message import SupportMessage
 from .login_otp import LoginOTP
+from .payment_item import PaymentItem
+from .waitlist_entry import WaitlistEntry
+from .webhook_event import WebhookEvent
+from .court_stats import CourtStats
+from .court_rollup import CourtDailyRollup, CourtHourlyRollup, RollupDirtyDay
+from .cache_version import CacheVersion
@@ -0,0 +1,11 @@
+from datetime import datetime
+from models.db import db
+
+class CacheVersion(db.Model):
+    __tablename__ = "cache_versions"
+
+    # bumped in the same transaction as the data an in-process cache mirrors;
+    # workers compare it with the version they loaded and reload on change
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
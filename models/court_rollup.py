@@ -0,0 +1,41 @@
+from datetime import datetime
+from models.db import db
+
+# Occupancy/revenue rollups for owner analytics (see utils/rollups.py).
+# A slot counts in the bucket of its start_time; occupancy = minutes_booked / minutes_offered.
+
+class CourtDailyRollup(db.Model):
+    __tablename__ = "court_daily_rollups"
+
+    court_id = db.Column(db.Integer, db.ForeignKey("courts.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+
+    slots_offered = db.Column(db.Integer, nullable=False, default=0)
+    slots_booked = db.Column(db.Integer, nullable=False, default=0)
+    minutes_offered = db.Column(db.Integer, nullable=False, default=0)
+    minutes_booked = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Integer, nullable=False, default=0)   # same unit as Payment.amount
+
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class CourtHourlyRollup(db.Model):
+    __tablename__ = "court_hourly_rollups"
+
+    court_id = db.Column(db.Integer, db.ForeignKey("courts.id"), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)   # start_time truncated to the hour
+
+    slots_offered = db.Column(db.Integer, nullable=False, default=0)
+    slots_booked = db.Column(db.Integer, nullable=False, default=0)
+    minutes_offered = db.Column(db.Integer, nullable=False, default=0)
+    minutes_booked = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Integer, nullable=False, default=0)
+
+
+class RollupDirtyDay(db.Model):
+    __tablename__ = "rollup_dirty_days"
+
+    # (court, day) whose rollups must be rebuilt by the next refresh
+    court_id = db.Column(db.Integer, db.ForeignKey("courts.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    marked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,16 @@
+from datetime import datetime
+from models.db import db
+
+class CourtStats(db.Model):
+    __tablename__ = "court_stats"
+
+    # one row per court, maintained incrementally (see utils/court_stats.py)
+    court_id = db.Column(db.Integer, db.ForeignKey("courts.id"), primary_key=True)
+
+    slots = db.Column(db.Integer, nullable=False, default=0)
+    active_slots = db.Column(db.Integer, nullable=False, default=0)
+    confirmed_bookings = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Integer, nullable=False, default=0)   # same unit as Slot.price
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    verified_at = db.Column(db.DateTime, nullable=True)
@@ -1,3 +1,33 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as _Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
 
-db = SQLAlchemy()
+
+class Session(_Session):
+    """
+    Reads go to info["read_engine"] when a request hook or @read_only chose one
+    (replica bind, SQLite read-only pool). Flushes and INSERT/UPDATE/DELETE
+    always use the primary, and once the session has written, its later reads
+    do too (read-your-writes within the request).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self.info.get("pinned"):
+            if self._flushing or isinstance(clause, UpdateBase):
+                self.info["pinned"] = self.info["writing"] = True
+            else:
+                engine = self.info.get("read_engine")
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _transaction_over(session):
+    # "pinned" stays for the request; "writing" only until the writes are committed/rolled back
+    session.info.pop("writing", None)
+
+
+db = SQLAlchemy(session_options={"class_": Session})
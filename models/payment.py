@@ -7,6 +7,7 @@ class Payment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     booking_id = db.Column(db.Integer, db.ForeignKey("bookings.id"), nullable=True, index=True)
     slot_id = db.Column(db.Integer, db.ForeignKey("slots.id"), nullable=True, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
 
     provider = db.Column(db.String(20), nullable=False, default="STRIPE")
     amount = db.Column(db.Integer, nullable=False)   # smallest unit
@@ -14,6 +15,18 @@ class Payment(db.Model):
 
     status = db.Column(db.String(20), nullable=False, default="INIT")  # INIT, PAID, FAILED
     stripe_session_id = db.Column(db.String(255), nullable=True, unique=True, index=True)
+    checkout_url = db.Column(db.Text, nullable=True)
+    checkout_expires_at = db.Column(db.DateTime, nullable=True)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     paid_at = db.Column(db.DateTime, nullable=True)
+
+    # basket checkouts (slot_id is NULL) carry one item per slot
+    items = db.relationship("PaymentItem", backref="payment", cascade="all, delete-orphan", lazy=True)
+
+    __table_args__ = (
+        # Open checkout lookup for repeated "Pay" clicks
+        db.Index("ix_payments_user_slot_status", "user_id", "slot_id", "status"),
+        # Reconciliation scans: stale INIT payments oldest first
+        db.Index("ix_payments_status_created", "status", "created_at", "id"),
+    )
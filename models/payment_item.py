@@ -0,0 +1,17 @@
+from models.db import db
+
+class PaymentItem(db.Model):
+    __tablename__ = "payment_items"
+
+    id = db.Column(db.Integer, primary_key=True)
+    payment_id = db.Column(db.Integer, db.ForeignKey("payments.id"), nullable=False, index=True)
+    slot_id = db.Column(db.Integer, db.ForeignKey("slots.id"), nullable=False, index=True)
+    # set when the basket is paid; cancelling that booking removes the item from the basket
+    booking_id = db.Column(db.Integer, db.ForeignKey("bookings.id"), nullable=True, index=True)
+
+    amount = db.Column(db.Integer, nullable=False)   # same unit as Payment.amount
+
+    __table_args__ = (
+        # A basket can only contain each slot once
+        db.UniqueConstraint("payment_id", "slot_id", name="uq_payment_item_slot"),
+    )
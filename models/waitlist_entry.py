@@ -0,0 +1,23 @@
+from datetime import datetime
+from models.db import db
+
+class WaitlistEntry(db.Model):
+    __tablename__ = "slot_waitlist"
+
+    id = db.Column(db.Integer, primary_key=True)
+    slot_id = db.Column(db.Integer, db.ForeignKey("slots.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+
+    status = db.Column(db.String(20), nullable=False, default="WAITING")
+    # status values: WAITING, OFFERED, CLAIMED, EXPIRED, LEFT
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    offered_at = db.Column(db.DateTime, nullable=True)
+    hold_expires_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # One queue position per player per slot
+        db.UniqueConstraint("slot_id", "user_id", name="uq_waitlist_slot_user"),
+        # Queue pop: WAITING entries of a slot in arrival order
+        db.Index("ix_slot_waitlist_queue", "slot_id", "status", "created_at"),
+    )
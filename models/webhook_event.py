@@ -0,0 +1,25 @@
+from datetime import datetime
+from models.db import db
+
+class WebhookEvent(db.Model):
+    __tablename__ = "webhook_events"
+
+    # provider event id (Stripe "evt_..."): a retried delivery is a primary-key hit
+    id = db.Column(db.String(255), primary_key=True)
+    provider = db.Column(db.String(20), nullable=False, default="STRIPE")
+    type = db.Column(db.String(80), nullable=False)
+    payment_id = db.Column(db.Integer, nullable=True, index=True)
+    payload = db.Column(db.Text, nullable=False)
+
+    status = db.Column(db.String(20), nullable=False, default="PENDING")
+    # status values: PENDING, PROCESSED, FAILED, IGNORED
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.String(255), nullable=True)
+
+    received_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # Drain/recovery scans: unprocessed events in arrival order
+        db.Index("ix_webhook_events_status_received", "status", "received_at"),
+    )
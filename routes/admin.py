@@ -1,15 +1,18 @@
 from datetime import datetime, timedelta
 from flask import Blueprint, jsonify, g, request, current_app
+from sqlalchemy.orm import selectinload
 from security.rbac import require_roles
 from utils.audit import log_event
+from utils.unit_of_work import commit_request
 from models import db
 from models.user import User, Role
 from models.court import Court
 from models.slot import Slot
 from models.booking import Booking
-from models.blocked_email import BlockedEmail
 from utils.emailer import send_email
-from utils.blocklist import normalize_email
+from utils.blocklist import normalize_email, snapshot as blocklist_snapshot
+from utils.court_stats import stats_for
+from utils.rollups import daily_series, hour_of_week_series, pending_days, totals
 from utils.roles import filter_role_names
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
@@ -38,15 +41,8 @@ def admin_courts_dashboard():
     if not courts:
         return jsonify(error="No court registration found"), 404
 
-    court_ids = [c.id for c in courts]
-    slot_count = Slot.query.filter(Slot.court_id.in_(court_ids)).count() if court_ids else 0
-    booking_count = (
-        Booking.query
-        .join(Slot, Booking.slot_id == Slot.id)
-        .join(Court, Slot.court_id == Court.id)
-        .filter(Court.id.in_(court_ids))
-        .count()
-    )
+    # counters are maintained incrementally: one primary-key lookup per page view
+    per_court = stats_for([c.id for c in courts])
 
     log_event("ADMIN_COURT_DASHBOARD_VIEW", user_id=g.user.id)
     return jsonify(
@@ -62,13 +58,16 @@ def admin_courts_dashboard():
                 "created_at": c.created_at.isoformat(),
                 "verified_at": c.verified_at.isoformat() if c.verified_at else None,
                 "rejected_reason": c.rejected_reason,
+                "stats": per_court.get(c.id),
             }
             for c in courts
         ],
         stats={
             "courts": len(courts),
-            "slots": slot_count,
-            "bookings": booking_count,
+            "slots": sum(v["slots"] for v in per_court.values()),
+            "active_slots": sum(v["active_slots"] for v in per_court.values()),
+            "bookings": sum(v["confirmed_bookings"] for v in per_court.values()),
+            "revenue": sum(v["revenue"] for v in per_court.values()),
         },
     ), 200
 
@@ -117,6 +116,54 @@ def admin_courts_bookings():
     ]), 200
 
 
+@admin_bp.get("/courts/analytics")
+@require_roles("ADMIN")
+def admin_courts_analytics():
+    """
+    Occupancy and revenue for the caller's courts over a date range, served
+    from the rollup tables: ?from=YYYY-MM-DD&to=YYYY-MM-DD[&court_id=][&group=day|hour_of_week]
+    """
+    courts = _get_courts_for_admin(g.user)
+    if not courts:
+        return jsonify(error="No court registration found"), 404
+    court_ids = [c.id for c in courts]
+
+    court_id = request.args.get("court_id", type=int)
+    if court_id is not None:
+        if court_id not in court_ids:
+            return jsonify(error="Court not found"), 404
+        court_ids = [court_id]
+
+    try:
+        end = datetime.fromisoformat(request.args["to"]).date() if request.args.get("to") else datetime.utcnow().date()
+        start = datetime.fromisoformat(request.args["from"]).date() if request.args.get("from") else end - timedelta(days=29)
+    except ValueError:
+        return jsonify(error="Invalid date. Use YYYY-MM-DD"), 400
+    if start > end:
+        return jsonify(error="from must not be after to"), 400
+    max_days = current_app.config.get("ROLLUP_MAX_RANGE_DAYS", 366)
+    if (end - start).days + 1 > max_days:
+        return jsonify(error=f"Range too large (max {max_days} days)"), 400
+
+    group = (request.args.get("group") or "day").strip().lower()
+    if group == "day":
+        series = daily_series(court_ids, start, end)
+    elif group == "hour_of_week":
+        series = hour_of_week_series(court_ids, start, end)
+    else:
+        return jsonify(error="group must be day or hour_of_week"), 400
+
+    log_event("ADMIN_COURT_ANALYTICS_VIEW", user_id=g.user.id, metadata={"group": group})
+    return jsonify(
+        court_ids=court_ids,
+        range={"from": start.isoformat(), "to": end.isoformat()},
+        group=group,
+        buckets=series,
+        totals=totals(series),
+        pending_days=pending_days(court_ids),
+    ), 200
+
+
 @admin_bp.get("/users")
 @require_roles("ADMIN")
 def list_users():
@@ -125,8 +172,8 @@ def list_users():
     if role_filter:
         q = q.join(User.roles).filter(Role.name == role_filter)
 
-    users = q.order_by(User.created_at.desc()).limit(200).all()
-    blocked = {b.email_normalized for b in BlockedEmail.query.all()}
+    users = q.options(selectinload(User.roles)).order_by(User.created_at.desc()).limit(200).all()
+    blocked = blocklist_snapshot()
     return jsonify([
         {
             "id": u.id,
@@ -135,7 +182,7 @@ def list_users():
             "phone_number": u.phone_number,
             "roles": filter_role_names(u.roles),
             "created_at": u.created_at.isoformat(),
-            "blocked": normalize_email(u.email) in blocked,
+            "blocked": blocked.contains(normalize_email(u.email)),
         }
         for u in users
     ]), 200
@@ -175,7 +222,7 @@ def update_user_roles(user_id: int):
             return jsonify(error="Cannot remove the last ADMIN"), 403
 
     user.roles = available_roles
-    db.session.commit()
+    commit_request()
 
     log_event(
         "ADMIN_UPDATE_ROLES",
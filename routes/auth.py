@@ -9,6 +9,7 @@ from models.court import Court
 from security.password import hash_password, verify_password
 from security.session import create_session, revoke_session, revoke_all_sessions
 from utils.audit import log_event
+from utils.unit_of_work import commit_request
 from utils.auth_context import login_required
 from utils.blocklist import is_email_blocked
 from security.bruteforce import is_locked, register_failure, reset_attempts
@@ -116,7 +117,7 @@ def _start_login_otp(user: User, purpose: str) -> tuple[str | None, str | None]:
         db.session.rollback()
         return None, error or "Email not configured"
 
-    db.session.commit()
+    commit_request()
     return otp_token, None
 
 def _get_or_create_role(name: str) -> Role | None:
@@ -273,7 +274,7 @@ def register():
     if player_role:
         user.roles.append(player_role)
 
-    db.session.commit()
+    commit_request()
     log_event("REGISTER_SUCCESS", user_id=user.id)
 
     return jsonify(message="Registered successfully"), 201
@@ -645,7 +646,7 @@ def change_password():
     g.user.password_hash = hash_password(new_password)
     g.user.password_changed_at = datetime.utcnow()
 
-    db.session.commit()
+    commit_request()
     log_event("PASSWORD_CHANGED", user_id=g.user.id)
     return jsonify(message="Password updated"), 200
 
@@ -678,7 +679,7 @@ def update_profile():
             return jsonify(error="Invalid phone_number"), 400
         g.user.phone_number = phone_number.strip()
 
-    db.session.commit()
+    commit_request()
     log_event("PROFILE_UPDATE", user_id=g.user.id)
     return jsonify(
         message="Profile updated",
@@ -8,9 +8,15 @@ from models.slot import Slot
 from models.booking import Booking
 from models.user import User
 from models.payment import Payment
+from models.payment_item import PaymentItem
+from models.waitlist_entry import WaitlistEntry
 from security.rbac import require_roles, has_role
 from utils.auth_context import login_required
 from utils.audit import log_event
+from utils.unit_of_work import commit_request
+from utils.court_stats import on_bookings_cancelled, on_slot_created, on_slot_deactivated
+from utils.db_engine import read_only
+from utils.waitlist import offer_next
 
 booking_bp = Blueprint("booking", __name__)
 
@@ -83,7 +89,7 @@ def create_court():
     )
     db.session.add(c)
     try:
-        db.session.commit()
+        commit_request()
     except IntegrityError:
         db.session.rollback()
         return jsonify(error="Court already exists"), 409
@@ -129,6 +135,7 @@ def list_courts():
 
 
 @booking_bp.get("/booking/public/courts")
+@read_only
 def list_public_courts():
     owner_user_id = request.args.get("owner_user_id", type=int)
     location_query = (request.args.get("location") or "").strip()
@@ -197,10 +204,12 @@ def create_slot():
     slot = Slot(court_id=court_id, start_time=st, end_time=et, price=price)
     db.session.add(slot)
     try:
-        db.session.commit()
+        db.session.flush()
     except IntegrityError:
         db.session.rollback()
         return jsonify(error="Slot already exists for that court and time"), 409
+    on_slot_created(slot)
+    commit_request()
 
     log_event("SLOT_CREATE", user_id=g.user.id, entity="slot", entity_id=slot.id)
     return jsonify(id=slot.id), 201
@@ -256,6 +265,7 @@ def list_slots():
 
 
 @booking_bp.get("/public/slots")
+@read_only
 def list_public_slots():
     court_id = request.args.get("court_id", type=int)
     date_str = request.args.get("date")
@@ -309,6 +319,29 @@ def create_booking():
     ), 400
 
 
+def _release_payment(booking: Booking) -> None:
+    """
+    Drops what was paid for a cancelled booking: its single-slot payment, or
+    its item in a basket payment (the basket total shrinks; an emptied basket
+    is deleted like a single payment).
+    """
+    payment = Payment.query.filter_by(booking_id=booking.id).first()
+    if payment:
+        payment.status = "FAILED"
+        db.session.delete(payment)
+        return
+
+    item = PaymentItem.query.filter_by(booking_id=booking.id).first()
+    if not item:
+        return
+    basket = item.payment
+    basket.items.remove(item)   # delete-orphan
+    basket.amount -= item.amount
+    if not basket.items:
+        basket.status = "FAILED"
+        db.session.delete(basket)
+
+
 # ---------- PLAYERS: cancel booking ----------
 @booking_bp.post("/bookings/<int:booking_id>/cancel")
 @login_required
@@ -330,21 +363,106 @@ def cancel_booking(booking_id: int):
         if slot and (slot.start_time - datetime.utcnow()).total_seconds() < cutoff_hours * 3600:
             return jsonify(error=f"Cancellation not allowed within {cutoff_hours} hours of start"), 403
 
-    payment = Payment.query.filter_by(booking_id=booking.id).first()
-
     booking.status = "CANCELLED"
     booking.cancelled_at = datetime.utcnow()
     booking.cancel_reason = reason
-    if payment:
-        payment.status = "FAILED"
-        db.session.delete(payment)
+    _release_payment(booking)
     db.session.delete(booking)
+    on_bookings_cancelled([booking.slot_id])
     db.session.commit()
 
     log_event("BOOKING_CANCEL", user_id=g.user.id, entity="booking", entity_id=booking_id, metadata={"reason": reason})
+    offer_next(booking.slot_id)
     return jsonify(message="Cancelled"), 200
 
 
+# ---------- PLAYERS: waitlist for booked slots ----------
+@booking_bp.post("/slots/<int:slot_id>/waitlist")
+@login_required
+def join_waitlist(slot_id: int):
+    slot = Slot.query.get(slot_id)
+    if not slot or not slot.is_active:
+        return jsonify(error="Slot not found"), 404
+    if slot.start_time <= datetime.utcnow():
+        return jsonify(error="Slot already started"), 400
+
+    booking = Booking.query.filter_by(slot_id=slot.id, status="CONFIRMED").first()
+    if not booking:
+        return jsonify(error="Slot is available, book it instead"), 409
+    if booking.user_id == g.user.id:
+        return jsonify(error="You already booked this slot"), 409
+
+    entry = WaitlistEntry.query.filter_by(slot_id=slot.id, user_id=g.user.id).first()
+    if entry and entry.status in ("WAITING", "OFFERED"):
+        return jsonify(error="Already on the waitlist"), 409
+    if entry:
+        # re-joining goes to the back of the queue
+        entry.status = "WAITING"
+        entry.created_at = datetime.utcnow()
+        entry.offered_at = None
+        entry.hold_expires_at = None
+    else:
+        entry = WaitlistEntry(slot_id=slot.id, user_id=g.user.id, status="WAITING")
+        db.session.add(entry)
+    try:
+        commit_request()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify(error="Already on the waitlist"), 409
+
+    position = (
+        WaitlistEntry.query
+        .filter(
+            WaitlistEntry.slot_id == slot.id,
+            WaitlistEntry.status == "WAITING",
+            WaitlistEntry.created_at <= entry.created_at,
+        )
+        .count()
+    )
+
+    log_event("WAITLIST_JOIN", user_id=g.user.id, entity="slot", entity_id=slot.id)
+    return jsonify(id=entry.id, status=entry.status, position=position), 201
+
+
+@booking_bp.delete("/slots/<int:slot_id>/waitlist")
+@login_required
+def leave_waitlist(slot_id: int):
+    entry = WaitlistEntry.query.filter_by(slot_id=slot_id, user_id=g.user.id).first()
+    if not entry or entry.status not in ("WAITING", "OFFERED"):
+        return jsonify(error="Not on the waitlist"), 404
+
+    was_offered = entry.status == "OFFERED"
+    entry.status = "LEFT"
+    entry.hold_expires_at = None
+    db.session.commit()
+
+    log_event("WAITLIST_LEAVE", user_id=g.user.id, entity="slot", entity_id=slot_id)
+    if was_offered:
+        offer_next(slot_id)
+    return jsonify(message="Left waitlist"), 200
+
+
+@booking_bp.get("/waitlist/me")
+@login_required
+def my_waitlist():
+    rows = (
+        WaitlistEntry.query
+        .filter(WaitlistEntry.user_id == g.user.id, WaitlistEntry.status.in_(["WAITING", "OFFERED"]))
+        .order_by(WaitlistEntry.created_at.desc())
+        .all()
+    )
+    return jsonify([
+        {
+            "id": e.id,
+            "slot_id": e.slot_id,
+            "status": e.status,
+            "created_at": e.created_at.isoformat(),
+            "hold_expires_at": e.hold_expires_at.isoformat() if e.hold_expires_at else None,
+        }
+        for e in rows
+    ]), 200
+
+
 # ---------- PLAYERS: view my bookings ----------
 @booking_bp.get("/bookings/me")
 @login_required
@@ -393,8 +511,10 @@ def deactivate_slot(slot_id: int):
         if court.owner_user_id != g.user.id:
             return jsonify(error="Forbidden"), 403
 
-    slot.is_active = False
-    db.session.commit()
+    if slot.is_active:
+        slot.is_active = False
+        on_slot_deactivated(slot)
+    commit_request()
 
     log_event("SLOT_DEACTIVATE", user_id=g.user.id, entity="slot", entity_id=slot_id)
     return jsonify(message="Slot deactivated"), 200
@@ -450,16 +570,14 @@ def admin_cancel_booking(booking_id: int):
     if booking.status != "CONFIRMED":
         return jsonify(error="Booking not cancellable"), 400
 
-    payment = Payment.query.filter_by(booking_id=booking.id).first()
-
     booking.status = "CANCELLED"
     booking.cancelled_at = datetime.utcnow()
     booking.cancel_reason = reason
-    if payment:
-        payment.status = "FAILED"
-        db.session.delete(payment)
+    _release_payment(booking)
     db.session.delete(booking)
+    on_bookings_cancelled([booking.slot_id])
     db.session.commit()
 
     log_event("ADMIN_BOOKING_CANCEL", user_id=g.user.id, entity="booking", entity_id=booking_id, metadata={"reason": reason})
+    offer_next(booking.slot_id)
     return jsonify(message="Cancelled by admin"), 200
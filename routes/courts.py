@@ -5,6 +5,8 @@ from models.court import Court
 from models.support_message import SupportMessage
 from utils.auth_context import login_required
 from utils.audit import log_event
+from utils.unit_of_work import commit_request
+from utils.db_engine import read_only
 
 court_bp = Blueprint("court", __name__, url_prefix="/courts")
 
@@ -51,7 +53,7 @@ def register_court():
         status="PENDING",
     )
     db.session.add(court)
-    db.session.commit()
+    commit_request()
 
     log_event("COURT_REGISTER_SUBMIT", user_id=g.user.id, entity="court", entity_id=court.id)
     return jsonify(id=court.id, status=court.status), 201
@@ -91,6 +93,7 @@ def my_courts():
 
 
 @court_bp.get("")
+@read_only
 def list_public_courts():
     status = (request.args.get("status") or "VERIFIED").strip().upper()
     name_query = (request.args.get("name") or "").strip()
@@ -141,7 +144,7 @@ def create_support_message(court_id: int):
         status="OPEN",
     )
     db.session.add(msg)
-    db.session.commit()
+    commit_request()
 
     log_event("COURT_SUPPORT_MESSAGE_CREATE", user_id=g.user.id, entity="support_message", entity_id=msg.id)
     return jsonify(id=msg.id, status=msg.status), 201
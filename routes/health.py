@@ -1,7 +1,27 @@
-from flask import Blueprint, jsonify
+import hmac
+
+from flask import Blueprint, Response, current_app, jsonify, request
+
+from utils.metrics import render_metrics
 
 health_bp = Blueprint("health", __name__)
 
 @health_bp.get("/health")
 def health():
     return jsonify(status="ok")
+
+
+@health_bp.get("/metrics")
+def metrics():
+    # endpoint names and error rates are not public: without METRICS_TOKEN only debug serves them
+    token = current_app.config.get("METRICS_TOKEN")
+    if "metrics" not in current_app.extensions or (not token and not current_app.debug):
+        return jsonify(error="Not found"), 404
+    if token:
+        # checked before rendering, so unauthenticated scrapes never read the worker files
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return jsonify(error="Unauthorized"), 401
+
+    body = render_metrics(current_app)
+    return Response(body, mimetype="text/plain", content_type="text/plain; version=0.0.4; charset=utf-8")
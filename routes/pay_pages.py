@@ -5,6 +5,7 @@ from flask import Blueprint, request
 from models import db
 from models.payment import Payment
 from utils.audit import log_event
+from utils.unit_of_work import commit_request
 
 pay_pages_bp = Blueprint("pay_pages", __name__)
 
@@ -33,7 +34,7 @@ def pay_cancel():
     if payment and payment.status != "PAID":
         payment.status = "FAILED"
         db.session.delete(payment)
-        db.session.commit()
+        commit_request()
         log_event("PAYMENT_CANCELLED", user_id=None, entity="payment", entity_id=payment.id, metadata={"reason": "stripe_cancel"})
 
     return """
@@ -1,15 +1,18 @@
 import os
+from datetime import datetime, timedelta
 from urllib.parse import urlencode, urlparse, parse_qsl, urlunparse
 
-import stripe
-from flask import Blueprint, request, jsonify, g
+from flask import Blueprint, request, jsonify, g, current_app
 
 from models import db
 from models.booking import Booking
 from models.slot import Slot
 from models.payment import Payment
+from models.payment_item import PaymentItem
 from utils.auth_context import login_required
 from utils.audit import log_event
+from utils.payment_provider import PaymentProviderError, get_provider
+from utils.waitlist import holders_by_slot, is_held_for_other
 
 payments_bp = Blueprint("payments", __name__, url_prefix="/payments")
 
@@ -23,12 +26,121 @@ def _append_query(url: str, params: dict) -> str:
     return urlunparse(parts._replace(query=new_query))
 
 
+def _checkout_expiry() -> datetime:
+    # Stripe accepts 30 minutes .. 24 hours from session creation
+    ttl = int(current_app.config.get("STRIPE_CHECKOUT_TTL_MINUTES", 45))
+    return datetime.utcnow() + timedelta(minutes=min(max(31, ttl), 24 * 60))
+
+
+def _stripe_timestamp(dt: datetime) -> int:
+    return int((dt - datetime(1970, 1, 1)).total_seconds())
+
+
+def _find_open_checkout(user_id: int, slot: Slot):
+    """
+    Returns the user's still-open INIT payment for this slot (if its Stripe
+    session is not about to expire and the price has not changed), else None.
+    Served by ix_payments_user_slot_status.
+    """
+    margin = current_app.config.get("STRIPE_CHECKOUT_REUSE_MARGIN_SECONDS", 60)
+    return (
+        Payment.query
+        .filter(
+            Payment.user_id == user_id,
+            Payment.slot_id == slot.id,
+            Payment.status == "INIT",
+            Payment.stripe_session_id.isnot(None),
+            Payment.checkout_url.isnot(None),
+            Payment.checkout_expires_at > datetime.utcnow() + timedelta(seconds=margin),
+            Payment.amount == int(slot.price),
+        )
+        .order_by(Payment.created_at.desc())
+        .first()
+    )
+
+
+def _checkout_urls():
+    success_url = os.getenv("STRIPE_SUCCESS_URL")
+    cancel_url = os.getenv("STRIPE_CANCEL_URL")
+    if not success_url or not cancel_url:
+        return None, None
+    return success_url, cancel_url
+
+
+def _line_item(slot_id: int, amount_rupees: int) -> dict:
+    return {
+        "price_data": {
+            "currency": "npr",
+            "product_data": {"name": f"Court booking (Slot #{slot_id})"},
+            # store price in rupees in DB (1500); Stripe expects smallest unit for NPR
+            "unit_amount": amount_rupees * 100,
+        },
+        "quantity": 1,
+    }
+
+
+def _idempotency_key(payment_id: int, created_at: datetime) -> str:
+    # Retries of the same payment reuse the same Stripe session; the creation
+    # timestamp keeps keys unique if payment ids are ever reused (DB reset).
+    return f"checkout-payment-{payment_id}-{_stripe_timestamp(created_at)}"
+
+
+def _open_checkout(payment: Payment, line_items: list, metadata: dict, audit_metadata: dict | None = None):
+    """
+    Opens the checkout session for a committed INIT payment.
+
+    No transaction is held across the provider network call: the payment row is
+    already committed, and the session id/URL plus the audit row are written in
+    a single commit afterwards. On a Stripe error the payment is removed.
+    Returns (checkout_url, error_response).
+    """
+    success_url, cancel_url = _checkout_urls()
+    payment_id = payment.id
+    user_id = payment.user_id
+    cancel_url = _append_query(cancel_url, {"booking_id": "", "payment_id": str(payment_id)})
+    expires_at = _checkout_expiry()
+    idempotency_key = _idempotency_key(payment_id, payment.created_at)
+    # end the read transaction opened by the attribute refreshes above
+    db.session.commit()
+
+    try:
+        session = get_provider().create_checkout_session(
+            expires_at=_stripe_timestamp(expires_at),
+            line_items=line_items,
+            success_url=success_url,
+            cancel_url=cancel_url,
+            metadata={"booking_id": "", "payment_id": str(payment_id), "user_id": str(user_id), **metadata},
+            idempotency_key=idempotency_key,
+        )
+    except PaymentProviderError as exc:
+        db.session.delete(payment)
+        log_event("PAYMENT_SESSION_FAILED", user_id=user_id, entity="payment", entity_id=payment_id, metadata={"error": str(exc)}, commit=False)
+        db.session.commit()
+        return None, (jsonify(error="Payment provider unavailable"), 502)
+
+    payment.stripe_session_id = session["id"]
+    payment.checkout_url = session["url"]
+    payment.checkout_expires_at = expires_at
+    log_event(
+        "PAYMENT_SESSION_CREATED",
+        user_id=user_id,
+        entity="payment",
+        entity_id=payment_id,
+        metadata={"stripe_session_id": session["id"], **(audit_metadata or {})},
+        commit=False,
+    )
+    db.session.commit()
+    return session["url"], None
+
+
 @payments_bp.post("/start")
 @login_required
 def start_payment():
-    stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
-    if not stripe.api_key:
-        return jsonify(error="Stripe secret key missing (STRIPE_SECRET_KEY)"), 500
+    provider_error = get_provider().config_error()
+    if provider_error:
+        return jsonify(error=provider_error), 500
+    if not _checkout_urls()[0]:
+        return jsonify(error="Stripe success/cancel URLs not configured"), 500
     data = request.get_json(silent=True) or {}
     booking_id = data.get("booking_id")
     slot_id = data.get("slot_id")
@@ -52,70 +164,118 @@ def start_payment():
     existing_confirmed = Booking.query.filter_by(slot_id=slot.id, status="CONFIRMED").first()
     if existing_confirmed:
         return jsonify(error="Slot already booked"), 409
+    if is_held_for_other(slot.id, g.user.id):
+        return jsonify(error="Slot is held for a waitlisted player"), 409
+
+    if not booking:
+        open_payment = _find_open_checkout(g.user.id, slot)
+        if open_payment:
+            log_event("PAYMENT_SESSION_REUSED", user_id=g.user.id, entity="payment", entity_id=open_payment.id, metadata={"stripe_session_id": open_payment.stripe_session_id})
+            return jsonify(checkout_url=open_payment.checkout_url), 200
 
+    # single short write before the Stripe call
     if booking:
-        payment = Payment.query.filter_by(booking_id=booking.id).first()
-        if payment:
-            db.session.delete(payment)
+        old_payment = Payment.query.filter_by(booking_id=booking.id).first()
+        if old_payment:
+            db.session.delete(old_payment)
         db.session.delete(booking)
-        db.session.commit()
 
+    amount_rupees = int(slot.price)
     payment = Payment(
         booking_id=None,
         slot_id=slot.id,
+        user_id=g.user.id,
         provider="STRIPE",
-        amount=int(slot.price),
+        amount=amount_rupees,
         currency="NPR",
         status="INIT",
     )
     db.session.add(payment)
     db.session.commit()
 
-    success_url = os.getenv("STRIPE_SUCCESS_URL")
-    cancel_url = os.getenv("STRIPE_CANCEL_URL")
+    checkout_url, error = _open_checkout(
+        payment,
+        [_line_item(slot.id, amount_rupees)],
+        {"slot_id": str(slot.id)},
+    )
+    if error:
+        return error
+    return jsonify(checkout_url=checkout_url), 200
 
-    if not stripe.api_key:
-        return jsonify(error="Stripe secret key not configured"), 500
-    if not success_url or not cancel_url:
-        return jsonify(error="Stripe success/cancel URLs not configured"), 500
 
-    # store price in rupees in DB (1500)
-    amount_rupees = int(slot.price)
-    amount_paisa = amount_rupees * 100  # Stripe expects smallest unit for NPR
+def _parse_slot_ids(raw):
+    if not isinstance(raw, list) or not raw:
+        return None
+    slot_ids = []
+    for value in raw:
+        try:
+            slot_id = int(value)
+        except (TypeError, ValueError):
+            return None
+        if slot_id not in slot_ids:
+            slot_ids.append(slot_id)
+    return slot_ids
 
-    # (optional) keep your Payment.amount as rupees (fine)
-    payment.amount = amount_rupees
-    payment.currency = "NPR"
-    db.session.commit()
 
-    cancel_url = _append_query(cancel_url, {"booking_id": "", "payment_id": str(payment.id)})
-
-    session = stripe.checkout.Session.create(
-        mode="payment",
-        line_items=[{
-            "price_data": {
-                "currency": "npr",
-                "product_data": {"name": f"Court booking (Slot #{slot.id})"},
-                "unit_amount": amount_paisa, 
-            },
-            "quantity": 1,
-        }],
-        success_url=success_url,
-        cancel_url=cancel_url,
-        metadata={
-            "booking_id": "",
-            "payment_id": str(payment.id),
-            "user_id": str(g.user.id),
-            "slot_id": str(slot.id),
-        },
-    )
+@payments_bp.post("/basket/start")
+@login_required
+def start_basket_payment():
+    provider_error = get_provider().config_error()
+    if provider_error:
+        return jsonify(error=provider_error), 500
+    if not _checkout_urls()[0]:
+        return jsonify(error="Stripe success/cancel URLs not configured"), 500
+    data = request.get_json(silent=True) or {}
 
+    slot_ids = _parse_slot_ids(data.get("slot_ids"))
+    if not slot_ids:
+        return jsonify(error="slot_ids must be a non-empty list of slot ids"), 400
+    max_slots = current_app.config.get("BASKET_MAX_SLOTS", 6)
+    if len(slot_ids) > max_slots:
+        return jsonify(error=f"At most {max_slots} slots per checkout"), 400
 
-    payment.stripe_session_id = session["id"]
+    # one query: every requested slot plus its confirmed booking (if any)
+    rows = (
+        db.session.query(Slot, Booking.id)
+        .outerjoin(Booking, (Booking.slot_id == Slot.id) & (Booking.status == "CONFIRMED"))
+        .filter(Slot.id.in_(slot_ids))
+        .all()
+    )
+    slots = {slot.id: slot for slot, _ in rows if slot.is_active}
+    missing = [sid for sid in slot_ids if sid not in slots]
+    if missing:
+        return jsonify(error="Slot not found", slot_ids=missing), 404
+    booked = sorted(slot.id for slot, booking_id in rows if booking_id is not None)
+    if booked:
+        return jsonify(error="Slot already booked", slot_ids=booked), 409
+    held = sorted(sid for sid, users in holders_by_slot(slot_ids).items() if g.user.id not in users)
+    if held:
+        return jsonify(error="Slot is held for a waitlisted player", slot_ids=held), 409
+
+    ordered = [(s.id, int(s.price)) for s in sorted(slots.values(), key=lambda s: s.start_time)]
+    payment = Payment(
+        booking_id=None,
+        slot_id=None,
+        user_id=g.user.id,
+        provider="STRIPE",
+        amount=sum(price for _, price in ordered),
+        currency="NPR",
+        status="INIT",
+    )
+    for sid, price in ordered:
+        payment.items.append(PaymentItem(slot_id=sid, amount=price))
+    db.session.add(payment)
     db.session.commit()
 
-    log_event("PAYMENT_SESSION_CREATED", user_id=g.user.id, entity="payment", entity_id=payment.id, metadata={"stripe_session_id": session["id"]})
-    return jsonify(checkout_url=session["url"]), 200
+    checkout_url, error = _open_checkout(
+        payment,
+        [_line_item(sid, price) for sid, price in ordered],
+        {"slot_id": "", "basket": "1"},
+        audit_metadata={"slot_ids": [sid for sid, _ in ordered]},
+    )
+    if error:
+        return error
+    return jsonify(checkout_url=checkout_url, payment_id=payment.id), 200
 
 
 @payments_bp.get("/cancel")
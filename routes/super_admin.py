@@ -1,14 +1,19 @@
-from flask import Blueprint, jsonify, g, request
+from flask import Blueprint, current_app, jsonify, g, request, send_file
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import selectinload
 
 from security.rbac import require_roles
 from models import db
 from models.blocked_email import BlockedEmail
-from utils.blocklist import normalize_email
+from utils.blocklist import bump_version, invalidate, normalize_email
 from utils.audit import log_event
+from utils.unit_of_work import commit_request
 from models.court import Court
-from models.user import User, Role
+from models.user import User, Role, user_roles
 from models.support_message import SupportMessage
 from utils.roles import filter_role_names
+from utils.payment_provider import get_provider
+from utils.profiling import list_profiles, profile_file
 
 super_admin_bp = Blueprint("super_admin", __name__, url_prefix="/super-admin")
 
@@ -20,6 +25,43 @@ def dashboard():
     return jsonify(message="Welcome to super admin dashboard"), 200
 
 
+@super_admin_bp.get("/payments/provider-metrics")
+@require_roles("SUPER_ADMIN")
+def payment_provider_metrics():
+    provider = get_provider()
+    return jsonify(
+        provider=type(provider).__name__,
+        connect_timeout_s=getattr(provider, "connect_timeout", None),
+        read_timeout_s=getattr(provider, "read_timeout", None),
+        pool_size=getattr(provider, "pool_size", None),
+        operations=provider.metrics.snapshot(),
+    ), 200
+
+
+@super_admin_bp.get("/profiles")
+@require_roles("SUPER_ADMIN")
+def list_request_profiles():
+    try:
+        limit = min(max(int(request.args.get("limit", 50)), 1), 500)
+    except ValueError:
+        return jsonify(error="Invalid limit"), 400
+    return jsonify(
+        sample_rate=current_app.config.get("PROFILE_SAMPLE_RATE", 0.0),
+        mode=current_app.config.get("PROFILE_MODE", "cprofile"),
+        profiles=list_profiles(current_app, limit=limit),
+    ), 200
+
+
+@super_admin_bp.get("/profiles/<profile_id>/<filename>")
+@require_roles("SUPER_ADMIN")
+def download_request_profile(profile_id, filename):
+    path = profile_file(current_app, profile_id, filename)
+    if path is None:
+        return jsonify(error="Profile not found"), 404
+    log_event("PROFILE_DOWNLOADED", user_id=g.user.id, metadata={"profile": profile_id, "file": filename})
+    return send_file(path, as_attachment=True, download_name=filename)
+
+
 @super_admin_bp.get("/requests")
 @require_roles("SUPER_ADMIN")
 def list_requests():
@@ -54,27 +96,49 @@ def list_requests():
     ]), 200
 
 
+def _admin_directory_query(search: str | None):
+    """
+    SUPER_ADMINs, plus ADMINs owning at least one VERIFIED court, as one
+    statement: role and court checks are correlated EXISTS subqueries, so
+    each user appears once and nothing is queried per row.
+    """
+    def has_role_named(name):
+        return (
+            db.session.query(user_roles.c.user_id)
+            .join(Role, Role.id == user_roles.c.role_id)
+            .filter(user_roles.c.user_id == User.id, Role.name == name)
+            .exists()
+        )
+
+    owns_verified_court = (
+        db.session.query(Court.id)
+        .filter(Court.owner_user_id == User.id, Court.status == "VERIFIED")
+        .exists()
+    )
+    q = User.query.filter(or_(has_role_named("SUPER_ADMIN"), and_(has_role_named("ADMIN"), owns_verified_court)))
+    if search:
+        like = f"%{search}%"
+        q = q.filter(or_(User.email.ilike(like), User.full_name.ilike(like), User.phone_number.ilike(like)))
+    return q
+
+
 @super_admin_bp.get("/admins")
 @require_roles("SUPER_ADMIN")
 def list_admins():
-    owners = (
-        User.query
-        .join(User.roles)
-        .filter(Role.name.in_(["SUPER_ADMIN", "ADMIN"]))
-        .order_by(User.created_at.desc())
-        .limit(200)
+    search = (request.args.get("q") or "").strip() or None
+    page = max(1, request.args.get("page", type=int) or 1)
+    per_page = max(1, min(request.args.get("per_page", type=int) or 200, 200))
+
+    q = _admin_directory_query(search)
+    total = q.order_by(None).count()
+    admins = (
+        q.options(selectinload(User.roles))
+        .order_by(User.created_at.desc(), User.id.desc())
+        .offset((page - 1) * per_page)
+        .limit(per_page)
         .all()
     )
-    visible = []
-    for u in owners:
-        role_names = {r.name for r in u.roles}
-        if "SUPER_ADMIN" in role_names:
-            visible.append(u)
-            continue
-        verified = Court.query.filter_by(owner_user_id=u.id, status="VERIFIED").first()
-        if verified:
-            visible.append(u)
-    return jsonify([
+    resp = jsonify([
         {
             "id": u.id,
             "email": u.email,
@@ -83,8 +147,13 @@ def list_admins():
             "roles": filter_role_names(u.roles),
             "created_at": u.created_at.isoformat(),
         }
-        for u in visible
-    ]), 200
+        for u in admins
+    ])
+    # body stays a plain list for existing clients; paging info travels in headers
+    resp.headers["X-Total-Count"] = str(total)
+    resp.headers["X-Page"] = str(page)
+    resp.headers["X-Per-Page"] = str(per_page)
+    return resp, 200
 
 
 @super_admin_bp.get("/admins/<int:user_id>")
@@ -162,7 +231,9 @@ def block_email():
         blocked_by=g.user.id,
     )
     db.session.add(row)
+    bump_version()
     db.session.commit()
+    invalidate()
 
     log_event(
         "SUPER_ADMIN_BLOCK_EMAIL",
@@ -183,7 +254,9 @@ def unblock_email(block_id: int):
         return jsonify(error="Not found"), 404
 
     db.session.delete(row)
+    bump_version()
     db.session.commit()
+    invalidate()
 
     log_event(
         "SUPER_ADMIN_UNBLOCK_EMAIL",
@@ -204,7 +277,7 @@ def block_court(court_id: int):
         return jsonify(error="Court not found"), 404
 
     court.is_active = False
-    db.session.commit()
+    commit_request()
 
     log_event("SUPER_ADMIN_BLOCK_COURT", user_id=g.user.id, entity="court", entity_id=court.id)
     return jsonify(message="Court blocked", id=court.id, is_active=court.is_active), 200
@@ -218,7 +291,7 @@ def unblock_court(court_id: int):
         return jsonify(error="Court not found"), 404
 
     court.is_active = True
-    db.session.commit()
+    commit_request()
 
     log_event("SUPER_ADMIN_UNBLOCK_COURT", user_id=g.user.id, entity="court", entity_id=court.id)
     return jsonify(message="Court unblocked", id=court.id, is_active=court.is_active), 200
@@ -274,7 +347,7 @@ def update_support_message_status(msg_id: int):
         return jsonify(error="Not found"), 404
 
     msg.status = status
-    db.session.commit()
+    commit_request()
 
     log_event(
         "SUPER_ADMIN_SUPPORT_STATUS",
@@ -329,7 +402,7 @@ def update_court_status(court_id: int):
         return jsonify(error="Court not found"), 404
 
     court.is_active = bool(active)
-    db.session.commit()
+    commit_request()
 
     log_event(
         "SUPER_ADMIN_COURT_STATUS",
@@ -5,6 +5,7 @@ from models.support_message import SupportMessage
 from models.court import Court
 from utils.auth_context import login_required
 from utils.audit import log_event
+from utils.unit_of_work import commit_request
 
 support_bp = Blueprint("support", __name__, url_prefix="/support")
 
@@ -33,7 +34,7 @@ def create_support_message():
         status="OPEN",
     )
     db.session.add(msg)
-    db.session.commit()
+    commit_request()
 
     log_event("SUPPORT_MESSAGE_CREATE", user_id=g.user.id, entity="support_message", entity_id=msg.id)
     return jsonify(id=msg.id, status=msg.status), 201
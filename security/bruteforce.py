@@ -1,8 +1,10 @@
 from datetime import datetime, timedelta
 from flask import request, current_app
+from sqlalchemy import update
 
 from models import db
 from models.login_attempt import LoginAttempt
+from utils.unit_of_work import stage
 
 def _client_ip() -> str:
     return request.headers.get("X-Forwarded-For", request.remote_addr) or "unknown"
@@ -31,23 +33,24 @@ def register_failure(email: str) -> tuple[int, bool]:
     now = datetime.utcnow()
 
     row = LoginAttempt.query.filter_by(email=email, ip=ip).first()
-    if not row:
-        row = LoginAttempt(email=email, ip=ip, fail_count=0)
-        db.session.add(row)
-
-    row.fail_count += 1
-    row.last_fail_at = now
+    fail_count = (row.fail_count if row else 0) + 1
 
     max_attempts = current_app.config.get("MAX_LOGIN_ATTEMPTS", 5)
     lock_minutes = current_app.config.get("LOCKOUT_MINUTES", 10)
 
-    locked_now = False
-    if row.fail_count >= max_attempts:
-        row.locked_until = now + timedelta(minutes=lock_minutes)
-        locked_now = True
+    locked_now = fail_count >= max_attempts
+    locked_until = now + timedelta(minutes=lock_minutes) if locked_now else None
 
-    db.session.commit()
-    return row.fail_count, locked_now
+    # staged: written with the request's commit, even if the handler rolls back
+    if not row:
+        stage(lambda: db.session.add(LoginAttempt(email=email, ip=ip, fail_count=1, last_fail_at=now, locked_until=locked_until)))
+    else:
+        values = {"fail_count": LoginAttempt.fail_count + 1, "last_fail_at": now}
+        if locked_now:
+            values["locked_until"] = locked_until
+        row_id = row.id
+        stage(lambda: db.session.execute(update(LoginAttempt).where(LoginAttempt.id == row_id).values(**values)))
+    return fail_count, locked_now
 
 def reset_attempts(email: str):
     """
@@ -57,7 +60,7 @@ def reset_attempts(email: str):
     row = LoginAttempt.query.filter_by(email=email, ip=ip).first()
     if not row:
         return
-    row.fail_count = 0
-    row.last_fail_at = None
-    row.locked_until = None
-    db.session.commit()
+    row_id = row.id
+    stage(lambda: db.session.execute(
+        update(LoginAttempt).where(LoginAttempt.id == row_id).values(fail_count=0, last_fail_at=None, locked_until=None)
+    ))
@@ -1,5 +1,9 @@
 import bcrypt
 
+from utils.tracing import traced
+
+
+@traced("password.hash")
 def hash_password(plain_password: str) -> str:
     if not isinstance(plain_password, str) or len(plain_password) == 0:
         raise ValueError("Password must be a non-empty string")
@@ -9,6 +13,7 @@ def hash_password(plain_password: str) -> str:
     hashed = bcrypt.hashpw(plain_password.encode("utf-8"), salt)
     return hashed.decode("utf-8")
 
+@traced("password.verify")
 def verify_password(plain_password: str, password_hash: str) -> bool:
     if not plain_password or not password_hash:
         return False
@@ -1,8 +1,10 @@
 from datetime import datetime, timedelta
 from flask import request, current_app
+from sqlalchemy import update
 
 from models import db
 from models.ip_rate_limit import IpRateLimit
+from utils.unit_of_work import stage
 
 def _client_ip() -> str:
     return request.headers.get("X-Forwarded-For", request.remote_addr) or "unknown"
@@ -19,22 +21,23 @@ def check_and_increment_login_rate() -> tuple[bool, int]:
     max_requests = current_app.config.get("LOGIN_RATE_MAX_REQUESTS", 15)
 
     row = IpRateLimit.query.filter_by(ip=ip).first()
-    if not row:
-        row = IpRateLimit(ip=ip, window_start=now, count=0)
-        db.session.add(row)
-
-    window_end = row.window_start + timedelta(seconds=window_seconds)
-
-    # Reset window if expired
-    if now >= window_end:
-        row.window_start = now
-        row.count = 0
-        window_end = row.window_start + timedelta(seconds=window_seconds)
+    window = timedelta(seconds=window_seconds)
 
-    row.count += 1
-    db.session.commit()
-
-    if row.count > max_requests:
+    # staged: written with the request's commit, even if the handler rolls back
+    if not row:
+        count, window_end = 1, now + window
+        stage(lambda: db.session.add(IpRateLimit(ip=ip, window_start=now, count=1)))
+    elif now >= row.window_start + window:
+        # Reset window if expired
+        count, window_end = 1, now + window
+        row_id = row.id
+        stage(lambda: db.session.execute(update(IpRateLimit).where(IpRateLimit.id == row_id).values(window_start=now, count=1)))
+    else:
+        count, window_end = row.count + 1, row.window_start + window
+        row_id = row.id
+        stage(lambda: db.session.execute(update(IpRateLimit).where(IpRateLimit.id == row_id).values(count=IpRateLimit.count + 1)))
+
+    if count > max_requests:
         retry_after = int((window_end - now).total_seconds())
         return False, max(retry_after, 1)
 
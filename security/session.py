@@ -2,9 +2,12 @@ import hashlib
 import secrets
 from datetime import datetime, timedelta
 from flask import request, current_app
+from sqlalchemy import update
+from sqlalchemy.orm.attributes import set_committed_value
 
 from models import db
 from models.session import Session
+from utils.unit_of_work import stage
 
 def _hash_token(token: str) -> str:
     # SHA-256 is fine for hashing random session tokens
@@ -63,9 +66,10 @@ def get_session_from_request():
         return None
 
 
-    # Update activity timestamp (touch)
-    sess.last_seen_at = now
-    db.session.commit()
+    # Update activity timestamp (touch), written with the request's commit
+    sess_id = sess.id
+    stage(lambda: db.session.execute(update(Session).where(Session.id == sess_id).values(last_seen_at=now)))
+    set_committed_value(sess, "last_seen_at", now)
 
     return sess
 
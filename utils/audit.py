@@ -1,11 +1,15 @@
 import json
-from flask import request
+from flask import request, has_request_context
 from models import db
 from models.audit_log import AuditLog
+from utils.unit_of_work import stage
 
-def log_event(action: str, user_id=None, entity=None, entity_id=None, metadata=None):
-    ip = request.headers.get("X-Forwarded-For", request.remote_addr)
-    user_agent = request.headers.get("User-Agent", "")
+def log_event(action: str, user_id=None, entity=None, entity_id=None, metadata=None, commit=True):
+    ip = None
+    user_agent = ""
+    if has_request_context():  # background workers/CLI log without a request
+        ip = request.headers.get("X-Forwarded-For", request.remote_addr)
+        user_agent = request.headers.get("User-Agent", "")
 
     row = AuditLog(
         user_id=user_id,
@@ -16,5 +20,8 @@ def log_event(action: str, user_id=None, entity=None, entity_id=None, metadata=N
         user_agent=user_agent[:255] if user_agent else None,
         metadata_json=json.dumps(metadata) if metadata else None
     )
-    db.session.add(row)
-    db.session.commit()
+    if commit:
+        # inside a request: written with the request's commit (see utils/unit_of_work.py)
+        stage(lambda: db.session.add(row))
+    else:
+        db.session.add(row)
@@ -1,11 +1,148 @@
+"""
+Email blocklist checks against an in-process snapshot.
+
+Each worker keeps a Bloom filter (fast negatives, the overwhelmingly common
+case) plus the exact set of normalized emails. block_email/unblock_email bump
+the "blocklist" row in cache_versions in the same transaction; workers
+compare that version at most every BLOCKLIST_VERSION_CHECK_SECONDS (one
+primary-key read) and reload only when it changed. The writing worker
+reloads immediately.
+
+Lists larger than BLOCKLIST_EXACT_MAX keep only the Bloom filter in memory and
+confirm its (rare) positives with an indexed lookup.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from models import db
 from models.blocked_email import BlockedEmail
+from models.cache_version import CacheVersion
+
+VERSION_NAME = "blocklist"
 
 
 def normalize_email(value: str) -> str:
     return (value or "").strip().lower()
 
 
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on one blake2b digest)."""
+
+    def __init__(self, capacity: int, fp_rate: float = 0.01):
+        capacity = max(1, capacity)
+        self.size = max(64, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value: str) -> None:
+        for pos in self._positions(value):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+class _Snapshot:
+    def __init__(self, version, emails, fp_rate: float, exact_max: int):
+        self.version = version
+        self.count = len(emails)
+        self.bloom = BloomFilter(len(emails), fp_rate)
+        for email in emails:
+            self.bloom.add(email)
+        self.exact = frozenset(emails) if len(emails) <= exact_max else None
+
+    def contains(self, email_norm: str) -> bool:
+        if email_norm not in self.bloom:
+            return False
+        if self.exact is not None:
+            return email_norm in self.exact
+        return BlockedEmail.query.filter_by(email_normalized=email_norm).first() is not None
+
+
+class _State:
+    def __init__(self):
+        self.snapshot = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+
+def _state() -> _State:
+    app = current_app._get_current_object()
+    state = app.extensions.get("blocklist")
+    if state is None:
+        state = app.extensions.setdefault("blocklist", _State())
+    return state
+
+
+def _current_version():
+    return db.session.query(CacheVersion.version).filter(CacheVersion.name == VERSION_NAME).scalar()
+
+
+def _load(version) -> _Snapshot:
+    emails = [e for (e,) in db.session.query(BlockedEmail.email_normalized).all()]
+    return _Snapshot(
+        version,
+        emails,
+        current_app.config.get("BLOCKLIST_BLOOM_FP_RATE", 0.01),
+        current_app.config.get("BLOCKLIST_EXACT_MAX", 100_000),
+    )
+
+
+def snapshot() -> _Snapshot:
+    """The worker's blocklist snapshot, reloaded if the stored version moved."""
+    state = _state()
+    interval = current_app.config.get("BLOCKLIST_VERSION_CHECK_SECONDS", 5)
+    now = time.monotonic()
+    snap = state.snapshot
+    if snap is not None and now - state.checked_at < interval:
+        return snap
+    with state.lock:
+        snap = state.snapshot
+        if snap is not None and time.monotonic() - state.checked_at < interval:
+            return snap
+        version = _current_version()
+        if snap is None or version is None or version != snap.version:
+            snap = state.snapshot = _load(version)
+        state.checked_at = time.monotonic()
+    return snap
+
+
+def invalidate() -> None:
+    """Forces a version check on the next lookup (call after committing a change)."""
+    _state().checked_at = 0.0
+
+
+def bump_version() -> None:
+    """Marks the blocklist changed. Call inside the transaction that changes blocked_emails; does not commit."""
+    stmt = (
+        update(CacheVersion)
+        .where(CacheVersion.name == VERSION_NAME)
+        .values(version=CacheVersion.version + 1, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if db.session.execute(stmt).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(CacheVersion(name=VERSION_NAME, version=1))
+    except IntegrityError:
+        db.session.execute(stmt)
+
+
 def is_email_blocked(email: str) -> bool:
     if not email:
         return False
-    return BlockedEmail.query.filter_by(email_normalized=normalize_email(email)).first() is not None
+    return snapshot().contains(normalize_email(email))
@@ -0,0 +1,168 @@
+"""
+Response compression (gzip, and Brotli when the `brotli` or `brotlicffi`
+package is installed).
+
+Admin listings (audit logs at limit 500, court requests, slot listings) are
+large and repetitive JSON that gzip shrinks by roughly 90%. An after_request
+hook picks an encoding from the request's Accept-Encoding (q-values
+honoured, server preference COMPRESS_ALGORITHMS breaks ties) and compresses
+the body when:
+
+- the mimetype is in COMPRESS_MIMETYPES (JSON, text, JS, XML, SVG);
+- the response has no Content-Encoding yet, is not a file passthrough
+  (send_file) or a 1xx/204/304, and does not ask for
+  Cache-Control: no-transform;
+- a buffered body is at least COMPRESS_MIN_SIZE bytes, since small bodies gain
+  nothing and cost CPU.
+
+Streamed responses (generators) are compressed chunk by chunk with a sync
+flush after each one, so the client still receives every chunk as it is
+produced; their Content-Length is dropped.
+
+`Vary: Accept-Encoding` is added to every compressible response, compressed
+or not, so caches keep the variants apart. Other headers (the security
+headers from add_security_headers, X-Trace-Id...) are left untouched.
+"""
+import gzip
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:     # optional: pip install brotli (or brotlicffi on PyPy)
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+DEFAULT_MIMETYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/css",
+    "text/csv",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+    "text/xml",
+)
+
+
+def available_encodings() -> tuple:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def parse_accept_encoding(header: str | None) -> dict:
+    """{coding: q} from an Accept-Encoding header; malformed q-values count as 0."""
+    out = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        out[coding] = q
+    return out
+
+
+def choose_encoding(header: str | None, preference) -> str | None:
+    """The coding to use for this Accept-Encoding, or None for identity."""
+    accepted = parse_accept_encoding(header)
+    if not accepted:
+        return None
+    best, best_q = None, 0.0
+    for coding in preference:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(data: bytes, encoding: str, level: int, br_quality: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=br_quality)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _stream(chunks, encoding: str, level: int, br_quality: int):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=br_quality)
+        sync = lambda: compressor.flush()
+        finish = lambda: compressor.finish()
+        feed = compressor.process
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)     # wbits 31: gzip container
+        sync = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+        finish = lambda: compressor.flush(zlib.Z_FINISH)
+        feed = compressor.compress
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            if not chunk:
+                continue
+            out = feed(chunk) + sync()
+            if out:
+                yield out
+        yield finish()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def _compressible(resp, mimetypes) -> bool:
+    if resp.mimetype not in mimetypes:
+        return False
+    if resp.status_code < 200 or resp.status_code in (204, 304):
+        return False
+    if resp.direct_passthrough or "Content-Encoding" in resp.headers:
+        return False
+    return "no-transform" not in (resp.headers.get("Cache-Control") or "")
+
+
+def init_compression(app) -> None:
+    """Registers the compression hook; call after init_metrics and before init_unit_of_work (see app.py)."""
+    if not app.config.get("COMPRESS_ENABLED", True):
+        return
+    raw = app.config.get("COMPRESS_ALGORITHMS") or "br,gzip"
+    wanted = [a.strip().lower() for a in (raw.split(",") if isinstance(raw, str) else raw) if a.strip()]
+    preference = [a for a in wanted if a in available_encodings()]
+    mimetypes = frozenset(app.config.get("COMPRESS_MIMETYPES") or DEFAULT_MIMETYPES)
+    min_size = int(app.config.get("COMPRESS_MIN_SIZE", 500))
+    level = int(app.config.get("COMPRESS_LEVEL", 6))
+    br_quality = int(app.config.get("COMPRESS_BR_LEVEL", 4))
+    if not preference:
+        return
+
+    @app.after_request
+    def _compress_response(resp):
+        if not _compressible(resp, mimetypes):
+            return resp
+        resp.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.headers.get("Accept-Encoding"), preference)
+        if encoding is None:
+            return resp
+
+        if resp.is_streamed:
+            resp.response = _stream(resp.response, encoding, level, br_quality)
+            resp.headers.pop("Content-Length", None)
+        else:
+            data = resp.get_data()
+            if len(data) < min_size:
+                return resp
+            resp.set_data(compress(data, encoding, level, br_quality))
+        resp.headers["Content-Encoding"] = encoding
+        if resp.headers.get("ETag"):
+            # a strong validator names one representation; the encoded body is another
+            tag, weak = resp.get_etag()
+            resp.set_etag(f"{tag}-{encoding}", weak=weak)
+        return resp
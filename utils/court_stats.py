@@ -0,0 +1,199 @@
+"""
+Per-court dashboard counters.
+
+court_stats rows are bumped in the same transaction as the change they count
+(slot created/deactivated, booking confirmed/cancelled), with atomic
+`col = col + n` updates so concurrent writers never lose increments.
+`verify_court_stats` recomputes everything from slots/bookings and repairs
+drift; run it periodically (`flask court-stats-verify`).
+
+Revenue is the sum of slot prices of confirmed bookings, which is what the
+checkout charged (a reused checkout requires the price to be unchanged).
+"""
+from datetime import datetime
+
+from sqlalchemy import case, func, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db
+from models.booking import Booking
+from models.court import Court
+from models.court_stats import CourtStats
+from models.slot import Slot
+from utils.rollups import mark_slots_dirty
+
+COUNTERS = ("slots", "active_slots", "confirmed_bookings", "revenue")
+
+
+def compute_from_source(court_ids=None) -> dict:
+    """Returns {court_id: {counter: value}} computed from slots and bookings."""
+    court_q = db.session.query(Court.id)
+    slot_q = (
+        db.session.query(
+            Slot.court_id,
+            func.count(Slot.id),
+            func.coalesce(func.sum(case((Slot.is_active.is_(True), 1), else_=0)), 0),
+        )
+        .group_by(Slot.court_id)
+    )
+    booking_q = (
+        db.session.query(Slot.court_id, func.count(Booking.id), func.coalesce(func.sum(Slot.price), 0))
+        .join(Slot, Booking.slot_id == Slot.id)
+        .filter(Booking.status == "CONFIRMED")
+        .group_by(Slot.court_id)
+    )
+    if court_ids is not None:
+        court_ids = list(court_ids)
+        court_q = court_q.filter(Court.id.in_(court_ids))
+        slot_q = slot_q.filter(Slot.court_id.in_(court_ids))
+        booking_q = booking_q.filter(Slot.court_id.in_(court_ids))
+
+    out = {court_id: dict.fromkeys(COUNTERS, 0) for (court_id,) in court_q.all()}
+    for court_id, total, active in slot_q.all():
+        if court_id in out:
+            out[court_id].update(slots=int(total), active_slots=int(active))
+    for court_id, bookings, revenue in booking_q.all():
+        if court_id in out:
+            out[court_id].update(confirmed_bookings=int(bookings), revenue=int(revenue))
+    return out
+
+
+def _create_row(court_id: int) -> bool:
+    # first change for this court: seed the row from source, which already
+    # includes the caller's flushed change
+    values = compute_from_source([court_id]).get(court_id)
+    if values is None:
+        return True
+    try:
+        with db.session.begin_nested():
+            db.session.add(CourtStats(court_id=court_id, **values))
+    except IntegrityError:
+        # another writer created it first; the caller's delta still has to land
+        return False
+    return True
+
+
+def bump(court_id: int, **deltas) -> None:
+    """Adds `deltas` to a court's counters. Flushes, does not commit."""
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    db.session.flush()
+    stmt = (
+        update(CourtStats)
+        .where(CourtStats.court_id == court_id)
+        .values(updated_at=datetime.utcnow(), **{k: getattr(CourtStats, k) + v for k, v in deltas.items()})
+        .execution_options(synchronize_session=False)
+    )
+    if db.session.execute(stmt).rowcount:
+        return
+    if not _create_row(court_id):
+        db.session.execute(stmt)
+
+
+# The hooks below are the change points for slots and confirmed bookings; they
+# also queue the affected day for the analytics rollups (utils/rollups.py).
+
+def on_slot_created(slot: Slot) -> None:
+    bump(slot.court_id, slots=1, active_slots=1 if slot.is_active is not False else 0)
+    mark_slots_dirty([slot.id])
+
+
+def on_slot_deactivated(slot: Slot) -> None:
+    bump(slot.court_id, active_slots=-1)
+    mark_slots_dirty([slot.id])
+
+
+def on_bookings_confirmed(slot_ids) -> None:
+    _bump_bookings(slot_ids, 1)
+
+
+def on_bookings_cancelled(slot_ids) -> None:
+    _bump_bookings(slot_ids, -1)
+
+
+def _bump_bookings(slot_ids, sign: int) -> None:
+    slot_ids = list(slot_ids)
+    if not slot_ids:
+        return
+    rows = (
+        db.session.query(Slot.court_id, func.count(Slot.id), func.coalesce(func.sum(Slot.price), 0))
+        .filter(Slot.id.in_(slot_ids))
+        .group_by(Slot.court_id)
+        .all()
+    )
+    for court_id, n, revenue in rows:
+        bump(court_id, confirmed_bookings=sign * int(n), revenue=sign * int(revenue))
+    mark_slots_dirty(slot_ids)
+
+
+def stats_for(court_ids) -> dict:
+    """
+    Returns {court_id: {counter: value}} by primary key. Courts without a row
+    yet (e.g. no slot ever created) are seeded from source.
+    """
+    court_ids = list(court_ids)
+    if not court_ids:
+        return {}
+    out = {
+        row.court_id: {k: getattr(row, k) for k in COUNTERS}
+        for row in CourtStats.query.filter(CourtStats.court_id.in_(court_ids)).all()
+    }
+    missing = [cid for cid in court_ids if cid not in out]
+    if missing:
+        computed = compute_from_source(missing)
+        for court_id, values in computed.items():
+            db.session.add(CourtStats(court_id=court_id, verified_at=datetime.utcnow(), **values))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+        out.update(computed)
+    return out
+
+
+def verify_court_stats(fix: bool = True) -> dict:
+    """
+    Recomputes every court's counters from source and compares them with
+    court_stats. With `fix`, drifted or missing rows are rewritten. Commits.
+
+    Repairs are compare-and-set on the values that were read, so an increment
+    committed meanwhile is never overwritten (that court is re-checked next run).
+    Returns {"checked", "missing", "drifted": [{court_id, counter: [stored, actual]}], "fixed"}.
+    """
+    actual = compute_from_source()
+    stored = {
+        row.court_id: {k: getattr(row, k) for k in COUNTERS}
+        for row in CourtStats.query.all()
+    }
+    now = datetime.utcnow()
+    missing = []
+    drifted = []
+    fixed = 0
+    for court_id, values in actual.items():
+        seen = stored.get(court_id)
+        if seen is None:
+            missing.append(court_id)
+            if fix:
+                try:
+                    with db.session.begin_nested():
+                        db.session.add(CourtStats(court_id=court_id, verified_at=now, **values))
+                    fixed += 1
+                except IntegrityError:
+                    pass  # created concurrently by a bump; verified next run
+            continue
+        diff = {k: [seen[k], v] for k, v in values.items() if seen[k] != v}
+        if diff:
+            drifted.append({"court_id": court_id, **diff})
+        if diff and not fix:
+            continue
+        stmt = (
+            update(CourtStats)
+            .where(CourtStats.court_id == court_id, *[getattr(CourtStats, k) == seen[k] for k in COUNTERS])
+            .values(verified_at=now, **(values if diff else {}))
+            .execution_options(synchronize_session=False)
+        )
+        if db.session.execute(stmt).rowcount and diff:
+            fixed += 1
+    db.session.commit()
+    return {"checked": len(actual), "missing": missing, "drifted": drifted, "fixed": fixed}
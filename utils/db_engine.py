@@ -0,0 +1,212 @@
+"""
+SQLite engine profile.
+
+With SQLITE_PROFILE=production (the default) every pooled connection to a
+file-backed SQLite database is opened with:
+
+- journal_mode=WAL: readers no longer block the writer (or vice versa);
+- synchronous=NORMAL: durable across application crashes, fsync only at
+  checkpoints (the usual WAL setting);
+- busy_timeout: a writer waits for the lock instead of failing at once with
+  "database is locked";
+- mmap_size / cache_size / temp_store: memory-mapped reads, a larger page
+  cache and in-memory temp tables.
+
+The profile also serializes writers through an in-process FIFO queue
+(utils/write_queue.py, SQLITE_WRITE_QUEUE) and opens a second pool of
+query_only connections (SQLITE_READ_POOL_SIZE) that handlers marked
+@read_only read from, so anonymous listings never wait on a writer's pool
+slot.
+
+SQLITE_PROFILE=default leaves the driver defaults (rollback journal, 5 s
+timeout) untouched; benchmarks/bench_sqlite_profile.py compares the two.
+
+configure_engine(app) must run before db.init_app (Flask-SQLAlchemy builds
+the engine there); init_engine_profile(app) runs after it and performs the
+startup self-check.
+"""
+import logging
+from functools import wraps
+
+from flask import current_app
+from sqlalchemy import create_engine, event, text
+
+from models import db
+from utils import write_queue
+
+logger = logging.getLogger(__name__)
+
+SYNCHRONOUS_LEVELS = {"OFF": 0, "NORMAL": 1, "FULL": 2, "EXTRA": 3}
+
+
+def is_sqlite_file(uri: str) -> bool:
+    if not uri or not uri.startswith("sqlite"):
+        return False
+    path = uri.split(":///", 1)[1] if ":///" in uri else ""
+    return bool(path) and not path.startswith(":memory:") and "mode=memory" not in path
+
+
+def profile_enabled(config) -> bool:
+    return (
+        (config.get("SQLITE_PROFILE") or "production").lower() == "production"
+        and is_sqlite_file(config.get("SQLALCHEMY_DATABASE_URI", ""))
+    )
+
+
+def pragmas(config) -> list:
+    """[(pragma, value)] applied to every new connection, in order."""
+    return [
+        ("journal_mode", "WAL"),
+        ("synchronous", config.get("SQLITE_SYNCHRONOUS", "NORMAL").upper()),
+        ("busy_timeout", int(config.get("SQLITE_BUSY_TIMEOUT_MS", 5000))),
+        ("mmap_size", int(config.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))),
+        ("cache_size", -int(config.get("SQLITE_CACHE_SIZE_KB", 64 * 1024))),   # negative = KiB, not pages
+        ("temp_store", "MEMORY"),
+    ]
+
+
+def engine_options(config) -> dict:
+    """SQLALCHEMY_ENGINE_OPTIONS for the production profile ({} otherwise)."""
+    if not profile_enabled(config):
+        return {}
+    return {
+        "pool_size": int(config.get("SQLITE_POOL_SIZE", 10)),
+        "max_overflow": int(config.get("SQLITE_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(config.get("SQLITE_POOL_TIMEOUT", 30)),
+        "connect_args": {
+            # the driver's own lock wait; kept in line with PRAGMA busy_timeout
+            "timeout": int(config.get("SQLITE_BUSY_TIMEOUT_MS", 5000)) / 1000.0,
+            # pooled connections are handed between request threads (never shared at once)
+            "check_same_thread": False,
+        },
+    }
+
+
+def configure_engine(app) -> None:
+    """Merges the profile's engine options under any explicit SQLALCHEMY_ENGINE_OPTIONS."""
+    options = engine_options(app.config)
+    if options:
+        explicit = app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {}
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {**options, **explicit}
+
+
+def _apply_pragmas(statements: list):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    return on_connect
+
+
+def check_profile(app) -> dict:
+    """
+    Reads the pragmas back from a live connection and compares them with the
+    profile. WAL can be refused (e.g. on some network filesystems), so this is
+    what actually tells whether the profile is in effect.
+    """
+    config = app.config
+    report = {"profile": (config.get("SQLITE_PROFILE") or "production").lower(), "enabled": profile_enabled(config)}
+    if not is_sqlite_file(config.get("SQLALCHEMY_DATABASE_URI", "")):
+        report["ok"] = True
+        return report
+
+    with app.app_context(), db.engine.connect() as conn:
+        actual = {
+            "sqlite_version": conn.execute(text("SELECT sqlite_version()")).scalar(),
+            "journal_mode": str(conn.execute(text("PRAGMA journal_mode")).scalar()).lower(),
+            "synchronous": conn.execute(text("PRAGMA synchronous")).scalar(),
+            "busy_timeout": conn.execute(text("PRAGMA busy_timeout")).scalar(),
+            "mmap_size": conn.execute(text("PRAGMA mmap_size")).scalar(),
+            "cache_size": conn.execute(text("PRAGMA cache_size")).scalar(),
+        }
+        pool = db.engine.pool
+    report.update(actual)
+    report["pool"] = {"class": type(pool).__name__, "size": getattr(pool, "size", lambda: None)()}
+    read_engine = app.extensions.get("read_engine")
+    report["read_pool"] = {"size": read_engine.pool.size()} if read_engine is not None else None
+    queue = app.extensions.get("write_queue")
+    report["write_queue"] = queue.snapshot() if queue is not None else None
+
+    problems = []
+    if report["enabled"]:
+        expected = dict(pragmas(config))
+        if actual["journal_mode"] != "wal":
+            problems.append(f"journal_mode is {actual['journal_mode']!r}, expected 'wal'")
+        if actual["synchronous"] != SYNCHRONOUS_LEVELS.get(expected["synchronous"]):
+            problems.append(f"synchronous is {actual['synchronous']}, expected {expected['synchronous']}")
+        if actual["busy_timeout"] != expected["busy_timeout"]:
+            problems.append(f"busy_timeout is {actual['busy_timeout']}, expected {expected['busy_timeout']}")
+        # mmap_size is capped by the library's compile-time limit, so it is reported, not enforced
+    report["problems"] = problems
+    report["ok"] = not problems
+    return report
+
+
+def _create_read_engine(config, statements: list):
+    size = int(config.get("SQLITE_READ_POOL_SIZE", 10))
+    engine = create_engine(
+        config["SQLALCHEMY_DATABASE_URI"],
+        pool_size=size,
+        max_overflow=size,
+        pool_timeout=float(config.get("SQLITE_POOL_TIMEOUT", 30)),
+        connect_args=engine_options(config)["connect_args"],
+    )
+    # journal_mode is a property of the file (set by the writer pool); query_only
+    # turns any write on these connections into an error
+    reader = [st for st in statements if not st.startswith("PRAGMA journal_mode")] + ["PRAGMA query_only=1"]
+    event.listen(engine, "connect", _apply_pragmas(reader))
+    return engine
+
+
+def read_only(fn):
+    """
+    Runs the handler's queries on the read-only pool (when configured and no
+    replica was chosen for the request). ORM writes still reach the primary;
+    raw text() writes fail there.
+    """
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        engine = current_app.extensions.get("read_engine")
+        chosen = engine is not None and db.session.info.setdefault("read_engine", engine) is engine
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if chosen:
+                db.session.info.pop("read_engine", None)
+
+    return wrapper
+
+
+def init_engine_profile(app) -> dict | None:
+    """Installs the connect-time pragmas, write queue and read pool, then runs the startup self-check."""
+    if not profile_enabled(app.config):
+        return None
+
+    statements = [f"PRAGMA {name}={value}" for name, value in pragmas(app.config)]
+    with app.app_context():
+        event.listen(db.engine, "connect", _apply_pragmas(statements))
+        if app.config.get("SQLITE_WRITE_QUEUE", True):
+            queue = write_queue.WriteQueue(timeout=float(app.config.get("SQLITE_WRITE_QUEUE_TIMEOUT", 30)))
+            write_queue.install(db.engine, queue)
+            app.extensions["write_queue"] = queue
+    if int(app.config.get("SQLITE_READ_POOL_SIZE", 10)) > 0:
+        app.extensions["read_engine"] = _create_read_engine(app.config, statements)
+
+    try:
+        report = check_profile(app)
+    except Exception as exc:
+        # e.g. the database directory does not exist yet; the first real connection will tell
+        logger.warning("SQLite profile self-check could not connect: %s", exc)
+        return None
+    app.extensions["engine_profile"] = report
+    if not report["ok"]:
+        message = "SQLite production profile not in effect: " + "; ".join(report["problems"])
+        if app.config.get("SQLITE_PROFILE_STRICT"):
+            raise RuntimeError(message)
+        logger.warning(message)
+    return report
@@ -0,0 +1,98 @@
+"""
+Read/write routing to a replica bind.
+
+With DATABASE_REPLICA_URL set, SQLALCHEMY_BINDS["replica"] points at a read
+replica, and GET/HEAD requests to the blueprints in REPLICA_READ_BLUEPRINTS
+(slot/court listings, dashboards, audit log browsing) read from it.
+Everything else stays on the primary:
+
+- flushes and INSERT/UPDATE/DELETE always go to the primary, and a session
+  that has written reads from the primary for the rest of the request
+  (models.db.Session);
+- a state-changing request sets a short-lived cookie (REPLICA_STICKY_SECONDS)
+  that keeps the client's next requests on the primary, so users see their
+  own writes while the replica catches up;
+- routing starts after the app's own before_request hooks, so loading the
+  user (which touches the session row) always uses the primary.
+
+For local testing the replica can be a second SQLite file refreshed with
+`flask replica-sync` (sqlite3 backup API).
+"""
+import sqlite3
+import time
+
+from flask import request
+
+from models import db
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def replica_enabled(app) -> bool:
+    return "replica" in (app.config.get("SQLALCHEMY_BINDS") or {})
+
+
+def _sticky(app) -> bool:
+    raw = request.cookies.get(app.config.get("REPLICA_STICKY_COOKIE", "futsalslot_rw"))
+    try:
+        return raw is not None and float(raw) > time.time()
+    except ValueError:
+        return False
+
+
+def init_db_routing(app) -> None:
+    """Registers the routing hooks; call after the app's other before_request hooks."""
+    if not replica_enabled(app):
+        return
+    blueprints = set(app.config.get("REPLICA_READ_BLUEPRINTS") or ())
+    sticky_seconds = int(app.config.get("REPLICA_STICKY_SECONDS", 10))
+    cookie_name = app.config.get("REPLICA_STICKY_COOKIE", "futsalslot_rw")
+
+    @app.before_request
+    def _route_reads_to_replica():
+        if request.method in SAFE_METHODS and request.blueprint in blueprints and not _sticky(app):
+            if not db.session.info.get("writing"):
+                # earlier hooks' writes (session touch) are committed; nothing to read back
+                db.session.info.pop("pinned", None)
+            db.session.info["read_engine"] = db.engines["replica"]
+
+    @app.after_request
+    def _stick_to_primary(resp):
+        if request.method not in SAFE_METHODS and sticky_seconds > 0:
+            resp.set_cookie(
+                cookie_name,
+                str(int(time.time()) + sticky_seconds),
+                max_age=sticky_seconds,
+                httponly=True,
+                secure=app.config.get("SESSION_COOKIE_SECURE", False),
+                samesite=app.config.get("SESSION_COOKIE_SAMESITE", "Lax"),
+            )
+        return resp
+
+
+def _sqlite_path(url) -> str | None:
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        return None
+    return url.database
+
+
+def sync_sqlite_replica(app) -> dict:
+    """Copies the primary into the replica (both SQLite files) with the online backup API."""
+    with app.app_context():
+        source = _sqlite_path(db.engine.url)
+        target = _sqlite_path(db.engines["replica"].url) if replica_enabled(app) else None
+    if not source or not target:
+        raise ValueError("replica-sync needs a SQLite primary and a SQLite DATABASE_REPLICA_URL")
+    if source == target:
+        raise ValueError("primary and replica are the same file")
+
+    started = time.perf_counter()
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+        pages = dst.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        dst.close()
+        src.close()
+    return {"source": source, "target": target, "pages": pages, "elapsed_s": round(time.perf_counter() - started, 3)}
@@ -1,40 +1,133 @@
 import smtplib
+import threading
+from collections import deque
 from email.message import EmailMessage
 
 from flask import current_app
 
+from utils.tracing import span, traced
 
-def send_email(to_email: str, subject: str, body: str):
-    host = current_app.config.get("SMTP_HOST")
-    port = current_app.config.get("SMTP_PORT", 587)
+# EMAIL_BACKEND=memory keeps messages here instead of sending them
+# (local runs and load tests, where the OTP code has to be read back)
+outbox = deque(maxlen=10000)
+_outbox_lock = threading.Lock()
+
+
+def _memory_backend() -> bool:
+    return (current_app.config.get("EMAIL_BACKEND") or "smtp").lower() == "memory"
+
+
+def _store(to_email: str, subject: str, body: str) -> None:
+    with _outbox_lock:
+        outbox.append((to_email, subject, body))
+
+
+def last_message_to(to_email: str):
+    """Most recent (to_email, subject, body) kept by the memory backend for this address."""
+    with _outbox_lock:
+        for message in reversed(outbox):
+            if message[0] == to_email:
+                return message
+    return None
+
+
+def _smtp_settings():
     username = current_app.config.get("SMTP_USERNAME")
-    password = current_app.config.get("SMTP_PASSWORD")
-    from_email = current_app.config.get("SMTP_FROM_EMAIL") or username
-    use_tls = current_app.config.get("SMTP_USE_TLS", True)
+    return {
+        "host": current_app.config.get("SMTP_HOST"),
+        "port": current_app.config.get("SMTP_PORT", 587),
+        "username": username,
+        "password": current_app.config.get("SMTP_PASSWORD"),
+        "from_email": current_app.config.get("SMTP_FROM_EMAIL") or username,
+        "use_tls": current_app.config.get("SMTP_USE_TLS", True),
+    }
 
-    if not host or not from_email:
-        return False, "Email not configured"
 
+def _is_blocked(to_email: str) -> bool:
     try:
         from utils.blocklist import is_email_blocked
-        if is_email_blocked(to_email):
-            return False, "Email blocked"
+        return is_email_blocked(to_email)
     except Exception:
-        pass
+        return False
+
 
+def _build_message(from_email: str, to_email: str, subject: str, body: str) -> EmailMessage:
     msg = EmailMessage()
     msg["From"] = from_email
     msg["To"] = to_email
     msg["Subject"] = subject
     msg.set_content(body)
+    return msg
+
+
+def _open_smtp(cfg):
+    with span("smtp.connect", "client", **{"server.address": cfg["host"], "server.port": cfg["port"]}):
+        server = smtplib.SMTP(cfg["host"], cfg["port"], timeout=10)
+        if cfg["use_tls"]:
+            server.starttls()
+        if cfg["username"] and cfg["password"]:
+            server.login(cfg["username"], cfg["password"])
+    return server
+
+
+@traced("email.send")
+def send_email(to_email: str, subject: str, body: str):
+    if _memory_backend():
+        if _is_blocked(to_email):
+            return False, "Email blocked"
+        _store(to_email, subject, body)
+        return True, None
+
+    cfg = _smtp_settings()
+    if not cfg["host"] or not cfg["from_email"]:
+        return False, "Email not configured"
+
+    if _is_blocked(to_email):
+        return False, "Email blocked"
+
+    msg = _build_message(cfg["from_email"], to_email, subject, body)
 
     try:
-        with smtplib.SMTP(host, port, timeout=10) as server:
-            if use_tls:
-                server.starttls()
-            if username and password:
-                server.login(username, password)
+        with _open_smtp(cfg) as server, span("smtp.send", "client"):
             server.send_message(msg)
         return True, None
     except Exception as exc:
         return False, str(exc)
+
+
+@traced("email.send_batch")
+def send_emails(messages):
+    """
+    Sends many (to_email, subject, body) messages over one SMTP connection.
+    Returns a list of (ok, error) in the same order as `messages`.
+    """
+    if _memory_backend():
+        return [send_email(*message) for message in messages]
+
+    cfg = _smtp_settings()
+    if not cfg["host"] or not cfg["from_email"]:
+        return [(False, "Email not configured") for _ in messages]
+
+    results = [None] * len(messages)
+    pending = []
+    for i, (to_email, subject, body) in enumerate(messages):
+        if _is_blocked(to_email):
+            results[i] = (False, "Email blocked")
+        else:
+            pending.append((i, _build_message(cfg["from_email"], to_email, subject, body)))
+
+    if pending:
+        try:
+            with _open_smtp(cfg) as server:
+                for i, msg in pending:
+                    try:
+                        server.send_message(msg)
+                        results[i] = (True, None)
+                    except smtplib.SMTPRecipientsRefused as exc:
+                        results[i] = (False, str(exc))
+        except Exception as exc:
+            for i, _ in pending:
+                if results[i] is None:
+                    results[i] = (False, str(exc))
+
+    return results
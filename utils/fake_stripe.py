@@ -0,0 +1,196 @@
+"""
+In-process stand-in for Stripe Checkout, for load tests and local runs.
+
+Sessions live in memory. Webhook payloads are signed exactly like Stripe
+signs them (`t=<ts>,v1=<hmac-sha256>`), so they go through the real
+`/webhooks/stripe` verification. A replayer thread can complete or expire
+open sessions at a fixed rate.
+
+Enable with PAYMENT_PROVIDER=fake.
+"""
+import hashlib
+import hmac
+import itertools
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from utils.payment_provider import PaymentProviderError, ProviderMetrics
+
+
+def sign_payload(payload: bytes, secret: str, timestamp: int | None = None) -> str:
+    """Stripe-Signature header value for `payload`."""
+    timestamp = int(time.time()) if timestamp is None else int(timestamp)
+    signed = f"{timestamp}.".encode("utf-8") + payload
+    signature = hmac.new(secret.encode("utf-8"), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+class FakeStripeProvider:
+    name = "STRIPE"
+
+    def __init__(self, webhook_secret: str = "whsec_fake_local", latency_s: float = 0.0, base_url: str = "http://fake-stripe.local"):
+        self.webhook_secret = webhook_secret
+        self.latency_s = latency_s
+        self.base_url = base_url.rstrip("/")
+        self._sessions = OrderedDict()
+        self._by_idempotency_key = {}
+        self._ids = itertools.count(1)
+        self._event_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.fail_next = 0  # make the next N create calls fail
+        self.metrics = ProviderMetrics()
+        self._replayer = None
+
+    # ---- provider interface ----
+    def config_error(self) -> str | None:
+        return None
+
+    def create_checkout_session(self, *, line_items, success_url, cancel_url, metadata, expires_at, idempotency_key) -> dict:
+        with self.metrics.timed("checkout.sessions.create"):
+            return self._create(line_items, success_url, cancel_url, metadata, expires_at, idempotency_key)
+
+    def _create(self, line_items, success_url, cancel_url, metadata, expires_at, idempotency_key) -> dict:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        with self._lock:
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                raise PaymentProviderError("fake provider failure")
+            if idempotency_key and idempotency_key in self._by_idempotency_key:
+                session = self._sessions[self._by_idempotency_key[idempotency_key]]
+                return {"id": session["id"], "url": session["url"]}
+
+            session_id = f"cs_fake_{next(self._ids)}"
+            session = {
+                "id": session_id,
+                "object": "checkout.session",
+                "url": f"{self.base_url}/checkout/{session_id}",
+                "status": "open",
+                "payment_status": "unpaid",
+                "amount_total": sum(i["price_data"]["unit_amount"] * i.get("quantity", 1) for i in line_items),
+                "currency": line_items[0]["price_data"]["currency"] if line_items else "npr",
+                "expires_at": expires_at,
+                "success_url": success_url,
+                "cancel_url": cancel_url,
+                "metadata": dict(metadata or {}),
+            }
+            self._sessions[session_id] = session
+            if idempotency_key:
+                self._by_idempotency_key[idempotency_key] = session_id
+            return {"id": session_id, "url": session["url"]}
+
+    def retrieve_checkout_session(self, session_id: str) -> dict:
+        with self.metrics.timed("checkout.sessions.retrieve"):
+            return self._retrieve(session_id)
+
+    def _retrieve(self, session_id: str) -> dict:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                raise PaymentProviderError(f"No such checkout.session: {session_id}")
+            return json.loads(json.dumps(session))
+
+    def verify_webhook(self, payload: bytes, sig_header: str | None) -> None:
+        import stripe
+
+        stripe.Webhook.construct_event(payload, sig_header, self.webhook_secret)
+
+    # ---- driving sessions ----
+    def open_session_ids(self) -> list:
+        with self._lock:
+            return [sid for sid, s in self._sessions.items() if s["status"] == "open"]
+
+    def _finish(self, session_id: str, completed: bool):
+        with self._lock:
+            session = self._sessions[session_id]
+            if session["status"] != "open":
+                return None
+            session["status"] = "complete" if completed else "expired"
+            session["payment_status"] = "paid" if completed else "unpaid"
+            event = {
+                "id": f"evt_fake_{next(self._event_ids)}",
+                "object": "event",
+                "type": "checkout.session.completed" if completed else "checkout.session.expired",
+                "created": int(time.time()),
+                "data": {"object": json.loads(json.dumps(session))},
+            }
+        payload = json.dumps(event).encode("utf-8")
+        return payload, sign_payload(payload, self.webhook_secret)
+
+    def complete(self, session_id: str):
+        """Marks a session paid. Returns (payload, Stripe-Signature) or None if not open."""
+        return self._finish(session_id, completed=True)
+
+    def expire(self, session_id: str):
+        """Marks a session expired. Returns (payload, Stripe-Signature) or None if not open."""
+        return self._finish(session_id, completed=False)
+
+    # ---- replay ----
+    def start_replayer(self, deliver, rate_per_s: float, expire_ratio: float = 0.0, seed: int | None = None):
+        """
+        Background thread finishing open sessions (oldest first) at `rate_per_s`
+        and handing each signed event to `deliver(payload, sig_header)`.
+        A fraction `expire_ratio` of sessions expires instead of completing.
+        """
+        self.stop_replayer()
+        stop = threading.Event()
+        rng = random.Random(seed)
+        interval = 1.0 / rate_per_s if rate_per_s > 0 else 0.0
+
+        def run():
+            next_at = time.perf_counter()
+            while not stop.is_set():
+                pending = self.open_session_ids()
+                if not pending:
+                    stop.wait(0.01)
+                    continue
+                for session_id in pending:
+                    if stop.is_set():
+                        break
+                    delay = next_at - time.perf_counter()
+                    if delay > 0:
+                        stop.wait(delay)
+                    next_at = max(next_at + interval, time.perf_counter() - 1.0)
+                    finished = self.expire(session_id) if rng.random() < expire_ratio else self.complete(session_id)
+                    if finished:
+                        deliver(*finished)
+
+        thread = threading.Thread(target=run, name="fake-stripe-replayer", daemon=True)
+        self._replayer = (thread, stop)
+        thread.start()
+
+    def stop_replayer(self):
+        if self._replayer:
+            thread, stop = self._replayer
+            stop.set()
+            thread.join()
+            self._replayer = None
+
+
+def deliver_to_app(app, path: str = "/webhooks/stripe"):
+    """deliver() callable posting events through the app's own webhook endpoint."""
+    client = app.test_client()
+    lock = threading.Lock()
+
+    def deliver(payload: bytes, sig_header: str):
+        with lock:
+            return client.post(path, data=payload, headers={"Stripe-Signature": sig_header, "Content-Type": "application/json"})
+
+    return deliver
+
+
+def deliver_to_url(url: str, timeout: float = 10.0):
+    """deliver() callable posting events to a running server over HTTP."""
+    import urllib.request
+
+    def deliver(payload: bytes, sig_header: str):
+        req = urllib.request.Request(url, data=payload, method="POST", headers={"Stripe-Signature": sig_header, "Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.status
+
+    return deliver
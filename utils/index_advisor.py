@@ -0,0 +1,577 @@
+"""
+Index advisor behind `flask perf index-report`.
+
+Builds a throwaway SQLite database (schema from the migrations, data from
+utils.seed_load plus some pending/rejected courts, support messages and a
+super admin), then calls every route through the test client:
+
+- GET routes are called as a super admin, a court owner, a player and
+  anonymously, with the filter variants in QUERY_VARIANTS;
+- state-changing routes are called once, with the bodies in WRITE_BODIES
+  (or {} to reach their validation queries).
+
+Every SELECT/UPDATE/DELETE issued is planned with EXPLAIN QUERY PLAN after
+ANALYZE. A plan is flagged when it scans a whole table above --min-rows or
+builds a temp B-tree for ORDER BY/GROUP BY/DISTINCT. For each flagged table
+an index is proposed from the statement's own predicates (equality columns,
+then one range column, else the ORDER BY columns), unless an existing index
+already serves them (its leading equality columns may come in any order).
+Each proposal is then created, re-planned and dropped again, so the report
+says which statements it actually improves; proposals that improve none are
+dropped. Proposals come out as Alembic operations and db.Index() lines.
+"""
+import os
+import re
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, inspect
+
+from models import db
+from utils.slow_queries import explain, fingerprint, normalize
+
+PERSONAS = ("super_admin", "owner", "player", "anonymous")
+SKIP_ENDPOINTS = {
+    "static", "health.health", "health.metrics", "webhook.stripe_webhook",
+    "super_admin.download_request_profile",
+}
+PLANNED = ("SELECT", "WITH", "UPDATE", "DELETE")
+SUPER_ADMIN_TOKEN = "index-report-super-admin"
+
+# extra query strings per GET endpoint so filtered branches get planned too
+QUERY_VARIANTS = {
+    "booking.list_public_courts": ["", "location=Pokhara"],
+    "booking.list_public_courts_alias": ["", "location=Pokhara"],
+    "booking.list_public_slots": ["date={date}", "court_id={court_id}&date={date}"],
+    "booking.list_slots": ["date={date}", "court_id={court_id}&date={date}"],
+    "booking.list_courts": ["", "owner_user_id={owner_id}"],
+    "booking.list_all_bookings": ["", "status=CONFIRMED"],
+    "booking.my_bookings": ["", "status=CONFIRMED"],
+    "court.list_public_courts": ["", "status=VERIFIED", "name=Seed", "location=Pokhara"],
+    "admin.list_courts": ["", "status=PENDING"],
+    "admin.admin_courts_bookings": ["", "status=CONFIRMED", "date={date}"],
+    "admin.admin_courts_analytics": ["", "group=hour_of_week"],
+    "admin.list_users": ["", "role=PLAYER"],
+    "audit.list_audit_logs": ["", "action=LOGIN_FAIL", "user_id={player_id}"],
+    "super_admin.list_admins": ["", "q=owner"],
+    "super_admin.list_requests": ["", "status=REJECTED"],
+    "super_admin.list_support_messages": ["", "status=RESOLVED"],
+}
+
+# (persona, JSON body) for state-changing endpoints; the rest get {} from the first persona allowed in
+WRITE_BODIES = {
+    "auth.login": ("anonymous", {"email": "{player_email}", "password": "wrong-password"}),
+    "auth.admin_login": ("anonymous", {"email": "{owner_email}", "password": "wrong-password"}),
+    "auth.superadmin_login": ("anonymous", {"email": "{player_email}", "password": "wrong-password"}),
+    "auth.register": ("anonymous", {"email": "advisor@seed.local", "password": "x"}),
+    "auth.update_profile": ("player", {"full_name": "Index Report"}),
+    "payments.start_payment": ("player", {"slot_id": "{free_slot_id}"}),
+    "payments.start_basket_payment": ("player", {"slot_ids": ["{free_slot_id_2}"]}),
+    "booking.cancel_booking": ("player", {"reason": "index report"}),
+    "booking.admin_cancel_booking": ("owner", {"reason": "index report"}),
+    "booking.join_waitlist": ("player", {}),
+    "booking.leave_waitlist": ("player", {}),
+    "booking.deactivate_slot": ("owner", {}),
+    "court.register_court": ("player", {"name": "Advisor Court", "location": "Pokhara"}),
+    "court.create_support_message": ("player", {"message": "index report"}),
+    "support.create_support_message": ("player", {"message": "index report", "court_id": "{court_id}"}),
+    "super_admin.update_court_status": ("super_admin", {"status": "VERIFIED"}),
+    "super_admin.update_support_message_status": ("super_admin", {"status": "RESOLVED"}),
+    "super_admin.block_email": ("super_admin", {"email": "blocked@seed.local"}),
+}
+
+# route arguments -> context keys
+ROUTE_ARGS = {
+    "court_id": "court_id", "user_id": "owner_id", "booking_id": "booking_id",
+    "slot_id": "booked_slot_id", "msg_id": "message_id", "block_id": "block_id",
+}
+
+_TEMP_BTREE = re.compile(r"USE TEMP B-TREE FOR (.+)$")
+_PLAN_TABLE = re.compile(r"^(SCAN|SEARCH) (\w+)(?: AS (\w+))?(.*)$")
+
+
+# ---- dataset ----
+
+def build_dataset(app, users: int, courts: int, days: int, seed: int = 1, schema: str = "migrations") -> dict:
+    """Creates the schema, seeds it and returns the ids the routes are called with."""
+    from flask_migrate import upgrade
+
+    from models.blocked_email import BlockedEmail
+    from models.booking import Booking
+    from models.court import Court
+    from models.session import Session
+    from models.slot import Slot
+    from models.support_message import SupportMessage
+    from models.user import Role, User
+    from security.session import _hash_token
+    from utils.seed import seed_roles
+    from utils.seed_load import seed_load
+
+    with app.app_context():
+        if schema == "migrations":
+            upgrade(directory=os.path.join(app.root_path, "migrations"))
+        else:
+            db.create_all()
+        seed_roles()
+        credentials = {}
+        seed_load(
+            users=users, courts=courts, slots_per_court=16 * days, days_back=days // 2,
+            session_ratio=0.3, audit_per_user=5, seed=seed, credentials=credentials,
+        )
+
+        # variety the bulk seeder does not produce
+        court_rows = Court.query.order_by(Court.id).all()
+        for i, court in enumerate(court_rows[1:], start=1):
+            if i % 5 == 0:
+                court.status = "PENDING"
+            elif i % 17 == 0:
+                court.status, court.rejected_reason = "REJECTED", "seed"
+            elif i % 11 == 0:
+                court.is_active = False
+        player_ids = [uid for (uid,) in db.session.query(Session.user_id).join(User, User.id == Session.user_id)
+                      .filter(User.email.like("player%")).order_by(Session.user_id).all()]
+        for i in range(max(users // 10, 1)):
+            db.session.add(SupportMessage(
+                user_id=player_ids[i % len(player_ids)], court_id=court_rows[i % len(court_rows)].id,
+                message="seed", status=("OPEN", "RESOLVED", "IN_PROGRESS")[i % 3],
+            ))
+        db.session.add(BlockedEmail(email="seed-blocked@seed.local", email_normalized="seed-blocked@seed.local", reason="seed"))
+
+        admin = User(email="super@seed.local", password_hash="x", full_name="Super Admin", phone_number="9999999999")
+        admin.roles.append(Role.query.filter_by(name="SUPER_ADMIN").first())
+        db.session.add(admin)
+        db.session.flush()
+        db.session.add(Session(user_id=admin.id, token_hash=_hash_token(SUPER_ADMIN_TOKEN),
+                               expires_at=datetime.utcnow() + timedelta(days=1)))
+        db.session.commit()
+
+        owner = court_rows[0]
+        now = datetime.utcnow()
+        player_id = player_ids[0]
+        future = (Slot.query.filter(Slot.court_id == owner.id, Slot.start_time > now + timedelta(days=1), Slot.is_active.is_(True))
+                  .order_by(Slot.start_time).all())
+        booked = {b.slot_id: b for b in Booking.query.filter(Booking.slot_id.in_([s.id for s in future])).all()}
+        free = [s.id for s in future if s.id not in booked]
+        mine = next((b for b in booked.values() if b.user_id == player_id), None)
+        if mine is None:
+            # give the player a future booking to cancel
+            mine = next(iter(booked.values()))
+            mine.user_id = player_id
+            db.session.commit()
+
+        db.session.execute(db.text("ANALYZE"))
+        db.session.commit()
+        return {
+            "date": (now + timedelta(days=2)).date().isoformat(),
+            "court_id": owner.id,
+            "owner_id": owner.owner_user_id,
+            "owner_email": f"owner{owner.owner_user_id}@seed.local",
+            "owner_token": credentials["sessions"][owner.owner_user_id],
+            "player_id": player_id,
+            "player_email": f"player{player_id}@seed.local",
+            "player_token": credentials["sessions"][player_id],
+            "booking_id": mine.id,
+            "booked_slot_id": next(sid for sid in booked if sid != mine.slot_id),
+            "free_slot_id": free[0],
+            "free_slot_id_2": free[1],
+            "message_id": SupportMessage.query.order_by(SupportMessage.id).first().id,
+            "block_id": BlockedEmail.query.first().id,
+        }
+
+
+def table_rows(engine) -> dict:
+    with engine.connect() as conn:
+        names = inspect(conn).get_table_names()
+        return {name: conn.exec_driver_sql(f'SELECT COUNT(*) FROM "{name}"').scalar() for name in names}
+
+
+# ---- exercising routes ----
+
+class _Capture:
+    """Collects the plannable statements each route runs, keyed by fingerprint."""
+
+    def __init__(self):
+        self.current = None
+        self.statements = {}
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.current is None or executemany:
+            return
+        verb = statement.lstrip()[:6].upper()
+        if not verb.startswith(PLANNED):
+            return
+        sql = normalize(statement)
+        fp = fingerprint(sql)
+        entry = self.statements.get(fp)
+        if entry is None:
+            entry = self.statements[fp] = {
+                "fingerprint": fp, "sql": sql, "statement": statement, "parameters": parameters,
+                "engine": conn.engine, "endpoints": Counter(),
+            }
+        entry["endpoints"][self.current] += 1
+
+
+def _fill(value, ctx):
+    if isinstance(value, str):
+        if value.startswith("{") and value.endswith("}") and value[1:-1] in ctx:
+            return ctx[value[1:-1]]     # keep ints as ints in JSON bodies
+        return value.format(**ctx)
+    if isinstance(value, list):
+        return [_fill(v, ctx) for v in value]
+    if isinstance(value, dict):
+        return {k: _fill(v, ctx) for k, v in value.items()}
+    return value
+
+
+def _path(rule, ctx) -> str | None:
+    values = {}
+    for arg in rule.arguments:
+        if arg not in ROUTE_ARGS:
+            return None
+        values[arg] = ctx[ROUTE_ARGS[arg]]
+    return rule.rule if not values else re.sub(r"<(?:\w+:)?(\w+)>", lambda m: str(values[m.group(1)]), rule.rule)
+
+
+def _clients(app, ctx) -> dict:
+    cookie = app.config.get("AUTH_COOKIE_NAME", "futsalslot_session")
+    clients = {}
+    for persona, token in (("super_admin", SUPER_ADMIN_TOKEN), ("owner", ctx["owner_token"]), ("player", ctx["player_token"]), ("anonymous", None)):
+        client = app.test_client()
+        if token:
+            client.set_cookie(cookie, token)
+            client.set_cookie("csrf_token", "index-report")
+        clients[persona] = client
+    return clients
+
+
+def exercise(app, ctx, capture: _Capture) -> list:
+    """Calls every route; returns [{route, statuses per persona}]."""
+    clients = _clients(app, ctx)
+    headers = {"X-CSRF-Token": "index-report"}
+    rules = [r for r in app.url_map.iter_rules() if r.endpoint not in SKIP_ENDPOINTS]
+    calls = []
+    for rule in sorted(rules, key=lambda r: r.rule):
+        path = _path(rule, ctx)
+        if path is None:
+            continue
+        for method in sorted(rule.methods - {"HEAD", "OPTIONS"}):
+            calls.append((method != "GET", rule.endpoint, method, path))
+
+    out = []
+    # reads first, against the untouched dataset
+    for is_write, endpoint, method, path in sorted(calls, key=lambda c: c[0]):
+        key = f"{method} {endpoint}"
+        statuses = {}
+        if not is_write:
+            for persona in PERSONAS:
+                for variant in QUERY_VARIANTS.get(endpoint, [""]):
+                    url = path + ("?" + variant.format(**ctx) if variant else "")
+                    capture.current = key
+                    try:
+                        statuses[f"{persona} {variant}".strip()] = clients[persona].get(url, headers=headers).status_code
+                    finally:
+                        capture.current = None
+        else:
+            persona, body = WRITE_BODIES.get(endpoint, (None, {}))
+            for candidate in ((persona,) if persona else PERSONAS):
+                capture.current = key
+                try:
+                    status = clients[candidate].open(path, method=method, json=_fill(body, ctx), headers=headers).status_code
+                finally:
+                    capture.current = None
+                statuses[candidate] = status
+                if status not in (401, 403):
+                    break
+        out.append({"route": key, "path": path, "statuses": statuses})
+    return out
+
+
+# ---- plans and proposals ----
+
+def plan_issues(plan: list, rows: dict, min_rows: int, aliases: dict | None = None, sql: str = "") -> list:
+    """[{kind, table, alias, detail}] for full scans and temp B-trees on tables of min_rows or more."""
+    aliases = aliases or {}
+    issues = []
+    for line in plan:
+        detail = line.strip()
+        m = _PLAN_TABLE.match(detail)
+        if m and m.group(1) == "SCAN" and " USING " not in m.group(4):
+            # SQLite names the alias when there is one ("SCAN courts_1")
+            alias = m.group(3) or m.group(2)
+            table = aliases.get(alias, m.group(2))
+            if table in rows and rows[table] >= min_rows:
+                issues.append({"kind": "full_scan", "table": table, "alias": alias, "detail": detail})
+            continue
+        if _TEMP_BTREE.search(detail):
+            # charge it to the sorted table when the ORDER/GROUP BY names only one
+            sorted_aliases = {a for a in aliases if _order_columns(sql, a)}
+            alias = sorted_aliases.pop() if len(sorted_aliases) == 1 else None
+            table = aliases.get(alias)
+            if table is None or rows.get(table, 0) >= min_rows:
+                issues.append({"kind": "temp_btree", "table": table, "alias": alias, "detail": detail})
+    return issues
+
+
+def _aliases(sql: str, rows: dict) -> dict:
+    """alias -> table for the tables named in FROM/JOIN clauses."""
+    out = {}
+    for table, alias in re.findall(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+AS\s+(\w+))?", sql, re.IGNORECASE):
+        if table in rows:
+            out[alias or table] = table
+    return out
+
+
+def _predicates(sql: str, alias: str):
+    body = sql[sql.upper().find(" FROM "):]
+    equality, ranges = [], []
+    pattern = rf"\b{re.escape(alias)}\.(\w+)\s*(>=|<=|!=|<>|=|>|<|IN\b|IS NOT\b|IS\b|BETWEEN\b|LIKE\b)"
+    for column, op in re.findall(pattern, body, re.IGNORECASE):
+        op = op.upper()
+        if op in ("=", "IN", "IS"):
+            if column not in equality:
+                equality.append(column)
+        elif op in (">=", "<=", ">", "<", "BETWEEN"):
+            if column not in ranges:
+                ranges.append(column)
+    return equality, ranges
+
+
+def _order_columns(sql: str, alias: str) -> list:
+    m = re.search(r"\b(?:ORDER|GROUP) BY (.+?)(?: LIMIT | OFFSET |\)|$)", sql, re.IGNORECASE)
+    if not m:
+        return []
+    return [c for c in re.findall(rf"\b{re.escape(alias)}\.(\w+)", m.group(1))]
+
+
+def propose_columns(sql: str, alias: str, selectivity, max_equality: int = 2) -> list:
+    """The most selective equality columns, then one range column or the ORDER BY columns."""
+    equality, ranges = _predicates(sql, alias)
+    if "id" in equality:
+        return []       # primary key lookup; the scan is elsewhere
+    equality = sorted(equality, key=selectivity, reverse=True)[:max_equality]
+    tail = ranges[:1] or [c for c in _order_columns(sql, alias) if c not in equality]
+    return equality + [c for c in tail if c not in equality]
+
+
+def _existing_indexes(engine, table: str) -> list:
+    insp = inspect(engine)
+    out = [(ix["name"], ix["column_names"]) for ix in insp.get_indexes(table)]
+    out += [(uc["name"] or "unique", uc["column_names"]) for uc in insp.get_unique_constraints(table)]
+    pk = insp.get_pk_constraint(table).get("constrained_columns") or []
+    if pk:
+        out.append(("primary key", pk))
+    return out
+
+
+def _covering_index(engine, table: str, columns: list, equality: list) -> str | None:
+    """
+    Name of an existing index that already serves the proposed `columns`.
+
+    Equality columns can be matched in any order, so an index covers when its
+    leading run of the statement's `equality` columns holds every proposed
+    equality column, and either narrows further (more equality columns) or
+    continues with the proposed range/ORDER BY columns.
+    """
+    n = 0
+    while n < len(columns) and columns[n] in equality:
+        n += 1
+    wanted, tail = set(columns[:n]), columns[n:]
+    for name, cols in _existing_indexes(engine, table):
+        run = 0
+        while run < len(cols) and cols[run] in equality:
+            run += 1
+        if not wanted <= set(cols[:run]):
+            continue
+        if run > n or cols[run:run + len(tail)] == tail:
+            return name
+    return None
+
+
+def index_name(table: str, columns: list) -> str:
+    return f"ix_{table}_{'_'.join(columns)}"[:60]
+
+
+def analyze(engine, capture: _Capture, rows: dict, min_rows: int) -> tuple:
+    """Plans every captured statement; returns (findings, proposals)."""
+    distinct = {}
+
+    def selectivity(table):
+        def key(column):
+            if (table, column) not in distinct:
+                with engine.connect() as conn:
+                    distinct[(table, column)] = conn.exec_driver_sql(f'SELECT COUNT(DISTINCT "{column}") FROM "{table}"').scalar()
+            return distinct[(table, column)]
+        return key
+
+    findings, proposals = [], {}
+    for entry in capture.statements.values():
+        aliases = entry["aliases"] = _aliases(entry["sql"], rows)
+        plan = entry["plan"] = explain(engine, entry["statement"], entry["parameters"])
+        issues = entry["issues"] = plan_issues(plan, rows, min_rows, aliases, entry["sql"])
+        if not issues:
+            continue
+        for issue in issues:
+            if not issue["table"]:
+                issue["advice"] = "sort spans several tables; no single index removes it"
+                continue
+            columns = propose_columns(entry["sql"], issue["alias"], selectivity(issue["table"]))
+            if issue["kind"] == "temp_btree" and not _order_columns(entry["sql"], issue["alias"]):
+                columns = []
+            if not columns:
+                issue["advice"] = "no indexable predicate (unfiltered scan: paginate, pre-aggregate or accept)"
+                continue
+            equality, _ = _predicates(entry["sql"], issue["alias"])
+            covered = _covering_index(engine, issue["table"], columns, equality)
+            if covered:
+                issue["advice"] = f"existing index {covered} already covers {columns}"
+                continue
+            name = index_name(issue["table"], columns)
+            issue["advice"] = f"proposed {name}"
+            proposal = proposals.setdefault(name, {
+                "name": name, "table": issue["table"], "columns": columns,
+                "rows": rows.get(issue["table"]), "routes": Counter(), "fingerprints": set(), "flags": 0,
+            })
+            proposal["routes"].update(entry["endpoints"])
+            proposal["fingerprints"].add(entry["fingerprint"])
+            proposal["flags"] += 1
+        findings.append({
+            "fingerprint": entry["fingerprint"], "sql": entry["sql"], "routes": dict(entry["endpoints"]),
+            "plan": plan, "issues": issues,
+        })
+
+    # a proposal that is a prefix of another on the same table is served by the longer one
+    for name, proposal in list(proposals.items()):
+        longer = next((p for p in proposals.values() if p is not proposal and p["table"] == proposal["table"]
+                       and p["columns"][:len(proposal["columns"])] == proposal["columns"]), None)
+        if longer is not None:
+            longer["routes"].update(proposal["routes"])
+            longer["fingerprints"] |= proposal["fingerprints"]
+            longer["flags"] += proposal["flags"]
+            del proposals[name]
+    return findings, sorted(proposals.values(), key=lambda p: (-p["flags"], p["name"]))
+
+
+def verify(engine, capture: _Capture, proposals: list, rows: dict, min_rows: int) -> None:
+    """Creates each proposed index alone, re-plans the statements it targets, drops it again."""
+    for proposal in proposals:
+        columns = ", ".join(f'"{c}"' for c in proposal["columns"])
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f'CREATE INDEX "{proposal["name"]}" ON "{proposal["table"]}" ({columns})')
+            conn.exec_driver_sql(f'ANALYZE "{proposal["table"]}"')
+        try:
+            improved, after = 0, {}
+            for fp in sorted(proposal["fingerprints"]):
+                entry = capture.statements[fp]
+                plan = explain(engine, entry["statement"], entry["parameters"])
+                after[fp] = plan
+                if len(plan_issues(plan, rows, min_rows, entry["aliases"], entry["sql"])) < len(entry["issues"]):
+                    improved += 1
+            proposal["plans_after"] = after
+            proposal["statements_improved"] = improved
+            proposal["used"] = any(proposal["name"] in line for plan in after.values() for line in plan)
+        finally:
+            with engine.begin() as conn:
+                conn.exec_driver_sql(f'DROP INDEX "{proposal["name"]}"')
+                conn.exec_driver_sql(f'ANALYZE "{proposal["table"]}"')
+        proposal["fingerprints"] = sorted(proposal["fingerprints"])
+        proposal["routes"] = dict(proposal["routes"].most_common())
+
+
+# ---- output ----
+
+def alembic_op(proposal: dict) -> str:
+    return f"batch_op.create_index('{proposal['name']}', {proposal['columns']!r}, unique=False)"
+
+
+def model_index(proposal: dict) -> str:
+    columns = ", ".join(f'"{c}"' for c in proposal["columns"])
+    return f'db.Index("{proposal["name"]}", {columns}),'
+
+
+def render_migration(proposals: list, revision: str, down_revision: str) -> str:
+    by_table = {}
+    for proposal in proposals:
+        by_table.setdefault(proposal["table"], []).append(proposal)
+    upgrade, downgrade = [], []
+    for table, items in sorted(by_table.items()):
+        upgrade.append(f"    with op.batch_alter_table('{table}', schema=None) as batch_op:")
+        upgrade += [f"        {alembic_op(p)}" for p in items]
+        upgrade.append("")
+        downgrade.append(f"    with op.batch_alter_table('{table}', schema=None) as batch_op:")
+        downgrade += [f"        batch_op.drop_index('{p['name']}')" for p in items]
+        downgrade.append("")
+    return f'''"""add indexes proposed by flask perf index-report
+
+Revision ID: {revision}
+Revises: {down_revision}
+Create Date: {datetime.utcnow():%Y-%m-%d %H:%M:%S.%f}
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '{revision}'
+down_revision = '{down_revision}'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+{chr(10).join(upgrade).rstrip()}
+
+def downgrade():
+{chr(10).join(downgrade).rstrip()}
+'''
+
+
+def write_migration(app, proposals: list) -> str:
+    """Writes a migration creating `proposals` on top of the current head; returns its path."""
+    from alembic.config import Config as AlembicConfig
+    from alembic.script import ScriptDirectory
+
+    directory = os.path.join(app.root_path, "migrations")
+    config = AlembicConfig()
+    config.set_main_option("script_location", directory)
+    head = ScriptDirectory.from_config(config).get_current_head()
+    revision = uuid.uuid4().hex[:12]
+    path = os.path.join(directory, "versions", f"{revision}_add_advised_indexes.py")
+    with open(path, "w") as fh:
+        fh.write(render_migration(proposals, revision, head))
+    return path
+
+
+def run_report(app, users: int, courts: int, days: int, min_rows: int, seed: int = 1, schema: str = "migrations") -> dict:
+    """Seeds `app`'s (throwaway) database, calls every route and plans what they ran."""
+    ctx = build_dataset(app, users=users, courts=courts, days=days, seed=seed, schema=schema)
+    capture = _Capture()
+    with app.app_context():
+        engines = set(db.engines.values())
+        engine = db.engine
+    if app.extensions.get("read_engine") is not None:
+        engines.add(app.extensions["read_engine"])
+    for e in engines:
+        event.listen(e, "before_cursor_execute", capture)
+    try:
+        routes = exercise(app, ctx, capture)
+    finally:
+        for e in engines:
+            event.remove(e, "before_cursor_execute", capture)
+
+    rows = table_rows(engine)
+    findings, proposals = analyze(engine, capture, rows, min_rows)
+    verify(engine, capture, proposals, rows, min_rows)
+    discarded = {p["name"] for p in proposals if not p["statements_improved"]}
+    for finding in findings:
+        for issue in finding["issues"]:
+            name = issue.get("advice", "").removeprefix("proposed ")
+            if name in discarded:
+                issue["advice"] = f"{name} would not improve the plan; not proposed"
+    return {
+        "dataset": rows,
+        "routes": routes,
+        "statements": len(capture.statements),
+        "findings": findings,
+        "proposals": [p for p in proposals if p["statements_improved"]],
+        "discarded": sorted(discarded),
+    }
@@ -0,0 +1,293 @@
+"""
+Request metrics in Prometheus text format.
+
+Hooks installed by init_metrics record, per Flask endpoint (the route name,
+never the raw path) and standard HTTP method (anything else counts as
+"other"), so label cardinality stays bounded:
+
+- futsalslot_http_requests_total{endpoint,method,status}
+- futsalslot_http_request_duration_seconds{endpoint,method} (histogram)
+- futsalslot_http_request_db_seconds_total / _db_queries_total{endpoint}
+  (from utils.query_stats, so QUERY_STATS_ENABLED must be on)
+- futsalslot_http_requests_in_flight
+
+Recording is a few dict updates under one lock, with no I/O on the request
+path, cheap enough to leave on in production. /metrics itself is only
+served with a METRICS_TOKEN Bearer token (or in debug mode).
+
+Multiple workers (gunicorn etc.): with METRICS_MULTIPROC_DIR set, each
+process writes its series to <dir>/metrics-<pid>.json at most every
+METRICS_FLUSH_SECONDS (and at exit), and /metrics sums every file in the
+directory. Counters of exited workers keep counting; the in-flight gauge
+only includes live processes. Empty the directory when deploying, as with
+prometheus_client's multiprocess mode.
+"""
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+
+from flask import g, request
+
+from utils.query_stats import current_stats
+
+PREFIX = "futsalslot_"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+HTTP_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "CONNECT", "TRACE"))
+
+
+def method_label(method: str) -> str:
+    """The request method as a label value; client-invented methods share "other"."""
+    return method if method in HTTP_METHODS else "other"
+
+
+class RequestMetrics:
+    """Per-process counters and latency histograms, keyed by label tuples."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.requests = {}      # (endpoint, method, status) -> count
+        self.latency = {}       # (endpoint, method) -> [per-bucket counts..., +Inf count, sum]
+        self.db_seconds = {}    # endpoint -> seconds
+        self.db_queries = {}    # endpoint -> statements
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def finish(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def observe(self, endpoint: str, method: str, status: int, seconds: float, db_seconds=None, db_queries=None) -> None:
+        slot = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            key = (endpoint, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            hist = self.latency.get((endpoint, method))
+            if hist is None:
+                hist = self.latency[(endpoint, method)] = [0] * (len(self.buckets) + 1) + [0.0]
+            hist[slot] += 1
+            hist[-1] += seconds
+            if db_seconds is not None:
+                self.db_seconds[endpoint] = self.db_seconds.get(endpoint, 0.0) + db_seconds
+                self.db_queries[endpoint] = self.db_queries.get(endpoint, 0) + db_queries
+
+    def state(self) -> dict:
+        """JSON-serializable copy (label tuples become lists)."""
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "buckets": list(self.buckets),
+                "requests": [[list(k), v] for k, v in self.requests.items()],
+                "latency": [[list(k), list(v)] for k, v in self.latency.items()],
+                "db_seconds": [[[k], v] for k, v in self.db_seconds.items()],
+                "db_queries": [[[k], v] for k, v in self.db_queries.items()],
+                "in_flight": self.in_flight,
+            }
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge(states: list) -> dict:
+    """Sums worker states. Histograms with different bucket layouts are skipped."""
+    buckets = states[0]["buckets"] if states else list(DEFAULT_BUCKETS)
+    out = {"buckets": buckets, "requests": {}, "latency": {}, "db_seconds": {}, "db_queries": {}, "in_flight": 0, "workers": 0}
+    for state in states:
+        for name in ("requests", "db_seconds", "db_queries"):
+            series = out[name]
+            for labels, value in state[name]:
+                key = tuple(labels)
+                series[key] = series.get(key, 0) + value
+        if state["buckets"] == buckets:
+            for labels, hist in state["latency"]:
+                key = tuple(labels)
+                total = out["latency"].get(key)
+                out["latency"][key] = [a + b for a, b in zip(total, hist)] if total else list(hist)
+        if _pid_alive(state["pid"]):
+            out["in_flight"] += state["in_flight"]
+            out["workers"] += 1
+    return out
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(merged: dict) -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f"# HELP {PREFIX}{name} {help_text}")
+        lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+    family("http_requests_total", "counter", "HTTP requests by Flask endpoint, method and status.")
+    for key, value in sorted(merged["requests"].items()):
+        lines.append(f"{PREFIX}http_requests_total{_labels(('endpoint', 'method', 'status'), key)} {value}")
+
+    family("http_request_duration_seconds", "histogram", "Request latency from the first before_request hook to the last after_request hook.")
+    bounds = list(merged["buckets"]) + [float("inf")]
+    for key, hist in sorted(merged["latency"].items()):
+        cumulative = 0
+        for bound, count in zip(bounds, hist):
+            cumulative += count
+            le = 'le="' + _num(float(bound)) + '"'
+            lines.append(f"{PREFIX}http_request_duration_seconds_bucket{_labels(('endpoint', 'method'), key, le)} {cumulative}")
+        lines.append(f"{PREFIX}http_request_duration_seconds_sum{_labels(('endpoint', 'method'), key)} {_num(float(hist[-1]))}")
+        lines.append(f"{PREFIX}http_request_duration_seconds_count{_labels(('endpoint', 'method'), key)} {cumulative}")
+
+    family("http_request_db_seconds_total", "counter", "Time spent executing SQL statements, by endpoint.")
+    for key, value in sorted(merged["db_seconds"].items()):
+        lines.append(f"{PREFIX}http_request_db_seconds_total{_labels(('endpoint',), key)} {_num(float(value))}")
+
+    family("http_request_db_queries_total", "counter", "SQL statements executed, by endpoint.")
+    for key, value in sorted(merged["db_queries"].items()):
+        lines.append(f"{PREFIX}http_request_db_queries_total{_labels(('endpoint',), key)} {value}")
+
+    family("http_requests_in_flight", "gauge", "Requests currently being handled (live workers).")
+    lines.append(f"{PREFIX}http_requests_in_flight {merged['in_flight']}")
+
+    family("metrics_workers", "gauge", "Live worker processes contributing to these metrics.")
+    lines.append(f"{PREFIX}metrics_workers {merged['workers']}")
+    return "\n".join(lines) + "\n"
+
+
+class _Exporter:
+    """Writes this process's state to the shared directory and reads everyone's back."""
+
+    def __init__(self, metrics: RequestMetrics, directory: str | None, flush_seconds: float):
+        self.metrics = metrics
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._next_flush = 0.0
+        self._flush_lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            atexit.register(self._flush_at_exit)
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"metrics-{pid}.json")
+
+    def flush(self) -> None:
+        if not self.directory:
+            return
+        state = self.metrics.state()
+        path = self._path(state["pid"])
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(state, fh, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def _flush_at_exit(self) -> None:
+        try:
+            self.flush()
+        except OSError:
+            pass    # directory removed (deploy cleanup) before this worker exited
+
+    def maybe_flush(self) -> None:
+        now = time.monotonic()
+        if not self.directory or now < self._next_flush:
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_flush = now + self.flush_seconds
+            self.flush()
+        finally:
+            self._flush_lock.release()
+
+    def collect(self) -> dict:
+        if not self.directory:
+            return merge([self.metrics.state()])
+        self.flush()
+        states = []
+        for name in os.listdir(self.directory):
+            if not (name.startswith("metrics-") and name.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as fh:
+                    states.append(json.load(fh))
+            except (OSError, ValueError):
+                continue    # being replaced or truncated; picked up next scrape
+        return merge(states)
+
+
+def render_metrics(app) -> str | None:
+    """The /metrics body for this app, or None when METRICS_ENABLED is off."""
+    exporter = app.extensions.get("metrics")
+    return render(exporter.collect()) if exporter else None
+
+
+def _parse_buckets(raw) -> tuple:
+    if not raw:
+        return DEFAULT_BUCKETS
+    if isinstance(raw, str):
+        raw = [b for b in raw.split(",") if b.strip()]
+    return tuple(sorted(float(b) for b in raw))
+
+
+def init_metrics(app) -> None:
+    """Registers the request hooks; call before the other hooks so timing covers them."""
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    metrics = RequestMetrics(_parse_buckets(app.config.get("METRICS_BUCKETS")))
+    exporter = app.extensions["metrics"] = _Exporter(
+        metrics,
+        app.config.get("METRICS_MULTIPROC_DIR") or None,
+        float(app.config.get("METRICS_FLUSH_SECONDS", 5)),
+    )
+
+    @app.before_request
+    def _start_request_metrics():
+        g._metrics_started = time.perf_counter()
+        metrics.start()
+
+    @app.after_request
+    def _record_request_metrics(resp):
+        started = g.get("_metrics_started")
+        if started is None:
+            return resp
+        stats = current_stats()
+        metrics.observe(
+            request.endpoint or "unmatched",
+            method_label(request.method),
+            resp.status_code,
+            time.perf_counter() - started,
+            stats.time_ms / 1000.0 if stats is not None else None,
+            stats.count if stats is not None else None,
+        )
+        exporter.maybe_flush()
+        return resp
+
+    @app.teardown_request
+    def _finish_request_metrics(exc=None):
+        if g.pop("_metrics_started", None) is not None:
+            metrics.finish()
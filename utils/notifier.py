@@ -0,0 +1,81 @@
+import logging
+import queue
+import threading
+
+from flask import current_app
+
+from utils.emailer import send_emails
+
+logger = logging.getLogger(__name__)
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="email-notifier", daemon=True)
+            _worker.start()
+
+
+def _drain(first, batch_size: int):
+    batch = [first]
+    while len(batch) < batch_size:
+        try:
+            batch.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _send_batch(app, messages):
+    with app.app_context():
+        results = send_emails(messages)
+    for (to_email, subject, _), (ok, error) in zip(messages, results):
+        if not ok:
+            logger.warning("notification to %s failed (%s): %s", to_email, subject, error)
+
+
+def _run():
+    while True:
+        first = _queue.get()
+        app = first[0]
+        batch = _drain(first, app.config.get("NOTIFY_BATCH_SIZE", 50))
+
+        # a batch can in theory mix apps (tests); send per app
+        by_app = {}
+        for item_app, message in batch:
+            by_app.setdefault(item_app, []).append(message)
+        for item_app, messages in by_app.items():
+            try:
+                _send_batch(item_app, messages)
+            except Exception:
+                logger.exception("notification batch failed")
+        for _ in batch:
+            _queue.task_done()
+
+
+def notify_emails(messages):
+    """
+    Queues (to_email, subject, body) messages for delivery.
+    With NOTIFY_ASYNC the caller returns immediately and a background thread
+    sends them in batches over one SMTP connection; otherwise they are sent inline.
+    """
+    if not messages:
+        return
+    app = current_app._get_current_object()
+    if not app.config.get("NOTIFY_ASYNC", True):
+        _send_batch(app, list(messages))
+        return
+
+    _ensure_worker()
+    for message in messages:
+        _queue.put((app, message))
+
+
+def wait_for_notifications():
+    """Blocks until every queued notification has been handled (CLI/tests)."""
+    _queue.join()
@@ -0,0 +1,212 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+import stripe
+from flask import current_app
+
+from utils.tracing import span
+
+
+class PaymentProviderError(Exception):
+    """The payment provider rejected or failed a call."""
+
+
+class ProviderMetrics:
+    """Per-operation call counts, errors and latency percentiles (last N calls)."""
+
+    def __init__(self, window: int = 512):
+        self._window = window
+        self._ops = {}
+        self._lock = threading.Lock()
+
+    def _op(self, name: str) -> dict:
+        op = self._ops.get(name)
+        if op is None:
+            op = self._ops[name] = {"calls": 0, "errors": 0, "timeouts": 0, "total_ms": 0.0, "max_ms": 0.0, "recent": deque(maxlen=self._window)}
+        return op
+
+    def record(self, name: str, elapsed_ms: float, error: str | None = None) -> None:
+        with self._lock:
+            op = self._op(name)
+            op["calls"] += 1
+            op["total_ms"] += elapsed_ms
+            op["max_ms"] = max(op["max_ms"], elapsed_ms)
+            op["recent"].append(elapsed_ms)
+            if error:
+                op["errors"] += 1
+                if error == "timeout":
+                    op["timeouts"] += 1
+
+    @contextmanager
+    def timed(self, name: str):
+        started = time.perf_counter()
+        error = None
+        try:
+            with span(f"payments {name}", "client", **{"peer.service": "stripe"}):
+                yield
+        except stripe.error.APIConnectionError as exc:
+            error = "timeout" if "timed out" in str(exc).lower() else "connection"
+            raise
+        except Exception:
+            error = "error"
+            raise
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000.0, error)
+
+    def snapshot(self) -> dict:
+        out = {}
+        with self._lock:
+            for name, op in self._ops.items():
+                recent = sorted(op["recent"])
+                pick = lambda pct: round(recent[min(len(recent) - 1, int(len(recent) * pct))], 2) if recent else 0.0
+                out[name] = {
+                    "calls": op["calls"],
+                    "errors": op["errors"],
+                    "timeouts": op["timeouts"],
+                    "mean_ms": round(op["total_ms"] / op["calls"], 2) if op["calls"] else 0.0,
+                    "max_ms": round(op["max_ms"], 2),
+                    "p50_ms": pick(0.50),
+                    "p95_ms": pick(0.95),
+                    "p99_ms": pick(0.99),
+                }
+        return out
+
+
+def as_dict(obj) -> dict:
+    # stripe objects are dicts in older SDKs and expose to_dict() in newer ones
+    if obj is None or isinstance(obj, dict):
+        return obj or {}
+    to_dict = getattr(obj, "to_dict", None)
+    return to_dict() if to_dict else dict(obj)
+
+
+class StripeProvider:
+    """
+    Checkout sessions and webhook verification backed by the Stripe API.
+
+    Owns one StripeClient over a pooled keep-alive requests.Session with
+    explicit connect/read timeouts. The provider is created lazily per app
+    (so once per worker process, after any fork) and never touches the
+    module-global stripe.api_key.
+    """
+
+    name = "STRIPE"
+
+    def __init__(
+        self,
+        secret_key: str | None,
+        webhook_secret: str | None,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 15.0,
+        pool_size: int = 10,
+        max_retries: int = 1,
+    ):
+        self.secret_key = secret_key
+        self.webhook_secret = webhook_secret
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.metrics = ProviderMetrics()
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    def config_error(self) -> str | None:
+        if not self.secret_key:
+            return "Stripe secret key missing (STRIPE_SECRET_KEY)"
+        return None
+
+    def _build_client(self):
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        http_client = stripe.RequestsClient(timeout=(self.connect_timeout, self.read_timeout), session=session)
+        # retries are safe: checkout creation always carries an idempotency key
+        return stripe.StripeClient(self.secret_key, http_client=http_client, max_network_retries=self.max_retries)
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._build_client()
+        return self._client
+
+    def create_checkout_session(self, *, line_items, success_url, cancel_url, metadata, expires_at, idempotency_key) -> dict:
+        params = {
+            "mode": "payment",
+            "expires_at": expires_at,
+            "line_items": line_items,
+            "success_url": success_url,
+            "cancel_url": cancel_url,
+            "metadata": metadata,
+        }
+        try:
+            with self.metrics.timed("checkout.sessions.create"):
+                session = self.client.v1.checkout.sessions.create(params=params, options={"idempotency_key": idempotency_key})
+        except stripe.error.StripeError as exc:
+            raise PaymentProviderError(str(exc)) from exc
+        return {"id": session["id"], "url": session["url"]}
+
+    def retrieve_checkout_session(self, session_id: str) -> dict:
+        try:
+            with self.metrics.timed("checkout.sessions.retrieve"):
+                return as_dict(self.client.v1.checkout.sessions.retrieve(session_id))
+        except stripe.error.StripeError as exc:
+            raise PaymentProviderError(str(exc)) from exc
+
+    def verify_webhook(self, payload: bytes, sig_header: str | None) -> None:
+        """Raises if the payload was not signed with the webhook secret."""
+        stripe.Webhook.construct_event(payload, sig_header, self.webhook_secret)
+
+
+def create_provider(app):
+    kind = (app.config.get("PAYMENT_PROVIDER") or "stripe").lower()
+    if kind == "fake":
+        from utils.fake_stripe import FakeStripeProvider, deliver_to_app
+
+        webhook_secret = app.config.get("FAKE_STRIPE_WEBHOOK_SECRET") or os.getenv("STRIPE_WEBHOOK_SECRET")
+        if not webhook_secret:
+            if not (app.debug or app.testing):
+                raise ValueError(
+                    "PAYMENT_PROVIDER=fake needs FAKE_STRIPE_WEBHOOK_SECRET or STRIPE_WEBHOOK_SECRET outside DEBUG/TESTING"
+                )
+            webhook_secret = "whsec_fake_local"
+        provider = FakeStripeProvider(
+            webhook_secret=webhook_secret,
+            latency_s=app.config.get("FAKE_STRIPE_LATENCY_MS", 0) / 1000.0,
+        )
+        rate = app.config.get("FAKE_STRIPE_REPLAY_RATE", 0)
+        if rate:
+            provider.start_replayer(deliver_to_app(app), rate, app.config.get("FAKE_STRIPE_EXPIRE_RATIO", 0.0))
+        return provider
+    if kind != "stripe":
+        raise ValueError(f"Unknown PAYMENT_PROVIDER {kind!r}")
+    return StripeProvider(
+        os.getenv("STRIPE_SECRET_KEY"),
+        os.getenv("STRIPE_WEBHOOK_SECRET"),
+        connect_timeout=app.config.get("PAYMENT_PROVIDER_CONNECT_TIMEOUT", 3.0),
+        read_timeout=app.config.get("PAYMENT_PROVIDER_READ_TIMEOUT", 15.0),
+        pool_size=app.config.get("PAYMENT_PROVIDER_POOL_SIZE", 10),
+        max_retries=app.config.get("PAYMENT_PROVIDER_MAX_RETRIES", 1),
+    )
+
+
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    """The app's payment provider, created on first use (once per worker process)."""
+    app = current_app._get_current_object()
+    provider = app.extensions.get("payment_provider")
+    if provider is None:
+        with _provider_lock:
+            provider = app.extensions.get("payment_provider")
+            if provider is None:
+                provider = app.extensions["payment_provider"] = create_provider(app)
+    return provider
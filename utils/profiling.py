@@ -0,0 +1,301 @@
+"""
+Sampled, on-demand request profiling.
+
+A request is profiled when either:
+
+- it is picked at random with probability PROFILE_SAMPLE_RATE (0 = never;
+  /health and /metrics are never sampled), or
+- it carries a valid signed X-Profile-Token header, made with
+  `flask profile-token` (HMAC of an expiry time with PROFILE_SECRET).
+  This lets ops profile a specific slow endpoint in production without
+  raising the sample rate. Without PROFILE_SECRET the header is ignored;
+  there is deliberately no fallback to SECRET_KEY, whose default is public.
+
+At most one request per process is profiled at a time; others run normally.
+The profiler runs from the first before_request hook to teardown, and each
+profile leaves files in PROFILE_DIR named <id>.*:
+
+- PROFILE_MODE=cprofile: <id>.prof, a pstats dump (`python -m pstats`,
+  snakeviz);
+- PROFILE_MODE=sample: <id>.collapsed, stacks sampled every
+  PROFILE_SAMPLE_INTERVAL_MS from a helper thread, in collapsed format
+  (flamegraph.pl, speedscope). This has lower overhead than cprofile;
+- with PROFILE_TRACEMALLOC, or a token made with --memory: <id>.tracemalloc
+  (tracemalloc.Snapshot.load) and <id>.mem.txt (top allocation sites still
+  alive at the end of the request, plus the peak);
+- <id>.json: endpoint, status, duration, trigger and file list.
+
+Only the newest PROFILE_MAX_PROFILES profiles are kept. Super admins list
+and download them under /super-admin/profiles.
+"""
+import cProfile
+import hashlib
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request
+
+TOKEN_HEADER = "X-Profile-Token"
+NEVER_SAMPLED = ("health",)   # blueprints skipped by random sampling
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ---- signed header ----
+
+def header_enabled(app) -> bool:
+    return bool(app.config.get("PROFILE_SECRET"))
+
+
+def _sign(app, payload: str) -> str:
+    secret = app.config["PROFILE_SECRET"].encode()
+    return hmac.new(secret, f"profile:{payload}".encode(), hashlib.sha256).hexdigest()
+
+
+def make_token(app, minutes: int = 15, memory: bool = False) -> str:
+    """'<expires>.<flags>.<signature>' accepted in X-Profile-Token until it expires; needs PROFILE_SECRET."""
+    if not header_enabled(app):
+        raise ValueError("PROFILE_SECRET is not set; X-Profile-Token is disabled")
+    payload = f"{int(time.time()) + minutes * 60}.{'m' if memory else '-'}"
+    return f"{payload}.{_sign(app, payload)}"
+
+
+def check_token(app, token: str) -> dict | None:
+    """{'memory': bool} for a valid, unexpired token, else None (always None without PROFILE_SECRET)."""
+    if not header_enabled(app):
+        return None
+    try:
+        expires, flags, signature = token.strip().split(".")
+        live = int(expires) >= time.time()
+    except ValueError:
+        return None
+    if not live or not hmac.compare_digest(signature, _sign(app, f"{expires}.{flags}")):
+        return None
+    return {"memory": "m" in flags}
+
+
+# ---- stack sampler ----
+
+def _frame_label(code) -> str:
+    path = code.co_filename
+    if path.startswith(_ROOT):
+        path = os.path.relpath(path, _ROOT)
+    elif "site-packages" in path:
+        path = path.split("site-packages" + os.sep, 1)[1]
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples one thread's Python stack every `interval` seconds into collapsed-stack counts."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        labels = {}
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+
+# ---- storage ----
+
+def profile_dir(app) -> str:
+    return app.config.get("PROFILE_DIR") or os.path.join(app.instance_path, "profiles")
+
+
+def list_profiles(app, limit: int = 50) -> list:
+    """Metadata of the newest profiles, newest first."""
+    directory = profile_dir(app)
+    if not os.path.isdir(directory):
+        return []
+    names = sorted((n for n in os.listdir(directory) if n.endswith(".json")), reverse=True)
+    out = []
+    for name in names[:limit]:
+        try:
+            with open(os.path.join(directory, name)) as fh:
+                out.append(json.load(fh))
+        except (OSError, ValueError):
+            continue
+    return out
+
+
+def profile_file(app, profile_id: str, filename: str) -> str | None:
+    """Absolute path of one file of a profile, or None if it is not one of its files."""
+    for meta in list_profiles(app, limit=int(app.config.get("PROFILE_MAX_PROFILES", 200))):
+        if meta["id"] == profile_id and filename in meta["files"]:
+            return os.path.join(profile_dir(app), filename)
+    return None
+
+
+def _rotate(directory: str, keep: int) -> None:
+    ids = sorted({n.split(".", 1)[0] for n in os.listdir(directory) if not n.startswith(".")}, reverse=True)
+    stale = set(ids[keep:])
+    if not stale:
+        return
+    for name in os.listdir(directory):
+        if name.split(".", 1)[0] in stale:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+# ---- request hooks ----
+
+class _ActiveProfile:
+    def __init__(self, trigger: str, mode: str, memory: bool):
+        self.trigger = trigger
+        self.mode = mode
+        self.memory = memory
+        self.profiler = None
+        self.sampler = None
+        self.status = None
+        self.started = time.perf_counter()
+
+
+def _should_profile(app) -> dict | None:
+    token = request.headers.get(TOKEN_HEADER)
+    if token:
+        checked = check_token(app, token)
+        if checked is not None:
+            return {"trigger": "header", "memory": checked["memory"]}
+    rate = app.config.get("PROFILE_SAMPLE_RATE", 0.0)
+    if rate > 0 and request.blueprint not in NEVER_SAMPLED and random.random() < rate:
+        return {"trigger": "sampled", "memory": False}
+    return None
+
+
+def _write_profile(app, active: _ActiveProfile, elapsed_ms: float) -> None:
+    directory = profile_dir(app)
+    os.makedirs(directory, exist_ok=True)
+    endpoint = request.endpoint or "unmatched"
+    profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{os.getpid()}-{endpoint.replace('.', '-')}"
+    files = []
+
+    if active.profiler is not None:
+        active.profiler.dump_stats(os.path.join(directory, f"{profile_id}.prof"))
+        files.append(f"{profile_id}.prof")
+    if active.sampler is not None:
+        with open(os.path.join(directory, f"{profile_id}.collapsed"), "w") as fh:
+            for stack, count in active.sampler.stacks.most_common():
+                fh.write(f"{stack} {count}\n")
+        files.append(f"{profile_id}.collapsed")
+    if active.memory:
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        snapshot.dump(os.path.join(directory, f"{profile_id}.tracemalloc"))
+        with open(os.path.join(directory, f"{profile_id}.mem.txt"), "w") as fh:
+            fh.write(f"peak traced memory during request: {peak / 1024:.1f} KiB\n\n")
+            for stat in snapshot.statistics("lineno")[:50]:
+                fh.write(f"{stat}\n")
+        files += [f"{profile_id}.tracemalloc", f"{profile_id}.mem.txt"]
+
+    meta = {
+        "id": profile_id,
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "method": request.method,
+        "path": request.path,
+        "endpoint": endpoint,
+        "status": active.status,
+        "duration_ms": round(elapsed_ms, 2),
+        "trigger": active.trigger,
+        "mode": active.mode,
+        "pid": os.getpid(),
+        "files": files,
+    }
+    with open(os.path.join(directory, f"{profile_id}.json"), "w") as fh:
+        json.dump(meta, fh)
+    _rotate(directory, int(app.config.get("PROFILE_MAX_PROFILES", 200)))
+
+
+def init_profiling(app) -> None:
+    """Registers the profiling hooks; call before every other hook so they are profiled too."""
+    busy = threading.Lock()     # one profiled request per process
+
+    @app.before_request
+    def _start_profile():
+        wanted = _should_profile(app)
+        if wanted is None or not busy.acquire(blocking=False):
+            return
+        mode = app.config.get("PROFILE_MODE", "cprofile")
+        active = g._profile = _ActiveProfile(wanted["trigger"], mode, wanted["memory"] or app.config.get("PROFILE_TRACEMALLOC", False))
+        if active.memory and tracemalloc.is_tracing():
+            active.memory = False   # someone else (e.g. PYTHONTRACEMALLOC) owns tracemalloc
+        if active.memory:
+            tracemalloc.start(int(app.config.get("PROFILE_TRACEMALLOC_FRAMES", 10)))
+        if mode == "sample":
+            active.sampler = StackSampler(threading.get_ident(), float(app.config.get("PROFILE_SAMPLE_INTERVAL_MS", 1)) / 1000.0)
+            active.sampler.start()
+        else:
+            active.profiler = cProfile.Profile()
+            try:
+                active.profiler.enable()
+            except ValueError:
+                # another profiler (debugger, coverage) holds the hook
+                g.pop("_profile")
+                if active.memory:
+                    tracemalloc.stop()
+                busy.release()
+                return
+        active.started = time.perf_counter()
+
+    @app.after_request
+    def _profile_status(resp):
+        active = g.get("_profile")
+        if active is not None:
+            active.status = resp.status_code
+        return resp
+
+    @app.teardown_request
+    def _finish_profile(exc=None):
+        active = g.pop("_profile", None)
+        if active is None:
+            return
+        try:
+            if active.profiler is not None:
+                active.profiler.disable()
+            if active.sampler is not None:
+                active.sampler.stop()
+            elapsed_ms = (time.perf_counter() - active.started) * 1000.0
+            try:
+                _write_profile(app, active, elapsed_ms)
+            except OSError:
+                app.logger.exception("could not write request profile for %s %s", request.method, request.path)
+        finally:
+            if active.memory and tracemalloc.is_tracing():
+                tracemalloc.stop()
+            busy.release()
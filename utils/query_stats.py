@@ -0,0 +1,167 @@
+"""
+Per-request SQL statement counting and N+1 detection.
+
+SQLAlchemy cursor events feed every collector active on the current thread:
+one per request (installed by init_query_stats) and any opened with
+count_queries()/query_budget() in scripts and checks. Per request:
+
+- statements, total DB time and commits of write transactions are counted;
+- the same statement text executed QUERY_REPEAT_THRESHOLD+ times is logged
+  as a likely N+1, with the endpoint;
+- in debug mode (or with QUERY_STATS_HEADERS) responses carry
+  `X-DB-Queries`, `X-DB-Commits` and `Server-Timing: db;dur=...`.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from utils.write_queue import is_write
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_installed = False
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.commits = 0        # COMMITs of transactions that wrote
+        self.time_ms = 0.0
+        self.statements = Counter()
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.count += 1
+        self.time_ms += elapsed_ms
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> list:
+        """[(statement, times)] executed at least `threshold` times, most repeated first."""
+        return [(s, n) for s, n in self.statements.most_common() if n >= threshold]
+
+
+def _collectors() -> list:
+    stack = getattr(_local, "collectors", None)
+    if stack is None:
+        stack = _local.collectors = []
+    return stack
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _collectors():
+        conn.info.setdefault("query_stats_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    collectors = _collectors()
+    if not collectors:
+        return
+    started = conn.info.get("query_stats_started")
+    elapsed_ms = (time.perf_counter() - started.pop()) * 1000.0 if started else 0.0
+    for stats in collectors:
+        stats.record(statement, elapsed_ms)
+    if is_write(statement):
+        conn.info["query_stats_wrote"] = True
+
+
+def _commit(conn):
+    if conn.info.pop("query_stats_wrote", False):
+        for stats in _collectors():
+            stats.commits += 1
+
+
+def _rollback(conn):
+    conn.info.pop("query_stats_wrote", None)
+
+
+def _install_listeners() -> None:
+    global _installed
+    if _installed:
+        return
+    # on the Engine class: covers every engine, including ones created later
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "commit", _commit)
+    event.listen(Engine, "rollback", _rollback)
+    _installed = True
+
+
+@contextmanager
+def count_queries():
+    """Counts statements run on this thread inside the block; yields the QueryStats."""
+    _install_listeners()
+    stats = QueryStats()
+    _collectors().append(stats)
+    try:
+        yield stats
+    finally:
+        _collectors().remove(stats)
+
+
+@contextmanager
+def query_budget(max_queries: int, label: str = "block"):
+    """
+    Fails with AssertionError if the block runs more than `max_queries`
+    statements. For checks and scripts, e.g.
+
+        with query_budget(6, "GET /super-admin/admins"):
+            client.get("/super-admin/admins?per_page=200")
+    """
+    with count_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        top = "\n".join(f"  {n}x {s[:200]}" for s, n in stats.statements.most_common(5))
+        raise AssertionError(f"{label}: {stats.count} queries, budget {max_queries}\n{top}")
+
+
+def assert_query_budget(client, method: str, path: str, max_queries: int, **kwargs):
+    """Issues one request through a Flask test client within a query budget; returns the response."""
+    with query_budget(max_queries, f"{method.upper()} {path}"):
+        return client.open(path, method=method.upper(), **kwargs)
+
+
+def current_stats():
+    """The current request's QueryStats, or None outside a request."""
+    return g.get("_query_stats")
+
+
+def init_query_stats(app) -> None:
+    if not app.config.get("QUERY_STATS_ENABLED", True):
+        return
+    _install_listeners()
+
+    @app.before_request
+    def _start_query_stats():
+        stats = g._query_stats = QueryStats()
+        _collectors().append(stats)
+
+    @app.after_request
+    def _query_stats_headers(resp):
+        stats = current_stats()
+        if stats is None:
+            return resp
+        threshold = current_app.config.get("QUERY_REPEAT_THRESHOLD", 5)
+        for statement, times in stats.repeated(threshold):
+            logger.warning(
+                "possible N+1 on %s %s (%s): statement ran %d times: %s",
+                request.method, request.path, request.endpoint, times, " ".join(statement.split())[:300],
+            )
+        if current_app.debug or current_app.config.get("QUERY_STATS_HEADERS"):
+            resp.headers["X-DB-Queries"] = str(stats.count)
+            resp.headers["X-DB-Commits"] = str(stats.commits)
+            timing = f'db;dur={stats.time_ms:.2f};desc="{stats.count} queries"'
+            existing = resp.headers.get("Server-Timing")
+            resp.headers["Server-Timing"] = f"{existing}, {timing}" if existing else timing
+        return resp
+
+    @app.teardown_request
+    def _stop_query_stats(exc=None):
+        stats = g.pop("_query_stats", None)
+        if stats is not None and stats in _collectors():
+            _collectors().remove(stats)
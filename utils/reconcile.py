@@ -0,0 +1,128 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, or_, update
+
+from models import db
+from models.payment import Payment
+from utils.payment_provider import as_dict, get_provider
+from utils.stripe_events import apply_checkout_completed, apply_checkout_expired
+
+
+def _next_batch(cutoff: datetime, after, batch_size: int):
+    """
+    Keyset page over INIT payments older than `cutoff`, in
+    (created_at, id) order so it walks ix_payments_status_created.
+    """
+    q = Payment.query.filter(Payment.status == "INIT", Payment.created_at < cutoff)
+    if after is not None:
+        created_at, payment_id = after
+        q = q.filter(or_(
+            Payment.created_at > created_at,
+            and_(Payment.created_at == created_at, Payment.id > payment_id),
+        ))
+    return q.order_by(Payment.created_at.asc(), Payment.id.asc()).limit(batch_size).all()
+
+
+def _lookup(retrieve, session_id):
+    try:
+        return as_dict(retrieve(session_id)), None
+    except Exception as exc:
+        return None, str(exc)
+
+
+def _claim(payment: Payment) -> bool:
+    """
+    Takes the payment's row for this transaction if it is still INIT, and reloads it.
+
+    The batch was read before the provider lookups, and the webhook worker may
+    have confirmed or expired the payment meanwhile. The conditional UPDATE
+    waits for that writer and matches no row if it got there first.
+    """
+    claimed = db.session.execute(
+        update(Payment)
+        .where(Payment.id == payment.id, Payment.status == "INIT")
+        .values(status="INIT")
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if claimed:
+        db.session.refresh(payment)
+    return bool(claimed)
+
+
+def _resolve(payment: Payment, session: dict | None) -> str:
+    """Applies the provider's view of one payment. Returns the outcome key."""
+    if not payment.stripe_session_id:
+        # checkout was never opened (provider call failed or process died)
+        apply_checkout_expired(payment, None)
+        return "failed"
+
+    status = session.get("status")
+    meta = as_dict(session.get("metadata"))
+    if status == "complete" and session.get("payment_status") in ("paid", "no_payment_required"):
+        apply_checkout_completed(payment, payment.stripe_session_id, meta)
+        return "paid" if payment.status == "PAID" else "failed"
+    if status == "expired":
+        apply_checkout_expired(payment, payment.stripe_session_id)
+        return "failed"
+    return "open"
+
+
+def reconcile_stale_payments(
+    retrieve=None,
+    min_age_minutes: int | None = None,
+    batch_size: int | None = None,
+    concurrency: int | None = None,
+) -> dict:
+    """
+    Resolves INIT payments whose webhook never arrived.
+
+    Payments older than `min_age_minutes` are scanned in index-ordered batches;
+    the provider is asked for each batch's checkout sessions with at most
+    `concurrency` lookups in flight, then every outcome of the batch is applied
+    in one commit. `retrieve(session_id) -> dict` defaults to the app's payment
+    provider (Stripe, or the fake one). Returns counts and throughput.
+    """
+    cfg = current_app.config
+    retrieve = retrieve or get_provider().retrieve_checkout_session
+    min_age = cfg.get("RECONCILE_MIN_AGE_MINUTES", 60) if min_age_minutes is None else min_age_minutes
+    batch_size = max(1, batch_size or cfg.get("RECONCILE_BATCH_SIZE", 200))
+    concurrency = max(1, concurrency or cfg.get("RECONCILE_CONCURRENCY", 8))
+    cutoff = datetime.utcnow() - timedelta(minutes=min_age)
+
+    stats = {"scanned": 0, "paid": 0, "failed": 0, "open": 0, "errors": 0, "resolved_elsewhere": 0, "batches": 0}
+    started = time.perf_counter()
+    after = None
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while True:
+            batch = _next_batch(cutoff, after, batch_size)
+            if not batch:
+                break
+            after = (batch[-1].created_at, batch[-1].id)
+            stats["batches"] += 1
+            stats["scanned"] += len(batch)
+
+            # provider lookups run in parallel; the DB is only touched from this thread
+            with_session = [p for p in batch if p.stripe_session_id]
+            lookups = dict(zip(
+                [p.id for p in with_session],
+                pool.map(lambda sid: _lookup(retrieve, sid), [p.stripe_session_id for p in with_session]),
+            ))
+
+            for payment in batch:
+                session, error = lookups.get(payment.id, (None, None))
+                if error:
+                    stats["errors"] += 1
+                    continue
+                if not _claim(payment):
+                    stats["resolved_elsewhere"] += 1
+                    continue
+                stats[_resolve(payment, session)] += 1
+            db.session.commit()
+
+    elapsed = time.perf_counter() - started
+    stats["elapsed_s"] = round(elapsed, 3)
+    stats["payments_per_s"] = round(stats["scanned"] / elapsed, 1) if elapsed > 0 else 0.0
+    return stats
@@ -0,0 +1,240 @@
+"""
+Per-court occupancy and revenue rollups (daily and hourly buckets).
+
+Every change point that affects a slot's bucket (slot created/deactivated,
+booking confirmed/cancelled) marks its (court, day) dirty in the same
+transaction; `refresh_rollups` rebuilds only dirty days from slots, bookings
+and payments. Cancelled bookings are deleted rows, so marking at the change
+point is the only way to notice them without rescanning history.
+"""
+import time
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, func, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db
+from models.booking import Booking
+from models.court_rollup import CourtDailyRollup, CourtHourlyRollup, RollupDirtyDay
+from models.payment import Payment
+from models.payment_item import PaymentItem
+from models.slot import Slot
+
+COUNTERS = ("slots_offered", "slots_booked", "minutes_offered", "minutes_booked", "revenue")
+
+
+def _mark(keys, now: datetime) -> None:
+    for court_id, day in keys:
+        bumped = db.session.execute(
+            update(RollupDirtyDay)
+            .where(RollupDirtyDay.court_id == court_id, RollupDirtyDay.day == day)
+            .values(marked_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if bumped:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.add(RollupDirtyDay(court_id=court_id, day=day, marked_at=now))
+        except IntegrityError:
+            pass  # marked concurrently, which is all we need
+
+
+def mark_slots_dirty(slot_ids) -> None:
+    """Queues the (court, day) buckets of these slots for the next refresh. Does not commit."""
+    slot_ids = list(slot_ids)
+    if not slot_ids:
+        return
+    rows = db.session.query(Slot.court_id, Slot.start_time).filter(Slot.id.in_(slot_ids)).all()
+    _mark({(court_id, start.date()) for court_id, start in rows}, datetime.utcnow())
+
+
+def mark_all_dirty() -> int:
+    """Queues every (court, day) that has slots, for a full rebuild. Commits."""
+    keys = {
+        (court_id, start.date())
+        for court_id, start in db.session.query(Slot.court_id, Slot.start_time).all()
+    }
+    _mark(keys, datetime.utcnow())
+    db.session.commit()
+    return len(keys)
+
+
+def _paid_amounts(rows) -> tuple:
+    """({booking_id: amount} for single payments, {booking_id: amount} for basket items)."""
+    booking_ids = [r.booking_id for r in rows if r.booking_id]
+    single = {}
+    basket = {}
+    if booking_ids:
+        single = dict(
+            db.session.query(Payment.booking_id, Payment.amount)
+            .filter(Payment.booking_id.in_(booking_ids), Payment.status == "PAID")
+            .all()
+        )
+        basket = dict(
+            db.session.query(PaymentItem.booking_id, PaymentItem.amount)
+            .join(Payment, PaymentItem.payment_id == Payment.id)
+            .filter(PaymentItem.booking_id.in_(booking_ids), Payment.status == "PAID")
+            .all()
+        )
+    return single, basket
+
+
+def _rebuild_court(court_id: int, days: list, now: datetime) -> None:
+    start = datetime.combine(min(days), datetime.min.time())
+    end = datetime.combine(max(days), datetime.min.time()) + timedelta(days=1)
+    rows = (
+        db.session.query(
+            Slot.id.label("slot_id"),
+            Slot.start_time,
+            Slot.end_time,
+            Slot.is_active,
+            Slot.price,
+            Booking.id.label("booking_id"),
+        )
+        .outerjoin(Booking, (Booking.slot_id == Slot.id) & (Booking.status == "CONFIRMED"))
+        .filter(Slot.court_id == court_id, Slot.start_time >= start, Slot.start_time < end)
+        .all()
+    )
+    single, basket = _paid_amounts(rows)
+
+    wanted = set(days)
+    hourly = {}
+    for r in rows:
+        if r.start_time.date() not in wanted:
+            continue
+        booked = r.booking_id is not None
+        if not r.is_active and not booked:
+            continue  # deactivated and never sold: not on offer
+        minutes = max(0, int((r.end_time - r.start_time).total_seconds() // 60))
+        bucket = r.start_time.replace(minute=0, second=0, microsecond=0)
+        acc = hourly.setdefault(bucket, dict.fromkeys(COUNTERS, 0))
+        acc["slots_offered"] += 1
+        acc["minutes_offered"] += minutes
+        if booked:
+            acc["slots_booked"] += 1
+            acc["minutes_booked"] += minutes
+            # what was charged; bookings without a payment record count at slot price
+            acc["revenue"] += single.get(r.booking_id) or basket.get(r.booking_id) or int(r.price or 0)
+
+    for day in days:
+        day_start = datetime.combine(day, datetime.min.time())
+        db.session.execute(
+            delete(CourtHourlyRollup).where(
+                CourtHourlyRollup.court_id == court_id,
+                CourtHourlyRollup.bucket_start >= day_start,
+                CourtHourlyRollup.bucket_start < day_start + timedelta(days=1),
+            )
+        )
+        db.session.execute(delete(CourtDailyRollup).where(CourtDailyRollup.court_id == court_id, CourtDailyRollup.day == day))
+
+        totals = dict.fromkeys(COUNTERS, 0)
+        for bucket, acc in hourly.items():
+            if bucket.date() != day:
+                continue
+            db.session.add(CourtHourlyRollup(court_id=court_id, bucket_start=bucket, **acc))
+            for k in COUNTERS:
+                totals[k] += acc[k]
+        if totals["slots_offered"]:
+            db.session.add(CourtDailyRollup(court_id=court_id, day=day, refreshed_at=now, **totals))
+
+
+def refresh_rollups(batch_size: int | None = None) -> dict:
+    """
+    Rebuilds the rollups of every dirty (court, day), oldest mark first, one
+    commit per batch. A day re-marked while it was being rebuilt keeps its
+    dirty row (newer marked_at) and is rebuilt again on the next pass.
+    """
+    batch_size = batch_size or current_app.config.get("ROLLUP_REFRESH_BATCH", 500)
+    started = time.perf_counter()
+    days_rebuilt = 0
+    batches = 0
+    while True:
+        dirty = (
+            RollupDirtyDay.query
+            .order_by(RollupDirtyDay.marked_at, RollupDirtyDay.court_id, RollupDirtyDay.day)
+            .limit(batch_size)
+            .all()
+        )
+        if not dirty:
+            break
+        seen = [(d.court_id, d.day, d.marked_at) for d in dirty]
+        now = datetime.utcnow()
+
+        by_court = {}
+        for court_id, day, _ in seen:
+            by_court.setdefault(court_id, []).append(day)
+        for court_id, days in by_court.items():
+            _rebuild_court(court_id, days, now)
+
+        for court_id, day, marked_at in seen:
+            db.session.execute(
+                delete(RollupDirtyDay).where(
+                    RollupDirtyDay.court_id == court_id,
+                    RollupDirtyDay.day == day,
+                    RollupDirtyDay.marked_at == marked_at,
+                )
+            )
+        db.session.commit()
+        db.session.expunge_all()
+        days_rebuilt += len(seen)
+        batches += 1
+        if len(seen) < batch_size:
+            break
+
+    return {"days": days_rebuilt, "batches": batches, "elapsed_s": round(time.perf_counter() - started, 3)}
+
+
+def _occupancy(acc: dict) -> float:
+    return round(100.0 * acc["minutes_booked"] / acc["minutes_offered"], 1) if acc["minutes_offered"] else 0.0
+
+
+def _bucket(acc: dict, **key) -> dict:
+    return {**key, **{k: int(acc[k]) for k in COUNTERS}, "occupancy_pct": _occupancy(acc)}
+
+
+def daily_series(court_ids, start: date, end: date) -> list:
+    """One entry per day in [start, end] (days without slots are zero), summed over courts."""
+    rows = (
+        db.session.query(CourtDailyRollup.day, *[func.sum(getattr(CourtDailyRollup, k)) for k in COUNTERS])
+        .filter(CourtDailyRollup.court_id.in_(list(court_ids)), CourtDailyRollup.day >= start, CourtDailyRollup.day <= end)
+        .group_by(CourtDailyRollup.day)
+        .all()
+    )
+    found = {row[0]: dict(zip(COUNTERS, row[1:])) for row in rows}
+    out = []
+    day = start
+    while day <= end:
+        out.append(_bucket(found.get(day) or dict.fromkeys(COUNTERS, 0), day=day.isoformat()))
+        day += timedelta(days=1)
+    return out
+
+
+def hour_of_week_series(court_ids, start: date, end: date) -> list:
+    """168 entries (weekday 0 = Monday, hour 0..23) over hourly buckets in [start, end]."""
+    rows = (
+        db.session.query(CourtHourlyRollup.bucket_start, *[getattr(CourtHourlyRollup, k) for k in COUNTERS])
+        .filter(
+            CourtHourlyRollup.court_id.in_(list(court_ids)),
+            CourtHourlyRollup.bucket_start >= datetime.combine(start, datetime.min.time()),
+            CourtHourlyRollup.bucket_start < datetime.combine(end, datetime.min.time()) + timedelta(days=1),
+        )
+        .all()
+    )
+    grid = {(wd, h): dict.fromkeys(COUNTERS, 0) for wd in range(7) for h in range(24)}
+    for bucket_start, *values in rows:
+        acc = grid[(bucket_start.weekday(), bucket_start.hour)]
+        for k, v in zip(COUNTERS, values):
+            acc[k] += v
+    return [_bucket(acc, weekday=wd, hour=h) for (wd, h), acc in grid.items()]
+
+
+def totals(series: list) -> dict:
+    acc = {k: sum(b[k] for b in series) for k in COUNTERS}
+    return _bucket(acc)
+
+
+def pending_days(court_ids) -> int:
+    """Dirty (court, day) rows not yet rebuilt, i.e. how stale the rollups are."""
+    return RollupDirtyDay.query.filter(RollupDirtyDay.court_id.in_(list(court_ids))).count()
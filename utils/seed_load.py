@@ -0,0 +1,272 @@
+"""
+Bulk synthetic dataset for performance work (`flask seed-load`).
+
+Rows are generated lazily and written with chunked Core executemany inserts
+(no ORM objects), with ids assigned here so no round trip is needed per row.
+Against an empty database the rows are fully determined by the arguments,
+`seed` and `anchor` (the day the timeline is built around, default today),
+so a large dataset can be rebuilt identically; credentials are the
+exception.
+
+Every seeded user shares one password and every seeded session has its own
+token, all random per run (never guessable from a user id). The caller gets
+them back through `credentials` so load tests can log in or authenticate
+without logging in; `flask seed-load` writes them to a 0600 JSON file.
+"""
+import json
+import random
+import secrets
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+
+from sqlalchemy import func
+
+from models import db
+from models.audit_log import AuditLog
+from models.booking import Booking
+from models.court import Court
+from models.payment import Payment
+from models.session import Session
+from models.slot import Slot
+from models.user import Role, User, user_roles
+from security.password import hash_password
+from security.session import _hash_token
+
+LOCATIONS = (
+    "Kathmandu", "Lalitpur", "Bhaktapur", "Pokhara", "Chitwan", "Butwal",
+    "Dharan", "Biratnagar", "Hetauda", "Janakpur", "Nepalgunj", "Dhangadhi",
+)
+PRICES = (1000, 1200, 1500, 1800, 2000, 2500)
+OPEN_HOURS = tuple(range(6, 22))   # hourly slots 06:00 .. 21:00
+AUDIT_ACTIONS = (
+    "LOGIN_OTP_SENT", "LOGIN_OTP_VERIFIED", "LOGIN_FAIL", "PAYMENT_SESSION_CREATED",
+    "PAYMENT_PAID", "BOOKING_CANCEL", "LOGOUT",
+)
+
+
+def _next_id(model) -> int:
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def _write(table, chunk: list, stats: dict, progress=None, elapsed: float = 0.0) -> None:
+    entry = stats.setdefault(table.name, {"rows": 0, "seconds": 0.0})
+    if chunk:
+        started = time.perf_counter()
+        db.session.execute(table.insert(), chunk)
+        elapsed += time.perf_counter() - started
+        entry["rows"] += len(chunk)
+    entry["seconds"] += elapsed
+    entry["rows_per_s"] = round(entry["rows"] / entry["seconds"]) if entry["seconds"] else entry["rows"]
+    if progress and chunk:
+        progress(table.name, entry["rows"])
+
+
+def _insert(table, rows, chunk_size: int, stats: dict, progress=None) -> None:
+    """Writes an iterable of row dicts in chunks, one commit per chunk."""
+    rows = iter(rows)
+    while True:
+        started = time.perf_counter()
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        generated = time.perf_counter() - started
+        _write(table, chunk, stats, progress, generated)
+        db.session.commit()
+
+
+def seed_load(
+    *,
+    users: int = 10_000,
+    courts: int = 100,
+    slots_per_court: int = 16 * 60,
+    days_back: int = 30,
+    booked_ratio: float = 0.4,
+    abandoned_ratio: float = 0.05,
+    session_ratio: float = 0.2,
+    audit_per_user: int = 5,
+    chunk_size: int = 5_000,
+    seed: int = 1,
+    anchor: datetime | None = None,
+    password: str | None = None,
+    credentials: dict | None = None,
+    progress=None,
+) -> dict:
+    """
+    Generates `courts` owners + courts, `users` players, `slots_per_court`
+    hourly slots per court starting `days_back` days ago, confirmed bookings
+    with PAID payments (`booked_ratio` of slots), abandoned INIT/FAILED
+    checkouts (`abandoned_ratio`), sessions and audit logs. Returns per-table
+    row counts and insert rates.
+
+    `password` defaults to a random one. If `credentials` is a dict it receives
+    {"password": ..., "sessions": {user_id: raw session token}}.
+    """
+    rng = random.Random(seed)
+    anchor = anchor or datetime.utcnow()
+    today = datetime(anchor.year, anchor.month, anchor.day)
+    now = today + timedelta(hours=12)   # "current time" of the generated timeline
+    first_day = today - timedelta(days=days_back)
+    password = password or secrets.token_urlsafe(18)
+    password_hash = hash_password(password)
+    tokens = {}
+    if credentials is not None:
+        credentials["password"] = password
+        credentials["sessions"] = tokens
+    roles = {r.name: r.id for r in Role.query.all()}
+    stats = {}
+
+    user_base = _next_id(User)
+    court_base = _next_id(Court)
+    owner_ids = list(range(user_base, user_base + courts))
+    player_ids = list(range(user_base + courts, user_base + courts + users))
+
+    def user_rows():
+        for i, user_id in enumerate(owner_ids + player_ids):
+            kind = "owner" if i < courts else "player"
+            created = now - timedelta(days=rng.randint(days_back, days_back + 365), seconds=rng.randint(0, 86399))
+            yield {
+                "id": user_id,
+                "email": f"{kind}{user_id}@seed.local",
+                "password_hash": password_hash,
+                "full_name": f"{kind.title()} {user_id}",
+                "phone_number": f"9{user_id:09d}",
+                "mfa_enabled": False,
+                "created_at": created,
+                "password_changed_at": now - timedelta(days=rng.randint(0, 60)),
+            }
+
+    _insert(User.__table__, user_rows(), chunk_size, stats, progress)
+    _insert(
+        user_roles,
+        ({"user_id": uid, "role_id": roles["ADMIN" if uid < user_base + courts else "PLAYER"]} for uid in owner_ids + player_ids),
+        chunk_size,
+        stats,
+        progress,
+    )
+
+    def court_rows():
+        for i, owner_id in enumerate(owner_ids):
+            court_id = court_base + i
+            location = LOCATIONS[i % len(LOCATIONS)]
+            yield {
+                "id": court_id,
+                "name": f"Seed Futsal {court_id}",
+                "location": location,
+                "description": None,
+                "maps_link": None,
+                "name_normalized": f"seed futsal {court_id}",
+                "location_normalized": location.lower(),
+                "status": "VERIFIED",
+                "owner_user_id": owner_id,
+                "verified_at": first_day - timedelta(days=1),
+                "is_active": True,
+                "created_at": first_day - timedelta(days=2),
+            }
+
+    _insert(Court.__table__, court_rows(), chunk_size, stats, progress)
+
+    # slots, bookings and payments are decided together so they stay
+    # consistent, and written together (FK order) every `chunk_size` slots
+    slot_id = _next_id(Slot)
+    counters = {"booking": _next_id(Booking), "payment": _next_id(Payment)}
+    slots, bookings, payments = [], [], []
+
+    def flush():
+        _write(Slot.__table__, slots, stats, progress)
+        _write(Booking.__table__, bookings, stats, progress)
+        _write(Payment.__table__, payments, stats, progress)
+        db.session.commit()
+        slots.clear()
+        bookings.clear()
+        payments.clear()
+
+    for i in range(courts):
+        court_id = court_base + i
+        for n in range(slots_per_court):
+            start = first_day + timedelta(days=n // len(OPEN_HOURS), hours=OPEN_HOURS[n % len(OPEN_HOURS)])
+            price = rng.choice(PRICES)
+            created = min(start - timedelta(days=rng.randint(1, 14)), now)
+            slots.append({
+                "id": slot_id,
+                "court_id": court_id,
+                "start_time": start,
+                "end_time": start + timedelta(hours=1),
+                "price": price,
+                "is_active": rng.random() > 0.01,
+                "created_at": created,
+            })
+            roll = rng.random()
+            if roll < booked_ratio and player_ids:
+                user_id = rng.choice(player_ids)
+                booked_at = min(created + timedelta(hours=rng.randint(1, 72)), now)
+                booking_id = counters["booking"]
+                counters["booking"] += 1
+                bookings.append({
+                    "id": booking_id, "user_id": user_id, "slot_id": slot_id, "status": "CONFIRMED",
+                    "created_at": booked_at, "cancelled_at": None, "cancel_reason": None,
+                })
+                payments.append(_payment(counters, booking_id, slot_id, user_id, price, "PAID", booked_at))
+            elif roll < booked_ratio + abandoned_ratio and player_ids:
+                started = min(created + timedelta(hours=rng.randint(1, 72)), now)
+                status = "INIT" if rng.random() < 0.5 else "FAILED"
+                payments.append(_payment(counters, None, slot_id, rng.choice(player_ids), price, status, started))
+            slot_id += 1
+            if len(slots) >= chunk_size:
+                flush()
+    flush()
+
+    def session_rows():
+        for user_id in owner_ids + player_ids:
+            if user_id in owner_ids[:1] or rng.random() < session_ratio:
+                token = tokens[user_id] = secrets.token_urlsafe(32)
+                yield {
+                    "user_id": user_id,
+                    "token_hash": _hash_token(token),
+                    "created_at": now,
+                    "last_seen_at": now,
+                    "expires_at": datetime.utcnow() + timedelta(days=7),
+                    "revoked": False,
+                    "ip": None,
+                    "user_agent": "seed-load",
+                }
+
+    _insert(Session.__table__, session_rows(), chunk_size, stats, progress)
+
+    def audit_rows():
+        span = int(timedelta(days=days_back).total_seconds()) or 1
+        for user_id in owner_ids + player_ids:
+            for _ in range(audit_per_user):
+                yield {
+                    "user_id": user_id,
+                    "action": rng.choice(AUDIT_ACTIONS),
+                    "entity": None,
+                    "entity_id": None,
+                    "ip": f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+                    "user_agent": "seed-load",
+                    "metadata_json": json.dumps({"seed": True}),
+                    "timestamp": now - timedelta(seconds=rng.randrange(span)),
+                }
+
+    _insert(AuditLog.__table__, audit_rows(), chunk_size, stats, progress)
+    return stats
+
+
+def _payment(counters: dict, booking_id, slot_id: int, user_id: int, amount: int, status: str, created_at: datetime) -> dict:
+    payment_id = counters["payment"]
+    counters["payment"] += 1
+    return {
+        "id": payment_id,
+        "booking_id": booking_id,
+        "slot_id": slot_id,
+        "user_id": user_id,
+        "provider": "STRIPE",
+        "amount": amount,
+        "currency": "NPR",
+        "status": status,
+        "stripe_session_id": f"cs_seed_{payment_id}",
+        "checkout_url": None,
+        "checkout_expires_at": created_at + timedelta(minutes=45),
+        "created_at": created_at,
+        "paid_at": created_at if status == "PAID" else None,
+    }
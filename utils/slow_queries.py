@@ -0,0 +1,290 @@
+"""
+Slow query log with EXPLAIN capture.
+
+Cursor events on the app's engines (primary, binds such as the replica, and
+the @read_only pool) time every statement. One slower than SLOW_QUERY_MS is
+handed to a background thread with:
+
+- the normalized SQL: literals become ?, IN lists become IN (...) and
+  whitespace is collapsed. A fingerprint of it groups repeats;
+- the parameter shape: types only, never values (emails, tokens);
+- the duration and the originating endpoint (or "cli"/thread name).
+
+The request thread only does a put_nowait. The background thread logs a
+warning, runs EXPLAIN QUERY PLAN (SQLite) or EXPLAIN (others) once per
+fingerprint for SELECTs on a separate pooled connection, and appends one
+JSON line per slow statement to SLOW_QUERY_LOG. `flask slow-queries`
+aggregates that file across workers and restarts.
+"""
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,)*\s*\?\s*\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+def normalize(statement: str) -> str:
+    sql = _STRING.sub("?", statement)
+    sql = _NUMBER.sub("?", sql)
+    sql = _SPACE.sub(" ", sql).strip()
+    return _IN_LIST.sub("IN (...)", sql)
+
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+def params_shape(parameters, executemany: bool = False):
+    """Types of the bound parameters, e.g. ['int*3', 'str'] or {'id': 'int'}; never the values."""
+    if executemany:
+        rows = list(parameters or ())
+        return {"rows": len(rows), "row": params_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {k: type(v).__name__ for k, v in sorted(parameters.items())}
+    if isinstance(parameters, (list, tuple)):
+        # runs of one type (expanded IN lists) collapse to "int*24"
+        shape = []
+        for value in parameters:
+            name = type(value).__name__
+            if shape and shape[-1][0] == name:
+                shape[-1][1] += 1
+            else:
+                shape.append([name, 1])
+        return [name if n == 1 else f"{name}*{n}" for name, n in shape]
+    return type(parameters).__name__ if parameters is not None else None
+
+
+def _origin() -> str:
+    if has_request_context():
+        return request.endpoint or f"unmatched {request.method}"
+    name = threading.current_thread().name
+    return "cli" if name == "MainThread" else name
+
+
+def _is_select(statement: str) -> bool:
+    return statement.lstrip()[:6].upper() in ("SELECT", "WITH")
+
+
+class SlowQueryLog:
+    """Background writer: one thread, bounded queue, EXPLAIN cached per fingerprint."""
+
+    def __init__(self, path: str, explain: bool = True, max_queue: int = 1000):
+        self.path = path
+        self.explain = explain
+        self.plans = {}         # (engine url, fingerprint) -> plan lines
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, item: dict) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="slow-query-log", daemon=True)
+                self._thread.start()
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Waits until everything submitted so far is written (checks, CLI)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                self._handle(item)
+            except Exception:
+                logger.exception("slow query log failed for %s", item.get("fingerprint"))
+            finally:
+                self._queue.task_done()
+
+    def _plan(self, item: dict) -> list | None:
+        engine = item.pop("engine")
+        if not self.explain or item.pop("executemany") or not _is_select(item["statement"]):
+            return None
+        key = (str(engine.url), item["fingerprint"])
+        if key not in self.plans:
+            self.plans[key] = explain(engine, item["statement"], item.pop("parameters"))
+        return self.plans[key]
+
+    def _handle(self, item: dict) -> None:
+        plan = self._plan(item)
+        record = {
+            "ts": datetime.utcnow().isoformat() + "Z",
+            "fingerprint": item["fingerprint"],
+            "duration_ms": round(item["duration_ms"], 2),
+            "endpoint": item["endpoint"],
+            "database": item["database"],
+            "sql": item["sql"],
+            "params": item["params"],
+            "plan": plan,
+            "pid": os.getpid(),
+        }
+        logger.warning(
+            "slow query %.1fms on %s [%s]: %s", record["duration_ms"], record["endpoint"], record["fingerprint"], record["sql"][:300],
+        )
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a") as fh:
+            fh.write(json.dumps(record, default=str) + "\n")
+
+
+def explain(engine, statement: str, parameters) -> list:
+    """Plan lines for one statement, run on its own pooled connection."""
+    sqlite = engine.dialect.name == "sqlite"
+    try:
+        with engine.connect() as conn:
+            rows = conn.exec_driver_sql(("EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN ") + statement, parameters).fetchall()
+    except Exception as exc:
+        return [f"EXPLAIN failed: {exc.__class__.__name__}: {exc}"]
+    if not sqlite:
+        return [str(row[0]) for row in rows]
+    # (id, parent, notused, detail): indent children under their parent
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def full_scans(plan) -> list:
+    """SQLite plan lines that scan a whole table (no index)."""
+    return [line.strip() for line in plan or () if line.strip().startswith("SCAN ") and " USING " not in line]
+
+
+def install(engine, log: SlowQueryLog, threshold_ms: float) -> None:
+    database = engine.url.render_as_string(hide_password=True)
+    threshold_s = threshold_ms / 1000.0
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("slow_query_started")
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        if elapsed < threshold_s or statement.lstrip()[:7].upper() == "EXPLAIN":
+            return
+        sql = normalize(statement)
+        log.submit({
+            "engine": conn.engine,
+            "database": database,
+            "statement": statement,
+            "parameters": parameters,
+            "executemany": executemany,
+            "sql": sql,
+            "fingerprint": fingerprint(sql),
+            "params": params_shape(parameters, executemany),
+            "duration_ms": elapsed * 1000.0,
+            "endpoint": _origin(),
+        })
+
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("slow_query_started"):
+            conn.info["slow_query_started"].pop()
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+
+def log_path(app) -> str:
+    return app.config.get("SLOW_QUERY_LOG") or os.path.join(app.instance_path, "slow_queries.jsonl")
+
+
+def init_slow_query_log(app) -> None:
+    """Times statements on every engine of the app; call after db.init_app and init_engine_profile."""
+    if not app.config.get("SLOW_QUERY_ENABLED", True):
+        return
+    log = app.extensions["slow_queries"] = SlowQueryLog(log_path(app), explain=app.config.get("SLOW_QUERY_EXPLAIN", True))
+    threshold_ms = float(app.config.get("SLOW_QUERY_MS", 100))
+    with app.app_context():
+        engines = set(db.engines.values())
+    if app.extensions.get("read_engine") is not None:
+        engines.add(app.extensions["read_engine"])
+    for engine in engines:
+        install(engine, log, threshold_ms)
+
+
+def aggregate(path: str, since: datetime | None = None) -> list:
+    """Per-fingerprint totals from the log file, slowest total time first."""
+    groups = {}
+    if not os.path.exists(path):
+        return []
+    with open(path) as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if since is not None and record["ts"] < since.isoformat():
+                continue
+            group = groups.get(record["fingerprint"])
+            if group is None:
+                group = groups[record["fingerprint"]] = {
+                    "fingerprint": record["fingerprint"],
+                    "sql": record["sql"],
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "durations": [],
+                    "endpoints": Counter(),
+                    "databases": set(),
+                    "params": record["params"],
+                    "plan": None,
+                    "last_seen": record["ts"],
+                }
+            group["count"] += 1
+            group["total_ms"] += record["duration_ms"]
+            group["max_ms"] = max(group["max_ms"], record["duration_ms"])
+            group["durations"].append(record["duration_ms"])
+            group["endpoints"][record["endpoint"]] += 1
+            group["databases"].add(record["database"])
+            group["plan"] = record.get("plan") or group["plan"]
+            group["last_seen"] = max(group["last_seen"], record["ts"])
+
+    out = []
+    for group in groups.values():
+        durations = sorted(group.pop("durations"))
+        group["mean_ms"] = round(group["total_ms"] / group["count"], 2)
+        group["p95_ms"] = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        group["total_ms"] = round(group["total_ms"], 2)
+        group["endpoints"] = dict(group["endpoints"].most_common())
+        group["databases"] = sorted(group["databases"])
+        group["full_scans"] = full_scans(group["plan"])
+        out.append(group)
+    return sorted(out, key=lambda g: g["total_ms"], reverse=True)
+
+
+def since_hours(hours: float | None) -> datetime | None:
+    return datetime.utcnow() - timedelta(hours=hours) if hours else None
@@ -0,0 +1,155 @@
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from models import db
+from models.booking import Booking
+from models.payment import Payment
+from utils.audit import log_event
+from utils.court_stats import on_bookings_confirmed
+from utils.waitlist import mark_claimed
+
+CHECKOUT_EVENT_TYPES = ("checkout.session.completed", "checkout.session.expired")
+
+
+def event_payment_id(event: dict):
+    """payment_id from a checkout event's metadata (None for other events)."""
+    if event.get("type") not in CHECKOUT_EVENT_TYPES:
+        return None
+    session = (event.get("data") or {}).get("object") or {}
+    value = (session.get("metadata") or {}).get("payment_id")
+    try:
+        return int(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _confirm_basket(payment: Payment, user_id: int) -> bool:
+    """
+    Confirms every slot of a basket payment with one bulk insert.
+    All-or-nothing: if any slot is already taken, no booking is created.
+    """
+    slot_ids = [item.slot_id for item in payment.items]
+    if not slot_ids:
+        return False
+
+    taken = Booking.query.filter(Booking.slot_id.in_(slot_ids), Booking.status == "CONFIRMED").first()
+    if taken:
+        return False
+
+    now = datetime.utcnow()
+    try:
+        with db.session.begin_nested():
+            db.session.execute(
+                insert(Booking),
+                [
+                    {"user_id": user_id, "slot_id": slot_id, "status": "CONFIRMED", "created_at": now}
+                    for slot_id in slot_ids
+                ],
+            )
+    except IntegrityError:
+        # uq_booking_slot_once: another payment won one of the slots meanwhile
+        return False
+
+    # link each item to its booking, so cancelling one slot can refund it out of the basket
+    booking_ids = dict(
+        db.session.query(Booking.slot_id, Booking.id)
+        .filter(Booking.slot_id.in_(slot_ids), Booking.status == "CONFIRMED")
+        .all()
+    )
+    for item in payment.items:
+        item.booking_id = booking_ids.get(item.slot_id)
+
+    for slot_id in slot_ids:
+        mark_claimed(slot_id, user_id)
+    on_bookings_confirmed(slot_ids)
+
+    payment.status = "PAID"
+    payment.paid_at = now
+    return True
+
+
+def _confirm_single(payment: Payment, slot_id: int, user_id: int) -> bool:
+    existing = Booking.query.filter_by(slot_id=slot_id, status="CONFIRMED").first()
+    if existing:
+        # the same user's booking that no other payment paid for: this payment was
+        # confirmed concurrently (webhook vs reconcile), not lost to another player
+        paid_elsewhere = Payment.query.filter(
+            Payment.booking_id == existing.id, Payment.id != payment.id, Payment.status == "PAID"
+        ).first()
+        if existing.user_id != user_id or paid_elsewhere:
+            return False
+        payment.booking_id = existing.id
+        payment.status = "PAID"
+        payment.paid_at = payment.paid_at or datetime.utcnow()
+        return True
+
+    booking = Booking(user_id=user_id, slot_id=slot_id, status="CONFIRMED")
+    try:
+        with db.session.begin_nested():
+            db.session.add(booking)
+            db.session.flush()
+    except IntegrityError:
+        return False
+
+    payment.booking_id = booking.id
+    mark_claimed(booking.slot_id, booking.user_id)
+    on_bookings_confirmed([booking.slot_id])
+    payment.status = "PAID"
+    payment.paid_at = datetime.utcnow()
+    return True
+
+
+def find_payment(session_id: str | None, meta: dict):
+    payment = None
+    payment_id = meta.get("payment_id")
+    if payment_id:
+        payment = Payment.query.get(int(payment_id))
+    if not payment and session_id:
+        payment = Payment.query.filter_by(stripe_session_id=session_id).first()
+    return payment
+
+
+def apply_checkout_completed(payment: Payment, session_id: str | None, meta: dict) -> None:
+    """Books the slot(s) of a paid checkout, or marks the payment FAILED. Does not commit."""
+    if not payment or payment.status == "PAID":
+        return
+
+    slot_id = meta.get("slot_id")
+    user_id = meta.get("user_id") or payment.user_id
+    if payment.slot_id is None and user_id:
+        if not _confirm_basket(payment, int(user_id)):
+            payment.status = "FAILED"
+    elif slot_id and user_id:
+        if not _confirm_single(payment, int(slot_id), int(user_id)):
+            payment.status = "FAILED"
+
+    log_event("PAYMENT_PAID", user_id=None, entity="payment", entity_id=payment.id, metadata={"stripe_session_id": session_id, "booking_id": payment.booking_id}, commit=False)
+
+
+def apply_checkout_expired(payment: Payment, session_id: str | None) -> None:
+    """Drops an unpaid payment whose checkout expired. Does not commit."""
+    if not payment or payment.status == "PAID":
+        return
+
+    payment.status = "FAILED"
+    db.session.delete(payment)
+    log_event("PAYMENT_EXPIRED", user_id=None, entity="payment", entity_id=payment.id, metadata={"stripe_session_id": session_id, "booking_id": payment.booking_id}, commit=False)
+
+
+def apply_event(event: dict) -> None:
+    """Applies a verified Stripe event to payments/bookings. Does not commit."""
+    event_type = event.get("type")
+    if event_type not in CHECKOUT_EVENT_TYPES:
+        return
+
+    session = event["data"]["object"]
+    session_id = session.get("id")
+    meta = session.get("metadata", {}) or {}
+    payment = find_payment(session_id, meta)
+
+    if event_type == "checkout.session.completed":
+        apply_checkout_completed(payment, session_id, meta)
+    else:
+        apply_checkout_expired(payment, session_id)
@@ -0,0 +1,618 @@
+"""
+Request tracing: spans for the request, SQL statements, password hashing,
+email and Stripe calls, exported as OTLP/JSON.
+
+Each traced request gets a server span covering the Flask hooks and the handler.
+Child spans are added for:
+
+- every SQL statement on the app's engines (normalized text, never values),
+  the session commit, and waits for the SQLite write turn;
+- hash_password / verify_password (bcrypt);
+- send_email / send_emails, with the SMTP connect and send;
+- payment provider calls (Stripe or the fake provider).
+
+So a slow /auth/login shows whether the time went to bcrypt, SMTP, the DB or
+the end-of-request commit of the audit rows.
+
+Trace ids come from an inbound W3C `traceparent` header when there is one;
+otherwise a new one is made. Every response carries X-Trace-Id.
+
+Sampling:
+
+- TRACE_SAMPLE_RATE: fraction of requests traced (0 = none, 1 = all);
+- TRACE_TRUST_PARENT: also trace requests whose traceparent has the sampled
+  flag set. Only enable this behind a gateway that sets the header, since
+  otherwise any client can force a trace;
+- TRACE_SLOW_MS: spans are recorded for every request, and an unsampled
+  trace is kept when the request took at least this long or ended in a 5xx.
+  Recording costs a few microseconds per span.
+
+Requests that are neither sampled nor recorded create no spans. Outside a
+traced request, span() and @traced do nothing.
+
+Finished traces are handed to an exporter:
+
+- "file" (the default): a background thread appends one OTLP/JSON
+  ExportTraceServiceRequest per trace to TRACE_FILE (JSON Lines, as read by
+  the OpenTelemetry collector's otlpjsonfile receiver);
+- "log": one summary line per trace in the app log;
+- "package.module:factory": factory(app) returns an object with
+  export(spans) and, optionally, shutdown().
+
+`flask perf traces` summarizes the file by endpoint and span name.
+"""
+import importlib
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+_current = ContextVar("futsalslot_trace_span", default=None)
+
+
+def _new_id(bits: int) -> str:
+    value = 0
+    while not value:        # all-zero ids are invalid in W3C trace context
+        value = random.getrandbits(bits)
+    return f"{value:0{bits // 4}x}"
+
+
+def parse_traceparent(header: str | None):
+    """(trace_id, parent_span_id, sampled) from a W3C traceparent header, or None."""
+    match = TRACEPARENT.match((header or "").strip().lower())
+    if match is None:
+        return None
+    version, trace_id, parent_id, flags = match.groups()
+    if version == "ff" or trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "status", "message", "events")
+
+    def __init__(self, trace, name: str, parent_id: str | None, kind: str, attributes: dict):
+        self.trace = trace
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.status = STATUS_UNSET
+        self.message = None
+        self.events = None
+        self.end_ns = None
+        self.start_ns = time.time_ns()
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        self.status = STATUS_ERROR
+        self.message = message
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.set_error(f"{exc.__class__.__name__}: {exc}"[:500])
+        if self.events is None:
+            self.events = []
+        self.events.append((time.time_ns(), "exception", {"exception.type": exc.__class__.__name__, "exception.message": str(exc)[:500]}))
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.trace.ended(self)
+
+
+class Trace:
+    """Spans of one request on this process; exported once the server span ends."""
+
+    def __init__(self, tracer, trace_id: str, sampled: bool, max_spans: int):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.max_spans = max_spans
+        self.spans = []
+        self.dropped = 0
+        self.root = None
+        self.done = False
+
+    def start_span(self, name: str, parent_id: str | None, kind: str = "internal", attributes: dict | None = None) -> Span | None:
+        if len(self.spans) >= self.max_spans:
+            self.dropped += 1
+            return None
+        span = Span(self, name, parent_id, kind, attributes or {})
+        self.spans.append(span)
+        return span
+
+    def ended(self, span: Span) -> None:
+        if self.done and self.sampled:
+            # ended after the request finished (e.g. on another thread): sent on its own
+            self.tracer.export([span])
+
+    def finish(self, status_code: int | None) -> None:
+        self.done = True
+        root = self.root
+        keep = self.sampled or (
+            self.tracer.slow_ms > 0 and (root.duration_ms >= self.tracer.slow_ms or (status_code or 0) >= 500)
+        )
+        if not keep:
+            return
+        self.sampled = True
+        if self.dropped:
+            root.set_attribute("trace.dropped_spans", self.dropped)
+        for span in self.spans:
+            if span.end_ns is None:
+                span.set_attribute("span.unfinished", True)
+        self.tracer.export([span for span in self.spans if span.end_ns is not None])
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+def current_trace_id() -> str | None:
+    span = _current.get()
+    return span.trace.trace_id if span is not None else None
+
+
+def start_span(name: str, kind: str = "internal", **attributes) -> Span | None:
+    """A child of the current span that the caller ends, without becoming current; None when not tracing."""
+    parent = _current.get()
+    if parent is None:
+        return None
+    return parent.trace.start_span(name, parent.span_id, kind, attributes)
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes):
+    """Times the block as a child of the current span; yields the Span, or None when not tracing."""
+    parent = _current.get()
+    child = parent.trace.start_span(name, parent.span_id, kind, attributes) if parent is not None else None
+    if child is None:
+        yield None
+        return
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as exc:
+        child.record_exception(exc)
+        raise
+    finally:
+        _current.reset(token)
+        child.end()
+
+
+def traced(name: str, kind: str = "internal", **attributes):
+    """Decorator form of span(); costs one ContextVar lookup when not tracing."""
+
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            with span(name, kind, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ---- OTLP/JSON ----
+
+def _value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _attributes(attributes: dict) -> list:
+    return [{"key": key, "value": _value(value)} for key, value in attributes.items() if value is not None]
+
+
+def span_to_otlp(span: Span) -> dict:
+    out = {
+        "traceId": span.trace.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": SPAN_KINDS.get(span.kind, 1),
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns or span.start_ns),
+        "attributes": _attributes(span.attributes),
+        "status": {"code": span.status},
+    }
+    if span.parent_id:
+        out["parentSpanId"] = span.parent_id
+    if span.message:
+        out["status"]["message"] = span.message
+    if span.events:
+        out["events"] = [
+            {"timeUnixNano": str(ts), "name": name, "attributes": _attributes(attrs)} for ts, name, attrs in span.events
+        ]
+    return out
+
+
+def to_otlp(spans: list, resource: dict) -> dict:
+    """One ExportTraceServiceRequest."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _attributes(resource)},
+            "scopeSpans": [{"scope": {"name": "futsalslot.tracing"}, "spans": [span_to_otlp(s) for s in spans]}],
+        }]
+    }
+
+
+def _spans_from_otlp(record: dict):
+    for resource_spans in record.get("resourceSpans", ()):
+        for scope_spans in resource_spans.get("scopeSpans", ()):
+            yield from scope_spans.get("spans", ())
+
+
+# ---- exporters ----
+
+class FileExporter:
+    """Appends OTLP/JSON lines to `path` from a background thread (bounded queue, drops when full)."""
+
+    def __init__(self, path: str, resource: dict, max_queue: int = 1000):
+        self.path = path
+        self.resource = resource
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def export(self, spans: list) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def flush(self, timeout: float = 5.0) -> None:
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def shutdown(self) -> None:
+        self.flush()
+
+    def _run(self) -> None:
+        while True:
+            spans = self._queue.get()
+            try:
+                line = json.dumps(to_otlp(spans, self.resource), separators=(",", ":"), default=str)
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.path, "a") as fh:
+                    fh.write(line + "\n")
+            except Exception:
+                logger.exception("trace export to %s failed", self.path)
+            finally:
+                self._queue.task_done()
+
+
+class LogExporter:
+    """One INFO line per trace: root span, duration and the slowest children."""
+
+    def export(self, spans: list) -> None:
+        root = next((s for s in spans if s.trace.root is s), None)
+        children = sorted((s for s in spans if s is not root), key=lambda s: s.duration_ms, reverse=True)[:5]
+        top = ", ".join(f"{s.name} {s.duration_ms:.1f}ms" for s in children)
+        if root is None:
+            logger.info("trace %s: %s", spans[0].trace.trace_id, top)
+            return
+        logger.info("trace %s %s %.1fms: %s", root.trace.trace_id, root.name, root.duration_ms, top)
+
+
+def _load_exporter(app, kind: str, resource: dict):
+    if kind == "file":
+        return FileExporter(trace_path(app), resource)
+    if kind == "log":
+        return LogExporter()
+    module, _, attr = kind.partition(":")
+    if not attr:
+        raise ValueError(f"TRACE_EXPORTER must be 'file', 'log' or 'module:factory', not {kind!r}")
+    return getattr(importlib.import_module(module), attr)(app)
+
+
+def trace_path(app) -> str:
+    return app.config.get("TRACE_FILE") or os.path.join(app.instance_path, "traces.jsonl")
+
+
+class Tracer:
+    """Per-app sampling settings and exporter; lives in app.extensions['tracing']."""
+
+    def __init__(self, exporter, sample_rate: float = 0.0, slow_ms: float = 0.0, trust_parent: bool = False, max_spans: int = 500):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.trust_parent = trust_parent
+        self.max_spans = max_spans
+
+    def export(self, spans: list) -> None:
+        if not spans:
+            return
+        try:
+            self.exporter.export(spans)
+        except Exception:
+            logger.exception("trace exporter failed")
+
+    def begin(self, traceparent: str | None):
+        """(trace_id, Trace or None): a Trace when this request is sampled or TRACE_SLOW_MS records it."""
+        inbound = parse_traceparent(traceparent)
+        trace_id, parent_id, parent_sampled = inbound if inbound else (_new_id(128), None, False)
+        sampled = (self.trust_parent and parent_sampled) or (self.sample_rate > 0 and random.random() < self.sample_rate)
+        if not sampled and self.slow_ms <= 0:
+            return trace_id, None
+        trace = Trace(self, trace_id, sampled, self.max_spans)
+        trace.root = Span(trace, "request", parent_id, "server", {})
+        trace.spans.append(trace.root)
+        return trace_id, trace
+
+
+# ---- SQL and session commit spans ----
+
+def _install_engine(engine) -> None:
+    from utils.slow_queries import normalize
+
+    system = engine.dialect.name
+    database = engine.url.database
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        parent = _current.get()
+        if parent is None:
+            return
+        operation = statement.lstrip()[:12].split(None, 1)[0].upper() if statement.strip() else "SQL"
+        child = parent.trace.start_span(
+            f"db {operation}", parent.span_id, "client",
+            {"db.system": system, "db.name": database, "db.statement": normalize(statement)[:2000], "db.executemany": executemany or None},
+        )
+        conn.info.setdefault("trace_spans", []).append(child)
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            child = spans.pop()
+            if child is not None:
+                if cursor.rowcount is not None and cursor.rowcount >= 0:
+                    child.set_attribute("db.rows_affected", cursor.rowcount)
+                child.end()
+
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        spans = conn.info.get("trace_spans") if conn is not None else None
+        if spans:
+            child = spans.pop()
+            if child is not None:
+                child.record_exception(exception_context.original_exception)
+                child.end()
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+
+def _before_commit(session):
+    # flush + COMMIT (and the staged bookkeeping of utils/unit_of_work.py)
+    child = start_span("db commit")
+    if child is not None:
+        session.info["trace_commit"] = (child, _current.set(child))
+
+
+def _end_commit(session, error: str | None = None):
+    pending = session.info.pop("trace_commit", None)
+    if pending is None:
+        return
+    child, token = pending
+    try:
+        _current.reset(token)
+    except ValueError:
+        _current.set(child.trace.spans[0] if child.trace.spans else None)
+    if error:
+        child.set_error(error)
+    child.end()
+
+
+def _after_commit(session):
+    _end_commit(session)
+
+
+def _after_transaction_end(session, transaction):
+    # still open here only if the commit failed (after_commit runs first on success);
+    # the flush inside a commit ends a nested transaction, hence the parent check
+    if transaction.parent is None:
+        _end_commit(session, "commit failed")
+
+
+_session_events_installed = False
+
+
+def _install_session_events() -> None:
+    global _session_events_installed
+    if _session_events_installed:
+        return
+    event.listen(OrmSession, "before_commit", _before_commit)
+    event.listen(OrmSession, "after_commit", _after_commit)
+    event.listen(OrmSession, "after_transaction_end", _after_transaction_end)
+    _session_events_installed = True
+
+
+# ---- request hooks ----
+
+def init_tracing(app) -> None:
+    """Registers the request hooks and SQL listeners; call after db.init_app/init_engine_profile and before the other request hooks."""
+    if not app.config.get("TRACING_ENABLED", True):
+        return
+    from models import db
+
+    resource = {
+        "service.name": app.config.get("TRACE_SERVICE_NAME") or "futsalslot-backend",
+        "process.pid": os.getpid(),
+    }
+    tracer = app.extensions["tracing"] = Tracer(
+        _load_exporter(app, (app.config.get("TRACE_EXPORTER") or "file").strip(), resource),
+        sample_rate=float(app.config.get("TRACE_SAMPLE_RATE", 0)),
+        slow_ms=float(app.config.get("TRACE_SLOW_MS", 0)),
+        trust_parent=bool(app.config.get("TRACE_TRUST_PARENT", False)),
+        max_spans=int(app.config.get("TRACE_MAX_SPANS", 500)),
+    )
+
+    with app.app_context():
+        engines = set(db.engines.values())
+    if app.extensions.get("read_engine") is not None:
+        engines.add(app.extensions["read_engine"])
+    for engine in engines:
+        _install_engine(engine)
+    _install_session_events()
+
+    @app.before_request
+    def _start_trace():
+        trace_id, trace = tracer.begin(request.headers.get("traceparent"))
+        g._trace_id = trace_id
+        if trace is None:
+            return
+        root = trace.root
+        root.attributes.update({
+            "http.request.method": request.method,
+            "url.path": request.path,
+            "http.route": request.url_rule.rule if request.url_rule is not None else None,
+            "flask.endpoint": request.endpoint,
+        })
+        root.name = f"{request.method} {request.url_rule.rule if request.url_rule is not None else request.path}"
+        g._trace = (trace, _current.set(root))
+
+    @app.after_request
+    def _trace_response(resp):
+        resp.headers["X-Trace-Id"] = g.get("_trace_id", "")
+        active = g.get("_trace")
+        if active is not None:
+            root = active[0].root
+            root.set_attribute("http.response.status_code", resp.status_code)
+            if resp.status_code >= 500:
+                root.set_error(f"HTTP {resp.status_code}")
+        return resp
+
+    @app.teardown_request
+    def _finish_trace(exc=None):
+        active = g.pop("_trace", None)
+        if active is None:
+            return
+        trace, token = active
+        try:
+            _current.reset(token)
+        except ValueError:
+            _current.set(None)
+        root = trace.root
+        user = g.get("user")
+        if user is not None:
+            root.set_attribute("enduser.id", user.id)
+        if exc is not None:
+            root.record_exception(exc)
+        root.end_ns = time.time_ns()
+        trace.finish(root.attributes.get("http.response.status_code", 500 if exc is not None else None))
+
+
+# ---- reading the file back ----
+
+def summarize(path: str, endpoint: str | None = None, limit: int = 20) -> dict:
+    """
+    Per-endpoint totals from a TRACE_FILE: request count, mean/max duration and,
+    per child span name, calls and mean time per request, largest share first.
+    `traces` lists the slowest traces with their span breakdown.
+    """
+    traces = defaultdict(list)
+    if os.path.exists(path):
+        with open(path) as fh:
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                for span in _spans_from_otlp(record):
+                    traces[span["traceId"]].append(span)
+
+    def attrs(span):
+        return {a["key"]: next(iter(a["value"].values())) for a in span.get("attributes", ())}
+
+    def ms(span):
+        return (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+
+    endpoints = {}
+    slowest = []
+    for trace_id, spans in traces.items():
+        ids = {span["spanId"] for span in spans}
+        roots = [span for span in spans if span.get("kind") == SPAN_KINDS["server"] and span.get("parentSpanId") not in ids]
+        if not roots:
+            continue
+        root = roots[0]
+        name = attrs(root).get("flask.endpoint") or root["name"]
+        if endpoint and name != endpoint:
+            continue
+        group = endpoints.setdefault(name, {"endpoint": name, "requests": 0, "total_ms": 0.0, "max_ms": 0.0, "spans": defaultdict(lambda: [0, 0.0])})
+        duration = ms(root)
+        group["requests"] += 1
+        group["total_ms"] += duration
+        group["max_ms"] = max(group["max_ms"], duration)
+        breakdown = defaultdict(float)
+        for span in spans:
+            if span is root:
+                continue
+            stats = group["spans"][span["name"]]
+            stats[0] += 1
+            stats[1] += ms(span)
+            breakdown[span["name"]] += ms(span)
+        slowest.append({
+            "trace_id": trace_id,
+            "endpoint": name,
+            "name": root["name"],
+            "status": attrs(root).get("http.response.status_code"),
+            "duration_ms": round(duration, 2),
+            "spans": {k: round(v, 2) for k, v in sorted(breakdown.items(), key=lambda kv: kv[1], reverse=True)},
+        })
+
+    out = []
+    for group in endpoints.values():
+        n = group["requests"]
+        group["mean_ms"] = round(group["total_ms"] / n, 2)
+        group["max_ms"] = round(group["max_ms"], 2)
+        group["total_ms"] = round(group["total_ms"], 2)
+        group["spans"] = [
+            {"name": name, "calls_per_request": round(calls / n, 2), "mean_ms_per_request": round(total / n, 2)}
+            for name, (calls, total) in sorted(group["spans"].items(), key=lambda kv: kv[1][1], reverse=True)
+        ]
+        out.append(group)
+    out.sort(key=lambda group: group["total_ms"], reverse=True)
+    slowest.sort(key=lambda trace: trace["duration_ms"], reverse=True)
+    return {"endpoints": out, "traces": slowest[:limit]}
@@ -0,0 +1,108 @@
+"""
+Request-scoped unit of work: one commit per request.
+
+Before this, an authenticated POST committed in the session touch, in the
+handler and again in log_event; a failed login committed in the rate limiter,
+in register_failure and in log_event. Now, inside a request:
+
+- stage(fn) queues bookkeeping writes (session touch, audit rows, login
+  counters). They are applied inside the next commit of the request, or in
+  the end-of-request commit, and survive a handler's rollback();
+- commit_request() flushes (ids and IntegrityErrors surface where they used to) and
+  leaves the COMMIT to the end of the request;
+- db.session.commit() stays the explicit early commit for work that must be
+  durable before the request ends (payment provider calls, emails,
+  notifications read by other threads). Staged work rides along with it.
+
+At the end of the request: if the handler never called commit_request(), anything it
+left in the session is rolled back (as before, when teardown discarded it);
+then staged work is applied and committed once. A 5xx response rolls back the
+handler's work but still commits staged work. Outside a request (CLI, background workers) stage() and
+commit_request() commit immediately.
+
+UNIT_OF_WORK_ENABLED=false restores per-helper commits.
+"""
+import logging
+
+from flask import g, has_request_context, jsonify, request
+from sqlalchemy import event
+
+from models import db
+from models.db import Session
+
+logger = logging.getLogger(__name__)
+
+
+def active() -> bool:
+    return has_request_context() and g.get("_uow_active", False)
+
+
+def stage(fn) -> None:
+    """Runs fn() (which adds/updates rows) in this request's next commit."""
+    if not active():
+        fn()
+        db.session.commit()
+        return
+    g.setdefault("_uow_staged", []).append(fn)
+
+
+def commit_request() -> None:
+    """Flushes now and commits at the end of the request (commits at once outside one)."""
+    if not active():
+        db.session.commit()
+        return
+    db.session.flush()
+    g._uow_commit = True
+
+
+@event.listens_for(Session, "before_commit")
+def _apply_staged(session):
+    if not has_request_context():
+        return
+    staged = g.pop("_uow_staged", None)
+    for fn in staged or ():
+        fn()
+
+
+def _discard_unflushed(session) -> None:
+    # changes made after the handler's last commit_request() that never reached the DB
+    for obj in list(session.new):
+        session.expunge(obj)
+    for obj in list(session.deleted):
+        session.expunge(obj)
+    for obj in list(session.dirty):
+        session.expire(obj)
+
+
+def init_unit_of_work(app) -> None:
+    """Registers the request hooks; call before the hooks that load the user."""
+
+    @app.before_request
+    def _begin_unit_of_work():
+        g._uow_active = bool(app.config.get("UNIT_OF_WORK_ENABLED", True))
+
+    @app.after_request
+    def _commit_unit_of_work(resp):
+        if not g.pop("_uow_active", False):
+            return resp
+        # a 5xx never keeps the handler's work; bookkeeping (rate limits,
+        # audit rows) is still written, as it was when helpers committed
+        wants_commit = g.pop("_uow_commit", False) and resp.status_code < 500
+        if not wants_commit:
+            db.session.rollback()
+        else:
+            _discard_unflushed(db.session())
+        if not wants_commit and not g.get("_uow_staged"):
+            return resp
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.exception("end-of-request commit failed: %s %s", request.method, request.path)
+            # rewritten in place: the hooks that already ran on resp (security
+            # headers, replica stickiness cookie) registered after this one
+            resp.set_data(jsonify(error="Could not save changes").get_data())
+            resp.mimetype = "application/json"
+            resp.status_code = 500
+            resp.headers.pop("Location", None)
+        return resp
@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from models import db
+from models.booking import Booking
+from models.slot import Slot
+from models.user import User
+from models.waitlist_entry import WaitlistEntry
+from utils.notifier import notify_emails
+
+
+def holders_by_slot(slot_ids) -> dict:
+    """
+    Returns {slot_id: {user_id, ...}} for slots currently held for offered waiters.
+    Slots without a live hold are absent.
+    """
+    if not slot_ids:
+        return {}
+    now = datetime.utcnow()
+    rows = (
+        db.session.query(WaitlistEntry.slot_id, WaitlistEntry.user_id)
+        .filter(
+            WaitlistEntry.slot_id.in_(list(slot_ids)),
+            WaitlistEntry.status == "OFFERED",
+            WaitlistEntry.hold_expires_at > now,
+        )
+        .all()
+    )
+    out = {}
+    for slot_id, user_id in rows:
+        out.setdefault(slot_id, set()).add(user_id)
+    return out
+
+
+def is_held_for_other(slot_id: int, user_id: int) -> bool:
+    holders = holders_by_slot([slot_id]).get(slot_id)
+    return bool(holders) and user_id not in holders
+
+
+def _offer_message(user: User, slot: Slot, hold_until: datetime):
+    subject = "A slot you were waiting for is free"
+    body = (
+        f"Hi {user.full_name or user.email},\n\n"
+        f"The slot on {slot.start_time.isoformat()} (Slot #{slot.id}) was just cancelled "
+        f"and is held for you until {hold_until.isoformat()} UTC.\n\n"
+        "Open FutsalSlot and pay for it before the hold expires to claim it.\n\n"
+        "Thank you,\nFutsalSlot"
+    )
+    return user.email, subject, body
+
+
+def offer_next(slot_id: int) -> list:
+    """
+    Pops the next waiter(s) of a freed slot in arrival order and gives them a
+    time-limited hold. Commits, then queues the notifications so the caller
+    (a cancel request) never waits on SMTP. Returns the offered user ids.
+    """
+    slot = Slot.query.get(slot_id)
+    if not slot or not slot.is_active or slot.start_time <= datetime.utcnow():
+        return []
+    if Booking.query.filter_by(slot_id=slot_id, status="CONFIRMED").first():
+        return []
+
+    batch = max(1, int(current_app.config.get("WAITLIST_OFFER_BATCH", 1)))
+    entries = (
+        WaitlistEntry.query
+        .filter_by(slot_id=slot_id, status="WAITING")
+        .order_by(WaitlistEntry.created_at.asc(), WaitlistEntry.id.asc())
+        .limit(batch)
+        .all()
+    )
+    if not entries:
+        return []
+
+    now = datetime.utcnow()
+    hold_until = now + timedelta(minutes=current_app.config.get("WAITLIST_HOLD_MINUTES", 15))
+    for entry in entries:
+        entry.status = "OFFERED"
+        entry.offered_at = now
+        entry.hold_expires_at = hold_until
+    db.session.commit()
+
+    user_ids = [e.user_id for e in entries]
+    users = User.query.filter(User.id.in_(user_ids)).all()
+    notify_emails([_offer_message(u, slot, hold_until) for u in users])
+    return user_ids
+
+
+def mark_claimed(slot_id: int, user_id: int) -> None:
+    """
+    Called when a booking for `slot_id` is confirmed (no commit). The buyer's
+    entry is closed; other offered waiters go back to the queue in their
+    original position.
+    """
+    (
+        WaitlistEntry.query
+        .filter(
+            WaitlistEntry.slot_id == slot_id,
+            WaitlistEntry.user_id == user_id,
+            WaitlistEntry.status.in_(["WAITING", "OFFERED"]),
+        )
+        .update({"status": "CLAIMED", "hold_expires_at": None}, synchronize_session=False)
+    )
+    (
+        WaitlistEntry.query
+        .filter(WaitlistEntry.slot_id == slot_id, WaitlistEntry.status == "OFFERED")
+        .update({"status": "WAITING", "offered_at": None, "hold_expires_at": None}, synchronize_session=False)
+    )
+
+
+def expire_holds() -> tuple[int, int]:
+    """
+    Expires lapsed holds and offers the freed slots to the next waiters.
+    Returns (expired_count, reoffered_slot_count).
+    """
+    now = datetime.utcnow()
+    expired = (
+        WaitlistEntry.query
+        .filter(WaitlistEntry.status == "OFFERED", WaitlistEntry.hold_expires_at <= now)
+        .all()
+    )
+    if not expired:
+        return 0, 0
+
+    slot_ids = {e.slot_id for e in expired}
+    for entry in expired:
+        entry.status = "EXPIRED"
+    db.session.commit()
+
+    still_held = holders_by_slot(slot_ids)
+    reoffered = 0
+    for slot_id in sorted(slot_ids):
+        if slot_id in still_held:
+            continue
+        if offer_next(slot_id):
+            reoffered += 1
+    return len(expired), reoffered
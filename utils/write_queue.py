@@ -0,0 +1,126 @@
+"""
+Single-writer queue for SQLite.
+
+SQLite lets one connection write at a time; every other writer spins in the
+busy handler and, past busy_timeout, fails with "database is locked". The
+WriteQueue hands that lock out in-process instead: a connection takes its
+turn just before its first INSERT/UPDATE/DELETE (or DDL) and gives it back
+once the transaction is over (the connection returns to the pool or begins
+its next transaction). Waiters are served in arrival order, so within a
+worker process writes never hit SQLITE_BUSY and commit order matches the
+order writers arrived in. Reads never queue.
+
+The ORM unit of work stays on the request's own thread and connection (its
+objects cannot move to another thread); the queue only serializes when those
+connections may write. Across worker processes, PRAGMA busy_timeout still
+applies.
+"""
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event
+
+from utils.tracing import span
+
+WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER")
+_HELD = "write_queue_held"
+
+
+class WriteQueueTimeout(RuntimeError):
+    """Waited longer than SQLITE_WRITE_QUEUE_TIMEOUT for the write turn."""
+
+
+class WriteQueue:
+    def __init__(self, timeout: float = 30.0):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._owner = None          # (thread ident, connection key) holding the turn
+        self._waiters = deque()     # [ticket], FIFO
+        self._stats = {"turns": 0, "waited": 0, "timeouts": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0, "depth_max": 0}
+
+    def acquire(self, key) -> bool:
+        """
+        Blocks until `key` (a pool connection record) holds the write turn. Returns
+        False without queueing when another connection on the same thread
+        already holds it (waiting would deadlock; SQLite itself decides).
+        """
+        me = threading.get_ident()
+        with self._lock:
+            if self._owner is None and not self._waiters:
+                self._owner = (me, key)
+                self._stats["turns"] += 1
+                return True
+            if self._owner[0] == me:
+                return False
+            ticket = {"owner": (me, key), "ready": threading.Event()}
+            self._waiters.append(ticket)
+            self._stats["depth_max"] = max(self._stats["depth_max"], len(self._waiters))
+
+        started = time.perf_counter()
+        with span("sqlite.write_turn.wait", queue_depth=len(self._waiters)):
+            granted = ticket["ready"].wait(self.timeout)
+        waited_ms = (time.perf_counter() - started) * 1000.0
+        with self._lock:
+            if not granted and not ticket["ready"].is_set():
+                self._waiters.remove(ticket)
+                self._stats["timeouts"] += 1
+                raise WriteQueueTimeout(f"no write turn after {self.timeout:.0f}s")
+            self._stats["turns"] += 1
+            self._stats["waited"] += 1
+            self._stats["wait_ms_total"] += waited_ms
+            self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], waited_ms)
+        return True
+
+    def release(self, key) -> None:
+        with self._lock:
+            if self._owner is None or self._owner[1] is not key:
+                return
+            if self._waiters:
+                ticket = self._waiters.popleft()
+                self._owner = ticket["owner"]
+                ticket["ready"].set()
+            else:
+                self._owner = None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["depth"] = len(self._waiters)
+            out["busy"] = self._owner is not None
+        out["wait_ms_mean"] = round(out["wait_ms_total"] / out["waited"], 2) if out["waited"] else 0.0
+        out["wait_ms_total"] = round(out["wait_ms_total"], 2)
+        out["wait_ms_max"] = round(out["wait_ms_max"], 2)
+        return out
+
+
+def is_write(statement: str) -> bool:
+    return statement.lstrip()[:7].upper().startswith(WRITE_PREFIXES)
+
+
+def install(engine, queue: WriteQueue) -> None:
+    """Routes every write transaction on `engine` through `queue`."""
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record = conn.connection._connection_record
+        if record is None or record.info.get(_HELD) or not is_write(statement):
+            return
+        if queue.acquire(record):
+            record.info[_HELD] = True
+
+    def on_begin(conn):
+        # a connection kept open across transactions gives the turn back
+        # before its next one (the previous COMMIT/ROLLBACK has run by now)
+        record = conn.connection._connection_record
+        if record is not None and record.info.pop(_HELD, False):
+            queue.release(record)
+
+    def on_checkin(dbapi_connection, connection_record):
+        # the usual release point: sessions return their connection to the
+        # pool right after COMMIT/ROLLBACK
+        if connection_record.info.pop(_HELD, False):
+            queue.release(connection_record)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "begin", on_begin)
+    event.listen(engine, "checkin", on_checkin)